@@ -12,10 +12,10 @@ class BookCopyInline(admin.TabularInline):
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     """Admin untuk Book"""
-    list_display = ['title', 'author', 'isbn', 'category', 'total_copies', 'rating', 'created_at']
+    list_display = ['title', 'author', 'isbn', 'category', 'copy_count', 'available_copies', 'rating', 'created_at']
     list_filter = ['category', 'year_published']
     search_fields = ['title', 'author', 'isbn', 'publisher']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['copy_count', 'available_copies', 'created_at', 'updated_at']
     inlines = [BookCopyInline]
     
     fieldsets = (
@@ -26,7 +26,7 @@ class BookAdmin(admin.ModelAdmin):
             'fields': ('category', 'description', 'cover_image')
         }),
         ('Stok & Rating', {
-            'fields': ('total_copies', 'rating')
+            'fields': ('copy_count', 'available_copies', 'rating')
         }),
         ('Timestamp', {
             'fields': ('created_at', 'updated_at')
@@ -0,0 +1,212 @@
+"""
+API JSON katalog (read-only) untuk kiosk & aplikasi mobile
+
+GET /books/api/books/         daftar buku (cursor pagination)
+GET /books/api/books/<pk>/    detail buku beserta salinannya
+
+Parameter:
+    fields=title,author,...   hanya kolom yang dibutuhkan client (sparse fieldset)
+    search, category, decade, available=1   sama seperti katalog HTML
+    cursor, limit             halaman berikutnya & jumlah per halaman
+
+Data diserialisasi langsung dari baris values() (tanpa instance model).
+Ketersediaan memakai counter di tabel Book, salinan (fields=copies) diambil
+dengan satu query untuk seluruh halaman. Response JSON ringkas, di-gzip
+dan punya ETag sehingga client bisa revalidasi dengan 304
+"""
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from library_system.http import conditional_page, latest_timestamp, make_etag
+from library_system.pagination import KeysetPaginator
+from library_system.search import search_ordering
+
+from .cache import get_catalog_state
+from .facets import apply_catalog_filters, parse_catalog_filters
+from .models import Book, BookCopy
+
+
+# Jumlah buku per halaman API
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 100
+
+# Field yang bisa diminta: nama di JSON -> kolom values() yang dibutuhkan
+BOOK_API_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'author': ('author',),
+    'publisher': ('publisher',),
+    'year_published': ('year_published',),
+    'isbn': ('isbn',),
+    'category': ('category',),
+    'description': ('description',),
+    'rating': ('rating',),
+    'copy_count': ('copy_count',),
+    'available_copies': ('available_copies',),
+    'available': ('available_copies',),
+    'cover': ('cover_image', 'cover_variants'),
+    'updated_at': ('updated_at',),
+    'copies': ('id',),
+}
+
+DEFAULT_LIST_FIELDS = (
+    'id', 'title', 'author', 'category', 'year_published', 'rating',
+    'available_copies', 'copy_count', 'cover',
+)
+DEFAULT_DETAIL_FIELDS = tuple(BOOK_API_FIELDS)
+
+COPY_API_FIELDS = ('id', 'copy_number', 'barcode', 'condition', 'is_available')
+
+# JSON tanpa spasi (lebih kecil sebelum & sesudah gzip)
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class InvalidFields(ValueError):
+    """Parameter fields berisi nama yang tidak dikenal"""
+    pass
+
+
+def api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def parse_fields(request, default):
+    """
+    Ambil daftar field dari ?fields=a,b,c (urutan dipertahankan)
+    Raises: InvalidFields
+    """
+    raw = request.GET.get('fields', '')
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in BOOK_API_FIELDS]
+    if unknown:
+        raise InvalidFields(f"Field tidak dikenal: {', '.join(unknown)}")
+    return fields
+
+
+def book_columns(fields, *extra):
+    """Kolom values() untuk field yang diminta (+ kolom urutan cursor)"""
+    columns = [column for name in fields for column in BOOK_API_FIELDS[name]]
+    return list(dict.fromkeys(columns + list(extra)))
+
+
+def _cover(row):
+    """URL cover asli + varian yang masih sesuai dengan cover saat ini"""
+    name = row['cover_image']
+    if not name:
+        return None
+    cover = {'url': default_storage.url(name)}
+    variants = row['cover_variants'] or {}
+    if variants.get('source') == name:
+        for fmt in ('webp', 'jpeg'):
+            cover[fmt] = [[width, default_storage.url(path)] for width, path in variants.get(fmt, [])]
+    return cover
+
+
+def serialize_book(row, fields, copies=None):
+    """Baris values() -> dict JSON dengan field yang diminta saja"""
+    data = {}
+    for name in fields:
+        if name == 'cover':
+            data[name] = _cover(row)
+        elif name == 'available':
+            data[name] = row['available_copies'] > 0
+        elif name == 'copies':
+            data[name] = copies.get(row['id'], []) if copies is not None else []
+        else:
+            data[name] = row[BOOK_API_FIELDS[name][0]]
+    return data
+
+
+def _copies_by_book(book_ids):
+    """Salinan untuk beberapa buku sekaligus (satu query) -> {book_id: [salinan]}"""
+    copies = {}
+    rows = (
+        BookCopy.objects.filter(book_id__in=book_ids)
+        .order_by('book_id', 'copy_number')
+        .values('book_id', *COPY_API_FIELDS)
+    )
+    for row in rows:
+        copies.setdefault(row.pop('book_id'), []).append(row)
+    return copies
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, json_dumps_params=JSON_PARAMS)
+
+
+def catalog_api_state(request, pk=None):
+    """
+    Versi data API (sama untuk semua user): updated_at terbaru & jumlah buku
+    + versi katalog di cache (naik saat salinan berubah / pinjam / kembali)
+    Returns: None jika versi katalog tidak tersedia (cache mati)
+    """
+    version, changed_at = get_catalog_state()
+    if version is None:
+        return None
+    books = Book.objects.all() if pk is None else Book.objects.filter(pk=pk)
+    stats = books.aggregate(last_updated=Max('updated_at'), total=Count('id'))
+    etag = make_etag('api', pk, stats['last_updated'], stats['total'], version)
+    return etag, latest_timestamp(stats['last_updated'], changed_at)
+
+
+@require_GET
+@gzip_page
+@conditional_page(catalog_api_state, per_user=False)
+def book_list_api(request):
+    """
+    Daftar buku dalam JSON: {'results': [...], 'next': url|null}
+    """
+    try:
+        fields = parse_fields(request, DEFAULT_LIST_FIELDS)
+    except InvalidFields as e:
+        return api_error(str(e))
+
+    try:
+        limit = min(max(int(request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return api_error("Parameter limit harus angka")
+
+    books = Book.objects.all()
+    search_query = request.GET.get('search', '')
+    if search_query:
+        books = books.search(search_query)
+    books = apply_catalog_filters(books, parse_catalog_filters(request.GET))
+
+    # Kolom urutan (created_at / rank) ikut di values() untuk membuat cursor
+    ordering = search_ordering(books, default=['-created_at'])
+    order_columns = [name.lstrip('-') for name in ordering] + ['id']
+    rows = books.values(*book_columns(fields, *order_columns))
+    page = KeysetPaginator(rows, ordering, per_page=limit).get_page(request.GET.get('cursor'))
+
+    copies = _copies_by_book([row['id'] for row in page]) if 'copies' in fields else None
+    next_url = page.next_page_url(request)
+    return api_response({
+        'results': [serialize_book(row, fields, copies) for row in page],
+        'next': request.build_absolute_uri(next_url) if next_url else None,
+    })
+
+
+@require_GET
+@gzip_page
+@conditional_page(catalog_api_state, per_user=False)
+def book_detail_api(request, pk):
+    """
+    Detail satu buku dalam JSON (default semua field termasuk salinan)
+    """
+    try:
+        fields = parse_fields(request, DEFAULT_DETAIL_FIELDS)
+    except InvalidFields as e:
+        return api_error(str(e))
+
+    row = Book.objects.filter(pk=pk).values(*book_columns(fields, 'id')).first()
+    if row is None:
+        return api_error("Buku tidak ditemukan", status=404)
+
+    copies = _copies_by_book([pk]) if 'copies' in fields else None
+    return api_response(serialize_book(row, fields, copies))
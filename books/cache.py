@@ -0,0 +1,74 @@
+"""
+Versi katalog di cache bersama (Redis)
+Naik setiap kali data buku atau salinan berubah (termasuk pinjam/kembali),
+dipakai sebagai bagian key cache & ETag supaya data lama otomatis tidak terpakai
+
+Jika cache tidak bisa diakses versi bernilai None: halaman dilayani tanpa
+ETag dan cache turunan (facet dll) dilewati
+"""
+import logging
+import time
+
+from django.core.cache import cache
+
+from library_system.cache import CACHE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CHANGED_KEY = 'catalog:changed_at'
+
+
+def _initial_version():
+    # Dimulai dari waktu sekarang (ms) supaya versi tidak terulang jika cache dikosongkan
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Versi katalog saat ini (None jika cache tidak bisa diakses)"""
+    try:
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_KEY, _initial_version(), None)
+            version = cache.get(CATALOG_VERSION_KEY)
+    except CACHE_ERRORS:
+        logger.warning("Versi katalog tidak bisa dibaca dari cache", exc_info=True)
+        return None
+    return version
+
+
+def get_catalog_state():
+    """
+    Versi katalog & waktu perubahan terakhir (unix timestamp, None jika belum ada)
+    Returns: (version, changed_at), (None, None) jika cache tidak bisa diakses
+    """
+    try:
+        values = cache.get_many([CATALOG_VERSION_KEY, CATALOG_CHANGED_KEY])
+    except CACHE_ERRORS:
+        logger.warning("Versi katalog tidak bisa dibaca dari cache", exc_info=True)
+        return None, None
+    version = values.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = get_catalog_version()
+    return version, values.get(CATALOG_CHANGED_KEY)
+
+
+def bump_catalog_version():
+    """
+    Naikkan versi katalog (dipanggil lewat signal setelah commit)
+    Data sudah tersimpan saat ini dipanggil, jadi error cache hanya dicatat di log
+    Returns: versi baru, None jika cache tidak bisa diakses
+    """
+    try:
+        cache.set(CATALOG_CHANGED_KEY, time.time(), None)
+        try:
+            return cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            # Key belum ada / sudah dibuang: mulai dari versi baru
+            version = _initial_version()
+            cache.set(CATALOG_VERSION_KEY, version, None)
+            return version
+    except CACHE_ERRORS:
+        logger.exception("Gagal menaikkan versi katalog di cache")
+        return None
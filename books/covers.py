@@ -0,0 +1,109 @@
+"""
+Pipeline thumbnail cover buku
+Cover asli diperkecil dengan Pillow ke beberapa lebar & di-encode ulang
+sebagai WebP dan JPEG, disimpan di samping file asli. Template memakai
+srcset sehingga browser hanya mengunduh ukuran yang dibutuhkan
+
+Hasil disimpan di Book.cover_variants:
+    {'source': 'books/covers/a.jpg',
+     'webp': [[200, 'books/covers/variants/1/a-200.webp'], ...],
+     'jpeg': [[200, 'books/covers/variants/1/a-200.jpg'], ...]}
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Book, CatalogChange
+
+
+# Lebar varian (px); gambar tidak pernah diperbesar
+COVER_WIDTHS = (200, 400, 800)
+
+# Format output: (ekstensi, format Pillow, opsi encode)
+COVER_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+VARIANTS_DIR = 'books/covers/variants'
+
+
+def _variant_names(variants):
+    """Semua nama file varian di dict cover_variants"""
+    return [name for key in COVER_FORMATS for width, name in variants.get(key, [])]
+
+
+def delete_cover_variants(variants):
+    """Hapus file varian lama dari storage"""
+    for name in _variant_names(variants):
+        default_storage.delete(name)
+
+
+def _open_cover(name):
+    """Buka cover asli, putar sesuai EXIF & ubah ke RGB (WebP/JPEG tanpa alpha)"""
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def render_cover_variants(book):
+    """
+    Buat file varian untuk cover buku saat ini
+    Returns: dict cover_variants baru ({} jika buku tidak punya cover)
+    """
+    if not book.cover_image:
+        return {}
+
+    source = book.cover_image.name
+    image = _open_cover(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+
+    # Lebar yang lebih besar dari gambar asli diganti lebar asli (tanpa duplikat)
+    widths = sorted({min(width, image.width) for width in COVER_WIDTHS})
+
+    variants = {'source': source}
+    for key, (extension, pillow_format, options) in COVER_FORMATS.items():
+        variants[key] = []
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            name = default_storage.save(
+                f'{VARIANTS_DIR}/{book.pk}/{stem}-{width}.{extension}',
+                ContentFile(buffer.getvalue()),
+            )
+            variants[key].append([width, name])
+    return variants
+
+
+def process_book_cover(book_id, force=False):
+    """
+    Buat ulang varian cover satu buku jika cover berubah (atau force)
+    Varian lama dihapus; updated_at ikut diperbarui supaya ETag halaman
+    & cache kartu buku memakai srcset yang baru
+    Returns: True jika varian diproses ulang
+    """
+    book = Book.objects.filter(pk=book_id).only('pk', 'cover_image', 'cover_variants').first()
+    if book is None:
+        return False
+
+    current = book.cover_image.name if book.cover_image else None
+    if not force and book.cover_variants.get('source') == current:
+        return False
+
+    variants = render_cover_variants(book)
+    delete_cover_variants(book.cover_variants)
+    Book.objects.filter(pk=book.pk).update(cover_variants=variants, updated_at=timezone.now())
+    CatalogChange.objects.record('book', [book.pk])
+    return True
@@ -0,0 +1,84 @@
+"""
+Loader halaman detail buku (katalog publik & librarian)
+Salinan diambil sekaligus dengan peminjaman aktifnya (Prefetch) dan
+statistik peminjaman dihitung dalam satu agregat, jadi jumlah query
+tetap walaupun buku punya puluhan salinan
+"""
+from dataclasses import dataclass
+
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+
+@dataclass(frozen=True)
+class CopyStatus:
+    """Status satu salinan untuk ditampilkan"""
+    status: str  # 'tersedia' / 'dipinjam' / 'terlambat' / 'tidak_tersedia' (tanpa peminjaman aktif)
+    loan: object = None  # Loan aktif (None jika tersedia)
+
+    @property
+    def member(self):
+        return self.loan.member if self.loan else None
+
+    @property
+    def due_date(self):
+        return self.loan.due_date if self.loan else None
+
+
+@dataclass(frozen=True)
+class BookDetail:
+    """Data halaman detail buku"""
+    book: object
+    copies: list  # BookCopy urut copy_number, masing-masing punya atribut .loan_status
+    status_map: dict  # {copy_id: CopyStatus}
+    total_loans: int = None
+    active_loans: int = None
+    overdue_loans: int = None
+
+
+def load_book_detail(book, with_borrowers=False, with_stats=False, now=None):
+    """
+    Muat salinan + status peminjaman untuk satu buku (2 query)
+    with_borrowers: ikut ambil data anggota peminjam (hanya untuk librarian)
+    with_stats: hitung statistik peminjaman (1 query agregat tambahan)
+    """
+    from loans.models import Loan
+
+    now = now or timezone.now()
+
+    active_loans = Loan.objects.active().order_by('-borrowed_date')
+    if with_borrowers:
+        active_loans = active_loans.select_related('member')
+    copies = list(
+        book.bookcopy_set.order_by('copy_number').prefetch_related(
+            Prefetch('loan_set', queryset=active_loans, to_attr='active_loans')
+        )
+    )
+
+    status_map = {}
+    for copy in copies:
+        loan = copy.active_loans[0] if copy.active_loans else None
+        if loan is None:
+            status = CopyStatus('tersedia' if copy.is_available else 'tidak_tersedia')
+        else:
+            status = CopyStatus('terlambat' if loan.due_date < now else 'dipinjam', loan)
+        status_map[copy.pk] = copy.loan_status = status
+
+    if not with_stats:
+        return BookDetail(book=book, copies=copies, status_map=status_map)
+
+    active = Q(status__in=['dipinjam', 'terlambat'])
+    stats = Loan.objects.filter(book_copy__book=book).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=active),
+        overdue=Count('id', filter=active & Q(due_date__lt=now)),
+    )
+
+    return BookDetail(
+        book=book,
+        copies=copies,
+        status_map=status_map,
+        total_loans=stats['total'],
+        active_loans=stats['active'],
+        overdue_loans=stats['overdue'],
+    )
@@ -0,0 +1,225 @@
+"""
+Facet katalog: jumlah buku per kategori, per dekade tahun terbit dan
+yang tersedia sekarang, mengikuti pencarian yang sedang aktif
+
+Semua facet dihitung dari SATU query GROUP BY (kategori, dekade, tersedia)
+atas hasil pencarian, lalu dijumlahkan di Python. Setiap facet mengabaikan
+filternya sendiri (jumlah kategori tetap terlihat walaupun satu kategori
+sedang dipilih). Hasil query di-cache per pencarian yang dinormalisasi,
+query dijalankan langsung jika cache tidak bisa diakses
+"""
+import hashlib
+import logging
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, F, When
+
+from library_system.cache import CACHE_ERRORS
+from library_system.search import search_terms
+
+from .cache import get_catalog_version
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+
+# Key & umur cache hasil grouping facet (detik)
+FACETS_KEY = 'catalog:facets:{version}:{digest}'
+FACETS_TIMEOUT = 600
+
+# Nama parameter GET untuk filter facet
+FACET_PARAMS = ('category', 'decade', 'available')
+
+# Pilihan urutan katalog (?sort=...), '' = bawaan (terbaru / relevansi)
+CATALOG_SORT_CHOICES = (
+    ('', 'Terbaru'),
+    ('popular', 'Terpopuler'),
+)
+
+
+def parse_catalog_filters(params):
+    """
+    Ambil filter facet dari query string, nilai yang tidak valid diabaikan
+    Returns: dict {'category': str|None, 'decade': int|None, 'available': bool}
+    """
+    category = params.get('category') or None
+    if category not in dict(Book.CATEGORY_CHOICES):
+        category = None
+
+    try:
+        decade = int(params.get('decade', ''))
+        decade -= decade % 10
+    except ValueError:
+        decade = None
+
+    return {
+        'category': category,
+        'decade': decade,
+        'available': params.get('available') == '1',
+    }
+
+
+def parse_catalog_sort(params):
+    """Urutan katalog dari query string, nilai yang tidak valid diabaikan"""
+    sort = params.get('sort', '')
+    return sort if sort in dict(CATALOG_SORT_CHOICES) else ''
+
+
+def build_sort_options(request, sort):
+    """Pilihan urutan untuk template: list {'value', 'label', 'selected', 'url'}"""
+    return [
+        {
+            'value': value,
+            'label': label,
+            'selected': sort == value,
+            'url': _toggle_url(request, 'sort', value, not value),
+        }
+        for value, label in CATALOG_SORT_CHOICES
+    ]
+
+
+def apply_catalog_filters(queryset, filters):
+    """Terapkan filter facet ke queryset buku"""
+    if filters['category']:
+        queryset = queryset.filter(category=filters['category'])
+    if filters['decade'] is not None:
+        queryset = queryset.filter(
+            year_published__gte=filters['decade'],
+            year_published__lt=filters['decade'] + 10,
+        )
+    if filters['available']:
+        queryset = queryset.filter(available_copies__gt=0)
+    return queryset
+
+
+def _facet_rows(queryset):
+    """
+    Satu query GROUP BY (kategori, dekade, tersedia) atas queryset
+    Returns: list of (category, decade, available, jumlah)
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(
+            facet_decade=F('year_published') / 10 * 10,
+            facet_available=Case(
+                When(available_copies__gt=0, then=True),
+                default=False,
+                output_field=BooleanField(),
+            ),
+        )
+        .values('category', 'facet_decade', 'facet_available')
+        .annotate(total=Count('pk'))
+    )
+    return [
+        (row['category'], row['facet_decade'], row['facet_available'], row['total'])
+        for row in rows
+    ]
+
+
+def get_facet_rows(queryset, search_query):
+    """
+    Hasil grouping facet untuk pencarian, di-cache per pencarian ternormalisasi
+    (kata-kata pencarian huruf kecil) dan versi katalog
+    queryset: queryset buku yang SUDAH difilter pencarian, belum difilter facet
+    """
+    version = get_catalog_version()
+    if version is None:
+        return _facet_rows(queryset)
+
+    normalized = ' '.join(search_terms(search_query))
+    key = FACETS_KEY.format(
+        version=version,
+        digest=hashlib.md5(normalized.encode()).hexdigest(),
+    )
+    try:
+        rows = cache.get(key)
+    except CACHE_ERRORS:
+        logger.warning("Cache facet katalog tidak bisa dibaca", exc_info=True)
+        return _facet_rows(queryset)
+    if rows is None:
+        rows = _facet_rows(queryset)
+        try:
+            cache.set(key, rows, FACETS_TIMEOUT)
+        except CACHE_ERRORS:
+            logger.warning("Hasil facet katalog gagal disimpan ke cache", exc_info=True)
+    return rows
+
+
+def _matches(row, filters, skip):
+    """Apakah baris grouping lolos semua filter kecuali filter 'skip'"""
+    category, decade, available, total = row
+    if skip != 'category' and filters['category'] and category != filters['category']:
+        return False
+    if skip != 'decade' and filters['decade'] is not None and decade != filters['decade']:
+        return False
+    if skip != 'available' and filters['available'] and not available:
+        return False
+    return True
+
+
+def _toggle_url(request, name, value, selected):
+    """URL katalog dengan filter 'name' dipasang/dilepas (cursor direset)"""
+    params = request.GET.copy()
+    for key in ('cursor', 'fragment'):
+        params.pop(key, None)
+    if selected:
+        params.pop(name, None)
+    else:
+        params[name] = value
+    query = params.urlencode()
+    return f'{request.path}?{query}' if query else request.path
+
+
+def build_catalog_facets(request, rows, filters):
+    """
+    Susun facet untuk template dari hasil grouping
+    Returns: dict {'categories': [...], 'decades': [...], 'available': {...}}
+    setiap item berisi value, label, count, selected, url
+    """
+    category_counts = {}
+    decade_counts = {}
+    available_count = 0
+    for row in rows:
+        category, decade, available, total = row
+        if _matches(row, filters, skip='category'):
+            category_counts[category] = category_counts.get(category, 0) + total
+        if _matches(row, filters, skip='decade') and decade is not None:
+            decade_counts[decade] = decade_counts.get(decade, 0) + total
+        if _matches(row, filters, skip='available') and available:
+            available_count += total
+
+    categories = []
+    for value, label in Book.CATEGORY_CHOICES:
+        selected = filters['category'] == value
+        count = category_counts.get(value, 0)
+        if count or selected:
+            categories.append({
+                'value': value,
+                'label': label,
+                'count': count,
+                'selected': selected,
+                'url': _toggle_url(request, 'category', value, selected),
+            })
+
+    decades = []
+    for value in sorted(set(decade_counts) | ({filters['decade']} - {None}), reverse=True):
+        selected = filters['decade'] == value
+        decades.append({
+            'value': value,
+            'label': f'{value}-an',
+            'count': decade_counts.get(value, 0),
+            'selected': selected,
+            'url': _toggle_url(request, 'decade', str(value), selected),
+        })
+
+    return {
+        'categories': categories,
+        'decades': decades,
+        'available': {
+            'value': '1',
+            'label': 'Tersedia sekarang',
+            'count': available_count,
+            'selected': filters['available'],
+            'url': _toggle_url(request, 'available', '1', filters['available']),
+        },
+    }
@@ -0,0 +1,223 @@
+"""
+Feed perubahan katalog untuk kiosk offline
+
+GET /books/api/changes/                  sinkronisasi awal (seluruh katalog)
+GET /books/api/changes/?since=<cursor>   hanya perubahan setelah cursor
+
+Kiosk menyimpan 'cursor' dari response lalu memakainya sebagai since
+berikutnya. Setiap entri berisi data TERBARU objek (bukan isi perubahan),
+jadi beberapa perubahan pada objek yang sama digabung menjadi satu entri.
+Objek yang sudah dihapus dikirim sebagai tombstone (op='delete')
+
+format=ndjson (atau Accept: application/x-ndjson) mengalirkan satu entri
+per baris tanpa batas halaman, cocok untuk sinkronisasi awal yang besar;
+baris terakhir berisi {"cursor": ...}
+
+Log dibaca urut (txid, seq) dan hanya sampai transaksi tertua yang masih
+berjalan (xmin snapshot): transaksi yang seq-nya lebih kecil tapi commit
+belakangan tidak terlewat. Cursor berbentuk '<txid>-<seq>'
+
+Log disimpan FEED_RETENTION_DAYS hari (task prune_catalog_changes). Cursor
+yang lebih tua dari log terakhir yang dihapus dijawab 410 Gone: kiosk harus
+sinkronisasi awal lagi (tombstone setelah cursor itu sudah hilang)
+"""
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .api import (
+    COPY_API_FIELDS, DEFAULT_DETAIL_FIELDS, JSON_PARAMS, api_error, api_response,
+    book_columns, serialize_book,
+)
+from .models import Book, BookCopy, CatalogChange
+
+
+# Jumlah log perubahan yang dibaca per batch / per halaman JSON
+FEED_BATCH_SIZE = 500
+
+# Lama log perubahan disimpan (hari)
+FEED_RETENTION_DAYS = 30
+
+# Field buku & salinan di setiap entri feed
+BOOK_FEED_FIELDS = [name for name in DEFAULT_DETAIL_FIELDS if name != 'copies']
+COPY_FEED_FIELDS = ('book_id',) + COPY_API_FIELDS
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def _book_rows(ids=None):
+    books = Book.objects.order_by('pk')
+    if ids is not None:
+        books = books.filter(pk__in=ids)
+    return books.values(*book_columns(BOOK_FEED_FIELDS))
+
+
+def _copy_rows(ids=None):
+    copies = BookCopy.objects.order_by('pk')
+    if ids is not None:
+        copies = copies.filter(pk__in=ids)
+    return copies.values(*COPY_FEED_FIELDS)
+
+
+def _upsert(kind, row, seq=None):
+    data = serialize_book(row, BOOK_FEED_FIELDS) if kind == 'book' else row
+    return {'seq': seq, 'type': kind, 'id': row['id'], 'op': 'upsert', 'data': data}
+
+
+def snapshot_entries(chunk_size=1000):
+    """Seluruh buku & salinan sebagai entri upsert (dibaca bertahap)"""
+    for row in _book_rows().iterator(chunk_size=chunk_size):
+        yield _upsert('book', row)
+    for row in _copy_rows().iterator(chunk_size=chunk_size):
+        yield _upsert('copy', row)
+
+
+def change_entries(changes):
+    """
+    Log perubahan -> entri feed (data terbaru atau tombstone)
+    Objek yang berubah beberapa kali hanya dikirim sekali, pada seq terakhirnya
+    """
+    latest = {}
+    for change in changes:
+        latest.pop((change.kind, change.object_id), None)
+        latest[(change.kind, change.object_id)] = change.seq
+
+    ids = {'book': [], 'copy': []}
+    for kind, object_id in latest:
+        ids[kind].append(object_id)
+    rows = {
+        'book': {row['id']: row for row in _book_rows(ids['book'])} if ids['book'] else {},
+        'copy': {row['id']: row for row in _copy_rows(ids['copy'])} if ids['copy'] else {},
+    }
+
+    entries = []
+    for (kind, object_id), seq in latest.items():
+        row = rows[kind].get(object_id)
+        if row is None:
+            entries.append({'seq': seq, 'type': kind, 'id': object_id, 'op': 'delete'})
+        else:
+            entries.append(_upsert(kind, row, seq))
+    return entries
+
+
+def format_cursor(position):
+    """Posisi (txid, seq) -> cursor untuk kiosk"""
+    return '{}-{}'.format(*position)
+
+
+def _changes_after(position, horizon):
+    """Satu batch log perubahan setelah posisi (txid, seq), hanya txid < horizon"""
+    return list(
+        CatalogChange.objects.after(*position).filter(txid__lt=horizon)
+        .order_by('txid', 'seq')[:FEED_BATCH_SIZE]
+    )
+
+
+def _next_position(changes, position, horizon):
+    """
+    Posisi setelah satu batch: batch penuh berhenti di log terakhirnya,
+    selain itu semua log di bawah horizon sudah terkirim
+    """
+    if len(changes) == FEED_BATCH_SIZE:
+        return changes[-1].txid, changes[-1].seq
+    return max(position, (horizon, 0))
+
+
+def _change_batches(position):
+    """Entri perubahan setelah posisi, per batch -> (entri, posisi setelah batch)"""
+    horizon = CatalogChange.objects.horizon()
+    while True:
+        changes = _changes_after(position, horizon)
+        position = _next_position(changes, position, horizon)
+        yield change_entries(changes), position
+        if len(changes) < FEED_BATCH_SIZE:
+            return
+
+
+def _ndjson(entry, encoder=DjangoJSONEncoder(**JSON_PARAMS)):
+    return encoder.encode(entry) + '\n'
+
+
+def _ndjson_snapshot(cursor):
+    """Baris NDJSON sinkronisasi awal"""
+    for entry in snapshot_entries():
+        yield _ndjson(entry)
+    yield _ndjson({'cursor': cursor})
+
+
+def _ndjson_changes(position):
+    """Baris NDJSON semua perubahan setelah posisi (dibaca per batch)"""
+    for entries, position in _change_batches(position):
+        for entry in entries:
+            yield _ndjson(entry)
+    yield _ndjson({'cursor': format_cursor(position)})
+
+
+def _parse_since(request):
+    """since dari query string -> posisi (txid, seq), None = sinkronisasi awal"""
+    raw = request.GET.get('since', '')
+    if not raw:
+        return None
+    txid, separator, seq = raw.partition('-')
+    if not separator:
+        raise ValueError(raw)
+    position = (int(txid), int(seq))
+    if min(position) < 0:
+        raise ValueError(raw)
+    return position
+
+
+def _wants_ndjson(request):
+    return (
+        request.GET.get('format') == 'ndjson'
+        or NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+    )
+
+
+@require_GET
+@gzip_page
+def catalog_changes_api(request):
+    """
+    Feed perubahan katalog
+    JSON: {'changes': [...], 'cursor': cursor, 'has_more': bool}
+    NDJSON: satu entri per baris, baris terakhir {'cursor': cursor}
+    410: cursor sudah kedaluwarsa, kiosk harus sinkronisasi awal
+    """
+    try:
+        since = _parse_since(request)
+    except ValueError:
+        return api_error("Parameter since bukan cursor yang valid")
+    if since is not None and since < CatalogChange.objects.pruned_position():
+        return api_error("Cursor sudah kedaluwarsa, lakukan sinkronisasi awal", status=410)
+
+    if since is None:
+        # Cursor diambil SEBELUM membaca data: perubahan selama sinkronisasi
+        # akan terkirim lagi pada permintaan berikutnya
+        cursor = format_cursor((CatalogChange.objects.horizon(), 0))
+        if _wants_ndjson(request):
+            response = StreamingHttpResponse(_ndjson_snapshot(cursor), content_type=NDJSON_CONTENT_TYPE)
+        else:
+            response = api_response({'changes': list(snapshot_entries()), 'cursor': cursor, 'has_more': False})
+    elif _wants_ndjson(request):
+        response = StreamingHttpResponse(_ndjson_changes(since), content_type=NDJSON_CONTENT_TYPE)
+    else:
+        horizon = CatalogChange.objects.horizon()
+        changes = _changes_after(since, horizon)
+        response = api_response({
+            'changes': change_entries(changes),
+            'cursor': format_cursor(_next_position(changes, since, horizon)),
+            'has_more': len(changes) == FEED_BATCH_SIZE,
+        })
+
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def prune_changes():
+    """Hapus log perubahan yang lebih tua dari FEED_RETENTION_DAYS -> jumlah baris"""
+    return CatalogChange.objects.prune(timezone.now() - timedelta(days=FEED_RETENTION_DAYS))
@@ -0,0 +1,66 @@
+"""
+Cache fragment HTML kartu buku (katalog & daftar buku librarian)
+Setiap kartu di-cache per buku dengan key berisi versi buku, jadi hanya
+kartu yang datanya berubah yang dirender ulang. Satu halaman diambil
+sekaligus dengan get_many() dan yang kurang disimpan dengan set_many()
+
+Versi buku disusun dari kolom yang sudah ada di baris buku (updated_at +
+counter salinan), tanpa query tambahan: edit buku mengubah updated_at,
+tambah/hapus salinan & pinjam/kembali mengubah counter
+
+Jika cache tidak bisa diakses semua kartu dirender langsung
+"""
+import logging
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from library_system.cache import CACHE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+# Naikkan jika markup template kartu berubah (cache lama tidak terpakai)
+BOOK_CARD_VERSION = 2
+
+# Umur fragment di cache (detik); versi di key yang menjamin data tidak basi
+BOOK_CARD_TIMEOUT = 60 * 60 * 24
+
+BOOK_CARD_KEY = 'book-card:{template}:{pk}:{version}'
+
+
+def book_version(book):
+    """Versi data buku yang tampil di kartu"""
+    return f'{BOOK_CARD_VERSION}.{book.updated_at.timestamp()}.{book.copy_count}.{book.available_copies}'
+
+
+def attach_book_cards(books, template_name):
+    """
+    Isi book.card_html untuk setiap buku di halaman (dari cache atau render)
+    template_name: template satu kartu, konteksnya hanya {'book': book}
+    Returns: jumlah kartu yang dirender ulang
+    """
+    keys = {
+        BOOK_CARD_KEY.format(template=template_name, pk=book.pk, version=book_version(book)): book
+        for book in books
+    }
+    try:
+        cached = cache.get_many(keys.keys())
+    except CACHE_ERRORS:
+        logger.warning("Cache kartu buku tidak bisa dibaca", exc_info=True)
+        cached = {}
+
+    rendered = {}
+    for key, book in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(template_name, {'book': book})
+        book.card_html = mark_safe(html)
+
+    if rendered:
+        try:
+            cache.set_many(rendered, BOOK_CARD_TIMEOUT)
+        except CACHE_ERRORS:
+            logger.warning("Kartu buku gagal disimpan ke cache", exc_info=True)
+    return len(rendered)
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from books.covers import process_book_cover
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Buat varian cover (WebP/JPEG 200/400/800 px) untuk cover buku yang sudah ada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Jumlah thread pemrosesan paralel (default: 4)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Buat ulang varian semua cover walaupun sudah ada',
+        )
+
+    def _process(self, book_id, force):
+        # Tiap thread memakai koneksi database sendiri, ditutup setelah selesai
+        try:
+            return process_book_cover(book_id, force=force)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        force = options['force']
+        books = Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True)
+        book_ids = [
+            pk for pk, cover, variants in books.values_list('pk', 'cover_image', 'cover_variants')
+            if force or (variants or {}).get('source') != cover
+        ]
+        self.stdout.write(f'Memproses {len(book_ids)} cover dengan {options["workers"]} worker...')
+
+        processed = failed = 0
+        # Resize & encode Pillow melepas GIL, jadi thread cukup untuk paralel
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {executor.submit(self._process, pk, force): pk for pk in book_ids}
+            for future in as_completed(futures):
+                try:
+                    if future.result():
+                        processed += 1
+                except (OSError, ValueError) as e:
+                    failed += 1
+                    self.stderr.write(f'✗ Buku ID {futures[future]}: {e}')
+
+        self.stdout.write(f'✓ Varian cover dibuat: {processed} buku')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'✗ Gagal diproses: {failed} buku'))
+        self.stdout.write(self.style.SUCCESS('✓ Backfill cover selesai!'))
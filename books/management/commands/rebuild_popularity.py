@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang skor popularitas buku (peluruhan waktu) dari seluruh riwayat peminjaman'
+
+    def handle(self, *args, **options):
+        updated = Book.objects.rebuild_popularity()
+        self.stdout.write(f'✓ Skor popularitas dihitung ulang: {updated} buku')
+        self.stdout.write(self.style.SUCCESS('✓ Rebuild popularitas selesai!'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang counter salinan buku (copy_count & available_copies) dari tabel BookCopy'
+
+    def handle(self, *args, **options):
+        fixed = Book.objects.sync_copy_counters()
+        self.stdout.write(f'✓ Counter salinan diperbaiki: {fixed} buku')
+        self.stdout.write(self.style.SUCCESS('✓ Sinkronisasi counter selesai!'))
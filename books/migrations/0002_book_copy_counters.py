@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:54
+
+from django.db import migrations, models
+from django.db.models import Func, OuterRef, Subquery
+
+
+def backfill_copy_counters(apps, schema_editor):
+    """Isi counter salinan dari tabel BookCopy (satu UPDATE berbasis subquery)"""
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+
+    def count_copies(**filters):
+        copies = BookCopy.objects.filter(book=OuterRef('pk'), **filters).order_by().annotate(
+            total=Func('pk', function='COUNT')
+        ).values('total')
+        return Subquery(copies, output_field=models.IntegerField())
+
+    Book.objects.update(
+        copy_count=count_copies(),
+        available_copies=count_copies(is_available=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_copies',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Salinan Tersedia'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copy_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah Salinan Terdaftar'),
+        ),
+        migrations.RunPython(backfill_copy_counters, migrations.RunPython.noop),
+    ]
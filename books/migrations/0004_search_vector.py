@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from library_system.search import build_search_vector
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Isi search_vector untuk data yang sudah ada (satu UPDATE)"""
+    Book = apps.get_model('books', 'Book')
+    Book.objects.update(search_vector=build_search_vector([
+        ('title', 'indonesian', 'A'),
+        ('title', 'simple', 'A'),
+        ('isbn', 'simple', 'A'),
+        ('author', 'simple', 'B'),
+        ('publisher', 'simple', 'C'),
+        ('description', 'indonesian', 'D'),
+    ]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_book_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='book_search_idx'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_book_cover_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('book', 'Buku'), ('copy', 'Salinan Buku')], max_length=10, verbose_name='Jenis')),
+                ('object_id', models.BigIntegerField(verbose_name='ID Objek')),
+                ('action', models.CharField(choices=[('upsert', 'Tambah/Ubah'), ('delete', 'Hapus')], default='upsert', max_length=10, verbose_name='Aksi')),
+                ('txid', models.BigIntegerField(verbose_name='ID Transaksi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Perubahan Katalog',
+                'verbose_name_plural': 'Perubahan Katalog',
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['txid', 'seq'], name='catalog_change_txid_seq_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogChangePrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField(verbose_name='ID Transaksi')),
+                ('seq', models.BigIntegerField(verbose_name='Nomor Urut')),
+                ('deleted', models.PositiveIntegerField(verbose_name='Jumlah Log Dihapus')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Penghapusan Log Katalog',
+                'verbose_name_plural': 'Penghapusan Log Katalog',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_catalog_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Peringkat')),
+                ('score', models.FloatField(verbose_name='Skor')),
+                ('co_borrowers', models.PositiveIntegerField(verbose_name='Jumlah Peminjam Bersama')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='books.book', verbose_name='Buku')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books.book', verbose_name='Buku Rekomendasi')),
+            ],
+            options={
+                'verbose_name': 'Rekomendasi Buku',
+                'verbose_name_plural': 'Rekomendasi Buku',
+                'ordering': ['book', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookrecommendation',
+            constraint=models.UniqueConstraint(fields=('book', 'rank'), name='book_recommendation_rank_uniq'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Exp, Ln
+
+from books.popularity import popularity_expression
+
+
+def backfill_popularity(apps, schema_editor):
+    """Isi skor popularitas dari seluruh riwayat peminjaman (satu UPDATE)"""
+    Book = apps.get_model('books', 'Book')
+    Loan = apps.get_model('loans', 'Loan')
+
+    score = Loan.objects.filter(book_copy__book=OuterRef('pk')).order_by().values(
+        'book_copy__book'
+    ).annotate(
+        score=Ln(Sum(Exp(popularity_expression('borrowed_date'))))
+    ).values('score')
+    Book.objects.update(popularity=Coalesce(Subquery(score), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_book_recommendation'),
+        ('loans', '0003_loan_loan_active_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='popularity',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Popularitas'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-popularity', '-id'], name='book_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_book_popularity'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='book',
+            name='total_copies',
+        ),
+    ]
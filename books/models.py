@@ -1,10 +1,129 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField, TrigramWordSimilarity
+from django.db import connections, models, transaction
+from django.db.models import F, Func, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Exp, Greatest, Ln
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+import math
 import barcode
 from barcode.writer import ImageWriter
 from io import BytesIO
 from django.core.files import File
 
+from library_system.search import TEXT_CONFIG, SIMPLE_CONFIG, build_search_vector, search
+
+from .popularity import current_score, logaddexp_expression, popularity_expression, popularity_point
+
+
+# Kolom counter salinan di Book, hanya diubah lewat update F() / sync
+COPY_COUNTER_FIELDS = ('copy_count', 'available_copies')
+
+# Kolom yang hanya ditulis lewat update(), tidak ikut Book.save() biasa
+DERIVED_FIELDS = COPY_COUNTER_FIELDS + ('search_vector', 'cover_variants', 'popularity')
+
+# Kolom yang diindeks untuk full-text search: (field, config, bobot)
+BOOK_SEARCH_FIELDS = [
+    ('title', TEXT_CONFIG, 'A'),
+    ('title', SIMPLE_CONFIG, 'A'),
+    ('isbn', SIMPLE_CONFIG, 'A'),
+    ('author', SIMPLE_CONFIG, 'B'),
+    ('publisher', SIMPLE_CONFIG, 'C'),
+    ('description', TEXT_CONFIG, 'D'),
+]
+
+
+def _copy_count_subquery(**filters):
+    """Subquery COUNT salinan milik buku (OuterRef pk), bisa difilter"""
+    copies = BookCopy.objects.filter(book=OuterRef('pk'), **filters).order_by().annotate(
+        total=Func('pk', function='COUNT')
+    ).values('total')
+    return Subquery(copies, output_field=models.IntegerField())
+
+
+class BookQuerySet(models.QuerySet):
+    """QuerySet custom untuk Book"""
+
+    def search(self, text):
+        """Full-text search judul, penulis, ISBN, penerbit & deskripsi (annotate rank)"""
+        return search(self, text)
+
+    def autocomplete(self, text):
+        """
+        Cari judul/penulis dari potongan kata (boleh salah ketik sedikit)
+        Operator word similarity (%>) memakai GIN index pg_trgm dan tidak
+        membedakan huruf besar/kecil; hasil diurutkan dari yang paling mirip
+        """
+        return self.filter(
+            Q(title__trigram_word_similar=text) | Q(author__trigram_word_similar=text)
+        ).annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(text, 'title'),
+                TrigramWordSimilarity(text, 'author'),
+            )
+        ).order_by('-similarity', 'title')
+
+    def update_search_vector(self):
+        """Hitung ulang kolom search_vector (satu UPDATE untuk semua baris queryset)"""
+        return self.update(search_vector=build_search_vector(BOOK_SEARCH_FIELDS))
+
+    def adjust_copy_counters(self, copies=0, available=0):
+        """
+        Tambah/kurangi counter salinan secara atomik di database (F expression)
+        Dipakai saat salinan dibuat/dihapus dan saat dipinjam/dikembalikan
+        """
+        return self.update(
+            copy_count=F('copy_count') + copies,
+            available_copies=F('available_copies') + available,
+        )
+
+    def record_borrow(self, when, count=1):
+        """
+        Tambahkan peminjaman ke skor popularitas (satu UPDATE, logaddexp di SQL)
+        count: jumlah peminjaman sekaligus untuk jalur bulk
+        """
+        return self.update(
+            popularity=logaddexp_expression('popularity', popularity_point(when) + math.log(count))
+        )
+
+    def rebuild_popularity(self):
+        """
+        Hitung ulang skor popularitas dari seluruh riwayat Loan (satu UPDATE)
+        Dipakai untuk backfill & koreksi, lihat command rebuild_popularity
+        """
+        from loans.models import Loan
+
+        score = Loan.objects.filter(book_copy__book=OuterRef('pk')).order_by().values(
+            'book_copy__book'
+        ).annotate(
+            score=Ln(Sum(Exp(popularity_expression('borrowed_date'))))
+        ).values('score')
+        return self.update(popularity=Coalesce(Subquery(score), 0.0))
+
+    def popular(self):
+        """Buku yang pernah dipinjam, urut popularitas (index book_popularity_idx)"""
+        return self.filter(popularity__gt=0).order_by('-popularity', '-id')
+
+    def sync_copy_counters(self):
+        """
+        Hitung ulang copy_count & available_copies dari tabel BookCopy
+        Satu UPDATE berbasis subquery, hanya baris yang selisih yang ditulis
+        Returns: jumlah buku yang diperbaiki
+        """
+        real_count = _copy_count_subquery()
+        real_available = _copy_count_subquery(is_available=True)
+        drifted = self.annotate(
+            real_count=real_count,
+            real_available=real_available,
+        ).exclude(
+            copy_count=F('real_count'),
+            available_copies=F('real_available'),
+        ).values('pk')
+        return Book.objects.filter(pk__in=drifted).update(
+            copy_count=real_count,
+            available_copies=real_available,
+        )
+
 
 class Book(models.Model):
     """
@@ -28,9 +147,18 @@ class Book(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, verbose_name='Kategori')
     description = models.TextField(blank=True, null=True, verbose_name='Deskripsi')
     cover_image = models.ImageField(upload_to='books/covers/', blank=True, null=True, verbose_name='Cover Buku')
+    # Versi cover yang diperkecil (diisi task Celery, lihat books/covers.py)
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Varian Cover')
+    
+    # Counter salinan (denormalisasi dari BookCopy, dijaga oleh BookCopy.save/delete)
+    copy_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah Salinan Terdaftar')
+    available_copies = models.PositiveIntegerField(default=0, editable=False, verbose_name='Salinan Tersedia')
+    
+    # Full-text search (diisi signal post_save, lihat books/signals.py)
+    search_vector = SearchVectorField(null=True, editable=False)
     
-    # Informasi stok
-    total_copies = models.IntegerField(default=1, verbose_name='Jumlah Salinan')
+    # Popularitas dengan peluruhan waktu (log, lihat books/popularity.py)
+    popularity = models.FloatField(default=0.0, editable=False, verbose_name='Popularitas')
     
     # Rating
     rating = models.DecimalField(
@@ -45,25 +173,64 @@ class Book(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Buku'
         verbose_name_plural = 'Buku'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination katalog & daftar buku
+            models.Index(fields=['-created_at', '-id'], name='book_created_idx'),
+            # Buku populer (dashboard, urutan katalog)
+            models.Index(fields=['-popularity', '-id'], name='book_popularity_idx'),
+            GinIndex(fields=['search_vector'], name='book_search_idx'),
+            # Autocomplete (pg_trgm): pencarian kata yang mirip
+            GinIndex(fields=['title'], name='book_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['author'], name='book_author_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.author}"
     
+    def save(self, *args, **kwargs):
+        """
+        Override save method
+        Counter salinan & search_vector tidak ikut ditulis saat update biasa,
+        supaya instance lama (misal form edit) tidak menimpa hasil update F()
+        dari peminjaman
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    def get_cover_variants(self):
+        """
+        Varian cover yang sesuai dengan cover_image saat ini
+        Returns: dict {'webp': [[lebar, nama_file], ...], 'jpeg': [...]} atau {} jika belum dibuat
+        """
+        if not self.cover_image or self.cover_variants.get('source') != self.cover_image.name:
+            return {}
+        return self.cover_variants
+    
+    def get_popularity_score(self, now=None):
+        """Skor popularitas saat ini (jumlah peminjaman berbobot waktu)"""
+        return current_score(self.popularity, now or timezone.now())
+    
     def get_available_copies_count(self):
-        """Hitung jumlah salinan yang tersedia"""
-        return self.bookcopy_set.filter(is_available=True).count()
+        """Jumlah salinan yang tersedia (dari counter)"""
+        return self.available_copies
     
     def get_borrowed_copies_count(self):
-        """Hitung jumlah salinan yang dipinjam"""
-        return self.bookcopy_set.filter(is_available=False).count()
+        """Jumlah salinan yang dipinjam (dari counter)"""
+        return self.copy_count - self.available_copies
     
     def is_available(self):
         """Cek apakah ada salinan yang tersedia"""
-        return self.get_available_copies_count() > 0
+        return self.available_copies > 0
     
     def get_rating_stars(self):
         """Get rating dalam bentuk bintang untuk template"""
@@ -120,10 +287,18 @@ class BookCopy(models.Model):
     def __str__(self):
         return f"{self.book.title} - Copy #{self.copy_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Simpan state awal (buku & ketersediaan) untuk deteksi perubahan di save()"""
+        instance = super().from_db(db, field_names, values)
+        instance._counted_state = (instance.__dict__.get('book_id'), instance.__dict__.get('is_available'))
+        return instance
+    
     def save(self, *args, **kwargs):
         """
         Override save method
         Auto generate barcode saat pertama kali save
+        Counter salinan di Book diperbarui dalam transaksi yang sama
         """
         # Generate barcode jika belum ada
         if not self.barcode:
@@ -135,7 +310,39 @@ class BookCopy(models.Model):
         if not self.barcode_image:
             self.generate_barcode()
         
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            self._update_book_counters(adding, kwargs.get('update_fields'))
+    
+    def _update_book_counters(self, adding, update_fields=None):
+        """Sesuaikan copy_count & available_copies buku setelah save"""
+        counted = getattr(self, '_counted_state', None)
+        if adding or counted is None:
+            self._adjust_book(self.book_id, copies=1, available=int(self.is_available))
+            self._counted_state = (self.book_id, self.is_available)
+            return
+        
+        # Field yang tidak ikut update_fields tidak berubah di database
+        old_book_id, old_available = counted
+        saved = set(update_fields) if update_fields is not None else None
+        book_id = self.book_id if saved is None or saved & {'book', 'book_id'} else old_book_id
+        available = self.is_available if saved is None or 'is_available' in saved else old_available
+        
+        if book_id != old_book_id:
+            self._adjust_book(old_book_id, copies=-1, available=-int(old_available))
+            self._adjust_book(book_id, copies=1, available=int(available))
+        elif available != old_available:
+            self._adjust_book(book_id, available=1 if available else -1)
+        self._counted_state = (book_id, available)
+    
+    def _adjust_book(self, book_id, copies=0, available=0):
+        """Update counter di database + instance buku yang sudah ter-cache"""
+        Book.objects.filter(pk=book_id).adjust_copy_counters(copies=copies, available=available)
+        CatalogChange.objects.record('book', [book_id])
+        if BookCopy.book.is_cached(self) and self.book.pk == book_id:
+            self.book.copy_count += copies
+            self.book.available_copies += available
     
     def generate_barcode(self):
         """Generate barcode image"""
@@ -158,4 +365,140 @@ class BookCopy(models.Model):
         return Loan.objects.filter(
             book_copy=self,
             status__in=['dipinjam', 'terlambat']
-        ).first()
\ No newline at end of file
+        ).first()
+
+class CurrentTransactionId(Func):
+    """ID transaksi PostgreSQL yang sedang berjalan (xid8 sebagai bigint)"""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class CatalogChangeQuerySet(models.QuerySet):
+    
+    def record(self, kind, ids, action='upsert'):
+        """
+        Catat perubahan beberapa objek sekaligus (satu INSERT)
+        Dipanggil dari signal, dan WAJIB dipanggil manual oleh jalur bulk
+        (update()/bulk_update() tidak memicu signal)
+        """
+        return self.bulk_create([
+            self.model(kind=kind, object_id=pk, action=action, txid=CurrentTransactionId())
+            for pk in dict.fromkeys(ids)
+        ])
+    
+    def horizon(self):
+        """
+        ID transaksi tertua yang masih berjalan (xmin snapshot saat ini)
+        Semua transaksi dengan ID lebih kecil sudah selesai (commit/rollback),
+        jadi log dengan txid < horizon tidak akan bertambah lagi
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+            return cursor.fetchone()[0]
+    
+    def after(self, txid, seq):
+        """Log setelah posisi (txid, seq) pada urutan baca feed"""
+        return self.filter(Q(txid__gt=txid) | Q(txid=txid, seq__gt=seq))
+    
+    def prune(self, before):
+        """
+        Hapus log perubahan yang dicatat sebelum waktu tertentu -> jumlah baris
+        Yang dihapus adalah semua log sampai posisi (txid, seq) terakhir di
+        antaranya, posisi itu dicatat di CatalogChangePrune: cursor kiosk di
+        bawahnya sudah kehilangan perubahan
+        """
+        last = self.filter(created_at__lt=before).order_by('-txid', '-seq').values_list('txid', 'seq').first()
+        if last is None:
+            return 0
+        with transaction.atomic():
+            txid, seq = last
+            deleted, _ = self.filter(Q(txid__lt=txid) | Q(txid=txid, seq__lte=seq)).delete()
+            CatalogChangePrune.objects.create(txid=txid, seq=seq, deleted=deleted)
+        return deleted
+    
+    def pruned_position(self):
+        """Posisi (txid, seq) log terakhir yang sudah dihapus, (0, 0) jika belum pernah"""
+        return CatalogChangePrune.objects.order_by('-txid', '-seq').values_list('txid', 'seq').first() or (0, 0)
+
+
+class CatalogChange(models.Model):
+    """
+    Log perubahan katalog (Book & BookCopy) untuk sinkronisasi kiosk
+    seq naik terus (sequence database), txid = transaksi yang mencatatnya.
+    Feed membaca urut (txid, seq) dan hanya sampai transaksi tertua yang
+    masih berjalan, jadi perubahan yang commit belakangan tidak terlewat.
+    Isi data tidak disimpan di sini: feed mengirim data terbaru objek, atau
+    tombstone jika sudah dihapus
+    """
+    KIND_CHOICES = [
+        ('book', 'Buku'),
+        ('copy', 'Salinan Buku'),
+    ]
+    ACTION_CHOICES = [
+        ('upsert', 'Tambah/Ubah'),
+        ('delete', 'Hapus'),
+    ]
+    
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Jenis')
+    object_id = models.BigIntegerField(verbose_name='ID Objek')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default='upsert', verbose_name='Aksi')
+    txid = models.BigIntegerField(verbose_name='ID Transaksi')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = CatalogChangeQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Perubahan Katalog'
+        verbose_name_plural = 'Perubahan Katalog'
+        ordering = ['seq']
+        indexes = [
+            # Urutan baca feed
+            models.Index(fields=['txid', 'seq'], name='catalog_change_txid_seq_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.kind} {self.object_id}"
+
+
+class CatalogChangePrune(models.Model):
+    """
+    Riwayat penghapusan log perubahan katalog (task prune_catalog_changes)
+    (txid, seq) = posisi log terakhir yang dihapus; feed menolak cursor di
+    bawah posisi terbaru karena tombstone setelah cursor itu sudah hilang
+    """
+    txid = models.BigIntegerField(verbose_name='ID Transaksi')
+    seq = models.BigIntegerField(verbose_name='Nomor Urut')
+    deleted = models.PositiveIntegerField(verbose_name='Jumlah Log Dihapus')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Penghapusan Log Katalog'
+        verbose_name_plural = 'Penghapusan Log Katalog'
+    
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d} s/d {self.txid}-{self.seq} ({self.deleted} log)"
+
+
+class BookRecommendation(models.Model):
+    """
+    Rekomendasi "peminjam buku ini juga meminjam" (dihitung ulang tiap malam)
+    Hanya K tetangga terbaik per buku yang disimpan, lihat books/recommendations.py
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='recommendations', verbose_name='Buku')
+    recommended = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name='Buku Rekomendasi')
+    rank = models.PositiveSmallIntegerField(verbose_name='Peringkat')
+    score = models.FloatField(verbose_name='Skor')
+    co_borrowers = models.PositiveIntegerField(verbose_name='Jumlah Peminjam Bersama')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Rekomendasi Buku'
+        verbose_name_plural = 'Rekomendasi Buku'
+        ordering = ['book', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='book_recommendation_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} -> {self.recommended_id} (#{self.rank})"
@@ -0,0 +1,66 @@
+"""
+Skor popularitas buku dengan peluruhan waktu (exponential decay)
+Setiap peminjaman bernilai 1 lalu meluruh setengahnya setiap
+POPULARITY_HALF_LIFE_DAYS hari, jadi buku yang sering dipinjam akhir-akhir
+ini naik dan favorit lama perlahan turun
+
+Supaya tidak perlu menghitung ulang semua buku setiap waktu berjalan, yang
+disimpan adalah log dari jumlah bobot relatif ke titik acuan tetap (epoch):
+    popularity = ln( sum exp(rate * (t_pinjam - epoch)) )
+Urutan popularity sama dengan urutan skor saat ini untuk semua buku (semua
+dikali faktor exp(-rate * (now - epoch)) yang sama), sehingga bisa diindeks
+Peminjaman baru cukup satu UPDATE: popularity = logaddexp(popularity, x)
+
+Nilai 0 berarti belum pernah dipinjam (setara satu peminjaman di epoch,
+bobotnya sudah hampir nol)
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+
+# Waktu paruh bobot satu peminjaman (hari)
+POPULARITY_HALF_LIFE_DAYS = 30
+
+# Titik acuan tetap (jangan diubah tanpa rebuild_popularity)
+POPULARITY_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+# Laju peluruhan per detik
+DECAY_RATE = math.log(2) / (POPULARITY_HALF_LIFE_DAYS * 86400)
+
+
+def popularity_point(when):
+    """Nilai log satu peminjaman pada waktu 'when'"""
+    return DECAY_RATE * (when - POPULARITY_EPOCH).total_seconds()
+
+
+def current_score(popularity, now):
+    """
+    Skor saat ini (jumlah peminjaman berbobot, 1 = satu peminjaman hari ini)
+    Returns: 0.0 untuk buku yang belum pernah dipinjam
+    """
+    if not popularity:
+        return 0.0
+    return math.exp(popularity - popularity_point(now))
+
+
+def logaddexp_expression(field, value):
+    """
+    Ekspresi SQL ln(exp(field) + exp(value)) yang stabil secara numerik:
+    max(a, b) + ln(1 + exp(-|a - b|))
+    """
+    value = Value(float(value), output_field=FloatField())
+    return Greatest(F(field), value) + Ln(1 + Exp(-Abs(F(field) - value)))
+
+
+class EpochSeconds(Func):
+    """EXTRACT(EPOCH FROM kolom) sebagai double precision (PostgreSQL)"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)::double precision'
+    output_field = FloatField()
+
+
+def popularity_expression(date_field):
+    """Ekspresi bobot log satu peminjaman dari kolom tanggal pinjam"""
+    return DECAY_RATE * (EpochSeconds(date_field) - POPULARITY_EPOCH.timestamp())
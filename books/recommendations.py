@@ -0,0 +1,153 @@
+"""
+Rekomendasi "peminjam buku ini juga meminjam"
+Dihitung tiap malam (task Celery) dari seluruh riwayat Loan, disimpan di
+tabel BookRecommendation, sehingga halaman detail cukup membaca K baris
+lewat index (book, rank) tanpa menghitung apa pun
+
+Perhitungan dalam satu pass berurutan per anggota:
+- baris (anggota, buku) dibaca streaming dari database, urut anggota lalu
+  pinjaman terbaru
+- id buku dipetakan ke index rapat 0..n-1 (array), jumlah peminjam per buku
+  disimpan di array.array
+- pasangan buku yang dipinjam anggota yang sama dihitung di Counter dengan
+  satu key integer (i << 32 | j, i < j), matriks anggota x buku tidak
+  pernah dibuat
+Skor memakai cosine similarity (co_borrowers / sqrt(peminjam_a x peminjam_b))
+supaya buku yang sangat populer tidak muncul sebagai rekomendasi semua buku
+"""
+import heapq
+import math
+from array import array
+from collections import Counter
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import BookRecommendation
+
+
+# Jumlah rekomendasi yang disimpan per buku
+TOP_K = 8
+
+# Minimal jumlah anggota yang meminjam kedua buku
+MIN_CO_BORROWERS = 2
+
+# Anggota dengan riwayat sangat panjang (misal akun guru/kelas) dibatasi
+# ke buku yang paling baru dipinjam supaya jumlah pasangan tidak meledak
+# (pasangan = n^2 / 2)
+MAX_BOOKS_PER_MEMBER = 200
+
+# Pasangan index buku (i, j) disimpan sebagai satu integer
+PAIR_SHIFT = 32
+PAIR_MASK = (1 << PAIR_SHIFT) - 1
+
+
+def _member_books():
+    """
+    Pasangan (member_id, book_id) unik, streaming & urut per anggota,
+    di dalam satu anggota urut tanggal pinjam terakhir (terbaru dulu)
+    """
+    from loans.models import Loan
+
+    return (
+        Loan.objects.values('member_id', 'book_copy__book_id')
+        .annotate(last_borrowed=Max('borrowed_date'))
+        .order_by('member_id', '-last_borrowed', 'book_copy__book_id')
+        .values_list('member_id', 'book_copy__book_id')
+        .iterator(chunk_size=5000)
+    )
+
+
+def count_co_borrows(rows, max_books=MAX_BOOKS_PER_MEMBER):
+    """
+    Hitung peminjam per buku & peminjam bersama per pasangan buku
+    rows: iterable (member_id, book_id) urut member_id, tanpa duplikat,
+      terbaru dulu di dalam satu anggota (hanya max_books pertama yang dihitung)
+    Returns: (book_ids, borrowers, pairs)
+      book_ids: array id buku (index -> id)
+      borrowers: array jumlah peminjam per index buku
+      pairs: Counter {i << 32 | j: jumlah peminjam bersama}, i < j
+    """
+    index = {}
+    book_ids = array('q')
+    borrowers = array('l')
+    pairs = Counter()
+
+    for member_id, group in groupby(rows, key=itemgetter(0)):
+        books = []
+        for _, book_id in islice(group, max_books):
+            position = index.get(book_id)
+            if position is None:
+                position = index[book_id] = len(book_ids)
+                book_ids.append(book_id)
+                borrowers.append(0)
+            borrowers[position] += 1
+            books.append(position)
+
+        books.sort()
+        for a in range(len(books)):
+            for b in range(a + 1, len(books)):
+                pairs[books[a] << PAIR_SHIFT | books[b]] += 1
+
+    return book_ids, borrowers, pairs
+
+
+def top_neighbours(book_ids, borrowers, pairs, top_k=TOP_K, min_co_borrowers=MIN_CO_BORROWERS):
+    """
+    Pilih top-K tetangga per buku
+    Returns: dict {book_id: [(recommended_id, score, co_borrowers), ...]} urut skor
+    """
+    candidates = {}
+    for key, count in pairs.items():
+        if count < min_co_borrowers:
+            continue
+        a, b = key >> PAIR_SHIFT, key & PAIR_MASK
+        score = count / math.sqrt(borrowers[a] * borrowers[b])
+        candidates.setdefault(a, []).append((score, count, b))
+        candidates.setdefault(b, []).append((score, count, a))
+
+    return {
+        book_ids[position]: [
+            (book_ids[other], score, count)
+            for score, count, other in heapq.nlargest(top_k, neighbours)
+        ]
+        for position, neighbours in candidates.items()
+    }
+
+
+def build_book_recommendations(top_k=TOP_K, min_co_borrowers=MIN_CO_BORROWERS):
+    """
+    Hitung ulang seluruh rekomendasi & ganti isi tabel dalam satu transaksi
+    Returns: jumlah baris rekomendasi yang disimpan
+    """
+    book_ids, borrowers, pairs = count_co_borrows(_member_books())
+    neighbours = top_neighbours(book_ids, borrowers, pairs, top_k, min_co_borrowers)
+
+    rows = [
+        BookRecommendation(
+            book_id=book_id,
+            recommended_id=recommended_id,
+            rank=rank,
+            score=score,
+            co_borrowers=count,
+        )
+        for book_id, items in neighbours.items()
+        for rank, (recommended_id, score, count) in enumerate(items, start=1)
+    ]
+
+    with transaction.atomic():
+        BookRecommendation.objects.all().delete()
+        BookRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def get_recommendations(book, limit=TOP_K):
+    """Rekomendasi tersimpan untuk satu buku (satu query lewat index)"""
+    return [
+        item.recommended
+        for item in BookRecommendation.objects.filter(book=book)
+        .select_related('recommended')
+        .order_by('rank')[:limit]
+    ]
@@ -0,0 +1,80 @@
+"""
+Signals untuk menjaga kolom turunan di Book
+- Counter salinan: penambahan & perubahan ketersediaan ditangani
+  BookCopy.save(), penghapusan (termasuk lewat queryset/cascade) di sini
+- search_vector: dihitung ulang setelah buku disimpan
+- Versi katalog: dinaikkan setiap buku/salinan berubah (cache facet dll)
+- Varian cover: dibuat ulang (task Celery) saat cover_image berubah
+- Feed perubahan katalog (CatalogChange) untuk kiosk: tambah/ubah/hapus
+  buku & salinan; perubahan counter buku dicatat di BookCopy._adjust_book()
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import BOOK_SEARCH_FIELDS, Book, BookCopy, CatalogChange
+from .tasks import generate_cover_variants
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Book)
+def update_book_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Hitung ulang search_vector buku (dilewati jika kolom teks tidak ikut disimpan)"""
+    if update_fields is not None and not {name for name, config, weight in BOOK_SEARCH_FIELDS} & set(update_fields):
+        return
+    Book.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Book)
+def queue_cover_variants(sender, instance, update_fields=None, **kwargs):
+    """Antrekan pembuatan varian cover jika cover berbeda dari sumber varian"""
+    if update_fields is not None and 'cover_image' not in update_fields:
+        return
+    current = instance.cover_image.name if instance.cover_image else None
+    if instance.cover_variants.get('source') == current:
+        return
+    book_id = instance.pk
+
+    def queue():
+        # Broker mati tidak menggagalkan request: halaman memakai cover asli
+        try:
+            generate_cover_variants.delay(book_id)
+        except Exception:
+            logger.exception("Gagal mengantrekan varian cover buku %s", book_id)
+    transaction.on_commit(queue)
+
+
+@receiver(post_delete, sender=BookCopy)
+def decrement_copy_counters(sender, instance, **kwargs):
+    """Kurangi counter buku saat salinan dihapus"""
+    Book.objects.filter(pk=instance.book_id).adjust_copy_counters(
+        copies=-1,
+        available=-int(instance.is_available),
+    )
+    CatalogChange.objects.record('book', [instance.book_id])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=BookCopy)
+def record_catalog_upsert(sender, instance, **kwargs):
+    """Catat buku/salinan yang ditambah atau diubah ke feed perubahan"""
+    CatalogChange.objects.record('book' if sender is Book else 'copy', [instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=BookCopy)
+def record_catalog_delete(sender, instance, **kwargs):
+    """Catat buku/salinan yang dihapus (tombstone di feed perubahan)"""
+    CatalogChange.objects.record('book' if sender is Book else 'copy', [instance.pk], action='delete')
+
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookCopy)
+def bump_catalog_version_on_change(sender, **kwargs):
+    """Naikkan versi katalog setelah transaksi commit"""
+    transaction.on_commit(bump_catalog_version)
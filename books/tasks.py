@@ -0,0 +1,57 @@
+"""
+Celery tasks untuk books app
+"""
+from celery import shared_task
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_cover_variants(self, book_id, force=False):
+    """
+    Task untuk membuat varian cover (WebP/JPEG 200/400/800 px) setelah upload
+
+    Args:
+        book_id: ID dari Book object
+        force: buat ulang walaupun cover tidak berubah
+    """
+    from books.covers import process_book_cover
+
+    try:
+        if process_book_cover(book_id, force=force):
+            print(f"[CELERY] ✓ Varian cover buku ID {book_id} dibuat")
+            return f"Cover variants generated for book {book_id}"
+        return f"Cover variants for book {book_id} up to date"
+
+    except (OSError, ValueError) as e:
+        # File rusak / bukan gambar: tidak perlu retry
+        print(f"[CELERY] ✗ Cover buku ID {book_id} tidak bisa diproses: {str(e)}")
+        return f"Cover for book {book_id} could not be processed"
+
+    except Exception as e:
+        print(f"[CELERY] ✗ Error generating cover variants: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task
+def build_book_recommendations():
+    """
+    Periodic task: Hitung ulang rekomendasi "peminjam juga meminjam"
+    Dijalankan setiap hari jam 02:00 (lihat settings.py CELERY_BEAT_SCHEDULE)
+    """
+    from books.recommendations import build_book_recommendations as build
+
+    count = build()
+    print(f"[CELERY] ✓ {count} rekomendasi buku disimpan")
+    return f"{count} book recommendations stored"
+
+
+@shared_task
+def prune_catalog_changes():
+    """
+    Periodic task: Hapus log perubahan katalog yang sudah lewat masa simpan
+    Dijalankan setiap hari jam 03:00 (lihat settings.py CELERY_BEAT_SCHEDULE)
+    """
+    from books.feed import prune_changes
+
+    count = prune_changes()
+    print(f"[CELERY] ✓ {count} log perubahan katalog dihapus")
+    return f"{count} catalog changes pruned"
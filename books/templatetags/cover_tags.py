@@ -0,0 +1,23 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+
+@register.filter
+def cover_srcset(book, fmt='jpeg'):
+    """srcset varian cover, contoh: {{ book|cover_srcset:'webp' }} ('' jika belum ada)"""
+    variants = book.get_cover_variants().get(fmt, [])
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in variants)
+
+
+@register.filter
+def cover_url(book, width=400):
+    """URL cover JPEG terkecil yang lebarnya >= width (cover asli jika belum ada varian)"""
+    variants = book.get_cover_variants().get('jpeg', [])
+    if not variants:
+        return book.cover_image.url
+    for variant_width, name in variants:
+        if variant_width >= int(width):
+            return default_storage.url(name)
+    return default_storage.url(variants[-1][1])
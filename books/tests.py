@@ -1,3 +1,644 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import math
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from librarian.tests import CACHE_DOWN
+
+from loans.models import Loan
+from loans.services import borrow_copy, checkout_copies, return_copies, return_copy
+from loans.tests import make_book, make_member
+
+from library_system.pagination import InvalidCursor, KeysetPaginator
+from library_system.testing import TestCase, TransactionTestCase
+
+from .api import BOOK_API_FIELDS, DEFAULT_LIST_FIELDS
+from .cache import bump_catalog_version
+from .detail import load_book_detail
+from .feed import prune_changes
+from .recommendations import _member_books, build_book_recommendations, count_co_borrows
+from .facets import get_facet_rows
+from .models import Book, BookCopy, CatalogChange
+from .popularity import DECAY_RATE, POPULARITY_EPOCH, POPULARITY_HALF_LIFE_DAYS
+
+
+def encode_raw_cursor(values):
+    """Cursor buatan sendiri (seperti yang bisa dikirim user)"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+class CopyCountersTestCase(TestCase):
+    """
+    copy_count & available_copies dijaga di banyak jalur (save, signal hapus,
+    jalur massal sirkulasi); setelah setiap jalur sync_copy_counters() harus
+    tidak menemukan selisih
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.book = make_book('9780000000001', copies=3)
+        self.other = make_book('9780000000002', copies=1)
+        self.copies = list(self.book.bookcopy_set.order_by('copy_number'))
+
+    def assertCounters(self, book, copy_count, available):
+        book.refresh_from_db()
+        self.assertEqual((book.copy_count, book.available_copies), (copy_count, available))
+        self.assertEqual(Book.objects.sync_copy_counters(), 0)
+
+    def test_create(self):
+        self.assertCounters(self.book, 3, 3)
+        BookCopy.objects.create(book=self.book, copy_number=4, is_available=False)
+        self.assertCounters(self.book, 4, 3)
+
+    def test_save_availability(self):
+        copy = self.copies[0]
+        copy.is_available = False
+        copy.save(update_fields=['is_available'])
+        self.assertCounters(self.book, 3, 2)
+
+        # save() penuh dengan nilai yang sama tidak menghitung dua kali
+        copy.save()
+        self.assertCounters(self.book, 3, 2)
+
+        copy = BookCopy.objects.get(pk=copy.pk)
+        copy.is_available = True
+        copy.save()
+        self.assertCounters(self.book, 3, 3)
+
+    def test_save_ignores_fields_not_saved(self):
+        copy = self.copies[0]
+        copy.is_available = False
+        copy.save(update_fields=['condition'])
+        self.assertCounters(self.book, 3, 3)
+
+    def test_move_to_other_book(self):
+        copy = self.copies[0]
+        copy.is_available = False
+        copy.save(update_fields=['is_available'])
+
+        copy.book = self.other
+        copy.copy_number = 2
+        copy.save()
+        self.assertCounters(self.book, 2, 2)
+        self.assertCounters(self.other, 2, 1)
+
+    def test_delete_instance(self):
+        self.copies[0].delete()
+        self.assertCounters(self.book, 2, 2)
+
+    def test_delete_queryset(self):
+        copy = self.copies[1]
+        copy.is_available = False
+        copy.save(update_fields=['is_available'])
+
+        BookCopy.objects.filter(pk__in=[self.copies[0].pk, copy.pk]).delete()
+        self.assertCounters(self.book, 1, 1)
+
+    def test_borrow_and_return(self):
+        member = make_member()
+        borrow_copy(member, self.copies[0].barcode)
+        self.assertCounters(self.book, 3, 2)
+
+        return_copy(self.copies[0].barcode)
+        self.assertCounters(self.book, 3, 3)
+
+    def test_bulk_checkout_and_return(self):
+        member = make_member()
+        barcodes = [copy.barcode for copy in self.copies[:2]] + [self.other.bookcopy_set.get().barcode]
+
+        checkout_copies(member, barcodes)
+        self.assertCounters(self.book, 3, 1)
+        self.assertCounters(self.other, 1, 0)
+
+        # Salinan yang tidak dipinjam & barcode ganda tidak mengubah counter
+        return_copies(barcodes + [self.copies[2].barcode, barcodes[0]])
+        self.assertCounters(self.book, 3, 3)
+        self.assertCounters(self.other, 1, 1)
+
+    def test_sync_fixes_drift(self):
+        Book.objects.filter(pk=self.book.pk).update(copy_count=10, available_copies=0)
+        self.assertEqual(Book.objects.sync_copy_counters(), 1)
+        self.assertCounters(self.book, 3, 3)
+
+
+class KeysetCursorTestCase(TestCase):
+    """Cursor dari query string tidak boleh membuat halaman error"""
+
+    BAD_CURSORS = [
+        'bukan-base64!!',
+        encode_raw_cursor({'a': 1}),
+        encode_raw_cursor([1]),
+        encode_raw_cursor([[1, 2], 3]),
+        encode_raw_cursor([{'a': 1}, 3]),
+        encode_raw_cursor(['bukan tanggal', 3]),
+        encode_raw_cursor(['2026-01-01T00:00:00', 'x']),
+        encode_raw_cursor(['2026-01-01T00:00:00', None]),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            make_book(f'978000000000{number}')
+
+    def test_invalid_cursor_raises(self):
+        paginator = KeysetPaginator(Book.objects.all(), ['-created_at'], per_page=2)
+        for cursor in self.BAD_CURSORS:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.decode_cursor(cursor)
+
+    def test_next_cursor_round_trip(self):
+        paginator = KeysetPaginator(Book.objects.all(), ['-created_at'], per_page=2)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(len(first) + len(second), 3)
+        self.assertFalse(second.has_next)
+
+    def test_pages_fall_back_to_first_page(self):
+        urls = [reverse('books:catalog'), reverse('books:api_book_list')]
+        for url in urls:
+            for cursor in self.BAD_CURSORS:
+                with self.subTest(url=url, cursor=cursor):
+                    self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 200)
+
+
+class ConditionalPageTestCase(TestCase):
+    """ETag halaman publik & API dari versi katalog di cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.book = make_book(copies=1)
+        self.urls = [
+            reverse('books:detail', args=[self.book.pk]),
+            reverse('books:api_book_list'),
+            reverse('books:api_book_detail', args=[self.book.pk]),
+        ]
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_catalog_change_changes_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        bump_catalog_version()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_recommendation_rebuild_changes_etag(self):
+        url = reverse('books:detail', args=[self.book.pk])
+        other = make_book('9780000000002', copies=1)
+        copies = [self.book.bookcopy_set.get(), other.bookcopy_set.get()]
+        for nis in ('1001', '1002'):
+            member = make_member(nis)
+            for copy in copies:
+                Loan.objects.create(member=member, book_copy=copy, status='dikembalikan')
+
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(build_book_recommendations(), 2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recommendations'], [other])
+
+    @override_settings(CACHES=CACHE_DOWN)
+    def test_cache_down_serves_without_validators(self):
+        for url in self.urls:
+            with self.subTest(url=url), self.assertLogs('books.cache', 'WARNING'):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='"lama"')
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    @override_settings(CACHES=CACHE_DOWN)
+    def test_catalog_page_cache_down(self):
+        with self.assertLogs('books', 'WARNING'):
+            response = self.client.get(reverse('books:catalog'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.book.title)
+
+    @override_settings(CACHES=CACHE_DOWN)
+    def test_bump_is_logged(self):
+        with self.assertLogs('books.cache', 'ERROR'):
+            self.assertIsNone(bump_catalog_version())
+
+
+@override_settings(CACHES=CACHE_DOWN)
+class FacetsCacheDownTestCase(TestCase):
+    """Facet katalog dihitung langsung jika cache mati"""
+
+    def test_rows_without_cache(self):
+        make_book('9780000000001', copies=1)
+        make_book('9780000000002', copies=0, category='komik')
+
+        with self.assertLogs('books.cache', 'WARNING'):
+            rows = get_facet_rows(Book.objects.all(), '')
+
+        self.assertEqual(sorted(rows), [('fiksi', 2020, True, 1), ('komik', 2020, False, 1)])
+
+
+class RecommendationHistoryTestCase(TestCase):
+    """Riwayat anggota yang sangat panjang dibatasi ke buku yang paling baru dipinjam"""
+
+    def test_member_books_most_recent_first(self):
+        member = make_member()
+        books = [make_book(f'978000000000{number}', copies=1) for number in range(3)]
+        now = timezone.now()
+        for days, book in zip((5, 1, 3), books):
+            Loan.objects.create(
+                member=member, book_copy=book.bookcopy_set.get(), status='dikembalikan',
+                borrowed_date=now - timedelta(days=days),
+            )
+        # Pinjam ulang buku pertama: tanggal terakhir yang dipakai
+        Loan.objects.create(member=member, book_copy=books[0].bookcopy_set.get(), status='dikembalikan')
+
+        self.assertEqual(
+            list(_member_books()),
+            [(member.pk, books[0].pk), (member.pk, books[1].pk), (member.pk, books[2].pk)],
+        )
+
+    def test_count_keeps_most_recent(self):
+        rows = [(1, 30), (1, 10), (1, 20), (2, 10), (2, 20)]
+        book_ids, borrowers, pairs = count_co_borrows(rows, max_books=2)
+
+        self.assertEqual(list(book_ids), [30, 10, 20])
+        self.assertEqual(list(borrowers), [1, 2, 1])
+        self.assertEqual(pairs, {0 << 32 | 1: 1, 1 << 32 | 2: 1})
+
+
+class CatalogFeedTestCase(TransactionTestCase):
+    """
+    Feed perubahan katalog untuk kiosk
+    TransactionTestCase: feed hanya mengirim log dari transaksi yang sudah
+    selesai, jadi data test harus benar-benar di-commit
+    """
+
+    def feed(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(reverse('books:api_catalog_changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def changed(self, data):
+        return {(entry['type'], entry['id'], entry['op']) for entry in data['changes']}
+
+    def test_initial_sync_then_changes(self):
+        book = make_book(copies=1)
+        data = self.feed()
+        self.assertIn(('book', book.pk, 'upsert'), self.changed(data))
+
+        other = make_book('9780000000002', copies=0)
+        book_id, copy_id = book.pk, book.bookcopy_set.get().pk
+        book.delete()
+        data = self.feed(data['cursor'])
+        self.assertEqual(self.changed(data), {
+            ('book', other.pk, 'upsert'), ('book', book_id, 'delete'), ('copy', copy_id, 'delete'),
+        })
+        self.assertFalse(data['has_more'])
+
+        self.assertEqual(self.feed(data['cursor'])['changes'], [])
+
+    def test_late_commit_is_not_skipped(self):
+        """Transaksi yang mulai lebih dulu tapi commit belakangan tetap terkirim"""
+        cursor = self.feed()['cursor']
+        written, release = threading.Event(), threading.Event()
+        slow = {}
+
+        def slow_transaction():
+            try:
+                with transaction.atomic():
+                    slow['book'] = make_book('9780000000001', copies=0)
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_transaction)
+        thread.start()
+        try:
+            self.assertTrue(written.wait(10))
+            fast = make_book('9780000000002', copies=0)
+
+            # Buku 'fast' sudah commit tapi ditahan selama transaksi lebih tua berjalan
+            data = self.feed(cursor)
+            self.assertEqual(data['changes'], [])
+            self.assertEqual(data['cursor'], cursor)
+        finally:
+            release.set()
+            thread.join()
+
+        data = self.feed(cursor)
+        self.assertEqual(self.changed(data), {
+            ('book', slow['book'].pk, 'upsert'), ('book', fast.pk, 'upsert'),
+        })
+
+    def test_ndjson_cursor(self):
+        cursor = self.feed()['cursor']
+        book = make_book(copies=0)
+        response = self.client.get(reverse('books:api_catalog_changes'), {'since': cursor, 'format': 'ndjson'})
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(line['type'], line['id']) for line in lines[:-1]], [('book', book.pk)])
+        self.assertEqual(self.feed(lines[-1]['cursor'])['changes'], [])
+
+    def test_expired_cursor(self):
+        """Cursor di bawah log yang sudah dihapus harus sinkronisasi awal"""
+        stale = self.feed()['cursor']
+        old = make_book(copies=0)
+        fresh = self.feed(stale)['cursor']
+        make_book('9780000000002', copies=0)
+        CatalogChange.objects.filter(object_id=old.pk).update(created_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(prune_changes(), 1)
+
+        response = self.client.get(reverse('books:api_catalog_changes'), {'since': stale})
+        self.assertEqual(response.status_code, 410)
+
+        # Cursor yang sudah melewati log yang dihapus tetap berjalan
+        self.assertEqual(len(self.feed(fresh)['changes']), 1)
+        self.assertEqual(len(self.feed(self.feed()['cursor'])['changes']), 0)
+
+    def test_invalid_since(self):
+        for since in ('x', '5', '-5', '1-x', '1-2-3'):
+            with self.subTest(since=since):
+                response = self.client.get(reverse('books:api_catalog_changes'), {'since': since})
+                self.assertEqual(response.status_code, 400)
+
+
+class CatalogChangePruneTestCase(TestCase):
+
+    def test_prune_keeps_recent(self):
+        old, recent = make_book(copies=0), make_book('9780000000002', copies=0)
+        CatalogChange.objects.filter(object_id=old.pk).update(created_at=timezone.now() - timedelta(days=31))
+        pruned = CatalogChange.objects.get(object_id=old.pk)
+
+        self.assertEqual(prune_changes(), 1)
+        self.assertEqual(list(CatalogChange.objects.values_list('object_id', flat=True)), [recent.pk])
+        self.assertEqual(CatalogChange.objects.pruned_position(), (pruned.txid, pruned.seq))
+
+    def test_prune_nothing_old(self):
+        make_book(copies=0)
+        self.assertEqual(prune_changes(), 0)
+        self.assertEqual(CatalogChange.objects.pruned_position(), (0, 0))
+
+
+class BookSearchTestCase(TestCase):
+    """Full-text search buku: bobot kolom, awalan kata, stemming & kolom yang selalu terbaru"""
+
+    def setUp(self):
+        super().setUp()
+        self.python = make_book('9780000000001', copies=0, title='Belajar Pemrograman Python', author='Budi Raharjo')
+        self.novel = make_book(
+            '9780000000002', copies=0, title='Laskar Pelangi', author='Andrea Hirata',
+            description='Novel tentang anak-anak Belitung yang belajar di sekolah Muhammadiyah',
+        )
+        self.other = make_book('9780000000003', copies=0, title='Bumi Manusia', author='Pramoedya Ananta Toer')
+
+    def titles(self, text):
+        return [book.title for book in Book.objects.search(text).order_by('-rank', 'pk')]
+
+    def test_title_ranks_above_description(self):
+        self.assertEqual(self.titles('belajar'), ['Belajar Pemrograman Python', 'Laskar Pelangi'])
+
+    def test_prefix_while_typing(self):
+        self.assertEqual(self.titles('lask'), ['Laskar Pelangi'])
+        self.assertEqual(self.titles('pramo'), ['Bumi Manusia'])
+
+    def test_stemmed_title(self):
+        # 'pelajaran' & 'belajar' sama-sama berkata dasar 'ajar'
+        self.assertEqual(self.titles('pelajaran python'), ['Belajar Pemrograman Python'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.titles('laskar hirata'), ['Laskar Pelangi'])
+        self.assertEqual(self.titles('laskar python'), [])
+
+    def test_isbn_and_punctuation(self):
+        self.assertEqual(self.titles('9780000000003'), ['Bumi Manusia'])
+        self.assertEqual(self.titles("laskar & | ! pelangi:*"), ['Laskar Pelangi'])
+        # Kata ulang diurai sama seperti saat diindeks
+        self.assertEqual(self.titles('anak-anak belitung'), ['Laskar Pelangi'])
+
+    def test_empty_input_keeps_queryset(self):
+        for text in ('', '  ', '&|!'):
+            with self.subTest(text=text):
+                results = Book.objects.search(text)
+                self.assertNotIn('rank', results.query.annotations)
+                self.assertEqual(results.count(), 3)
+
+    def test_vector_follows_saved_title(self):
+        self.other.title = 'Anak Semua Bangsa'
+        self.other.save()
+        self.assertEqual(self.titles('bangsa'), ['Anak Semua Bangsa'])
+        self.assertEqual(self.titles('manusia'), [])
+
+    def test_catalog_orders_by_rank(self):
+        response = self.client.get(reverse('books:catalog'), {'search': 'belajar'})
+        self.assertEqual([book.pk for book in response.context['books']], [self.python.pk, self.novel.pk])
+
+
+class BookApiTestCase(TestCase):
+    """API JSON katalog: sparse fieldset, salinan satu query per halaman, error field"""
+
+    def setUp(self):
+        super().setUp()
+        self.first = make_book('9780000000001', copies=2, title='Laskar Pelangi', description='Novel')
+        self.second = make_book('9780000000002', copies=1, title='Bumi Manusia')
+        borrow_copy(make_member(), self.first.bookcopy_set.get(copy_number=1).barcode)
+
+    def get(self, url, **params):
+        return self.client.get(url, params)
+
+    def test_default_list_fields(self):
+        results = self.get(reverse('books:api_book_list')).json()['results']
+        self.assertEqual([row['id'] for row in results], [self.second.pk, self.first.pk])
+        self.assertEqual(list(results[0]), list(DEFAULT_LIST_FIELDS))
+
+    def test_sparse_fields_select_only_needed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(reverse('books:api_book_list'), fields=' title , available,title')
+        self.assertEqual(response.json()['results'], [
+            {'title': 'Bumi Manusia', 'available': True},
+            {'title': 'Laskar Pelangi', 'available': True},
+        ])
+        book_query = next(query['sql'] for query in queries if 'ORDER BY "books_book"."created_at"' in query['sql'])
+        self.assertNotIn('"books_book"."description"', book_query)
+        self.assertFalse(any('books_bookcopy' in query['sql'] for query in queries))
+
+    def test_copies_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(reverse('books:api_book_list'), fields='id,copies')
+        copies = {row['id']: row['copies'] for row in response.json()['results']}
+        self.assertEqual(
+            [(copy['copy_number'], copy['is_available']) for copy in copies[self.first.pk]],
+            [(1, False), (2, True)],
+        )
+        self.assertEqual(len(copies[self.second.pk]), 1)
+        self.assertEqual(sum('books_bookcopy' in query['sql'] for query in queries), 1)
+
+    def test_cursor_keeps_fields(self):
+        url, ids = reverse('books:api_book_list') + '?fields=id&limit=1', []
+        while url:
+            data = self.client.get(url).json()
+            self.assertEqual([list(row) for row in data['results']], [['id']])
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [self.second.pk, self.first.pk])
+
+    def test_invalid_fields(self):
+        for url in (reverse('books:api_book_list'), reverse('books:api_book_detail', args=[self.first.pk])):
+            with self.subTest(url=url):
+                response = self.get(url, fields='title,password,__class__')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Field tidak dikenal: password, __class__'})
+
+    def test_bad_limit(self):
+        response = self.get(reverse('books:api_book_list'), limit='semua')
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        url = reverse('books:api_book_detail', args=[self.first.pk])
+        data = self.get(url).json()
+        self.assertEqual(list(data), list(BOOK_API_FIELDS))
+        self.assertEqual((data['copy_count'], data['available_copies'], len(data['copies'])), (2, 1, 2))
+
+        self.assertEqual(self.get(url, fields='isbn,available').json(), {'isbn': '9780000000001', 'available': True})
+        missing = self.get(reverse('books:api_book_detail', args=[self.second.pk + 100]))
+        self.assertEqual(missing.status_code, 404)
+
+
+class BookDetailLoaderTestCase(TestCase):
+    """load_book_detail: status tiap salinan dengan jumlah query tetap"""
+
+    def setUp(self):
+        super().setUp()
+        self.book = make_book(copies=4)
+        self.copies = list(self.book.bookcopy_set.order_by('copy_number'))
+        self.member, self.late_member = make_member(), make_member('1002')
+        self.loan = borrow_copy(self.member, self.copies[0].barcode)
+        self.late = borrow_copy(self.late_member, self.copies[1].barcode, now=timezone.now() - timedelta(days=10))
+        borrow_copy(self.member, self.copies[2].barcode)
+        return_copy(self.copies[2].barcode)
+        # Ditandai tidak tersedia tanpa peminjaman aktif (mis. sedang diperbaiki)
+        BookCopy.objects.filter(pk=self.copies[3].pk).update(is_available=False)
+
+    def test_status_map(self):
+        with self.assertNumQueries(2):
+            detail = load_book_detail(self.book)
+
+        self.assertEqual([copy.pk for copy in detail.copies], [copy.pk for copy in self.copies])
+        statuses = [detail.status_map[copy.pk] for copy in self.copies]
+        self.assertEqual(
+            [status.status for status in statuses],
+            ['dipinjam', 'terlambat', 'tersedia', 'tidak_tersedia'],
+        )
+        self.assertEqual([status.loan for status in statuses[:2]], [self.loan, self.late])
+        self.assertEqual(statuses[1].due_date, self.late.due_date)
+        self.assertIsNone(detail.total_loans)
+
+    def test_query_count_independent_of_copies(self):
+        for number in range(5, 25):
+            BookCopy.objects.create(book=self.book, copy_number=number)
+        with self.assertNumQueries(2):
+            detail = load_book_detail(self.book)
+        self.assertEqual(len(detail.copies), 24)
+
+    def test_with_borrowers(self):
+        with self.assertNumQueries(2):
+            detail = load_book_detail(self.book, with_borrowers=True)
+        with self.assertNumQueries(0):
+            borrowers = [detail.status_map[copy.pk].member for copy in detail.copies]
+        self.assertEqual(borrowers, [self.member, self.late_member, None, None])
+
+    def test_with_stats(self):
+        with self.assertNumQueries(3):
+            detail = load_book_detail(self.book, with_borrowers=True, with_stats=True)
+        self.assertEqual((detail.total_loans, detail.active_loans, detail.overdue_loans), (3, 2, 1))
+
+    def test_librarian_page(self):
+        user = get_user_model().objects.create_user('petugas', password='rahasia')
+        self.client.force_login(user)
+        response = self.client.get(reverse('librarian:book_detail', args=[self.book.pk]))
+        self.assertContains(response, self.late_member.name)
+        self.assertEqual(response.context['detail'].overdue_loans, 1)
+
+
+class PopularityTestCase(TestCase):
+    """Skor popularitas: peluruhan waktu, update logaddexp & rebuild dari riwayat"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.members = iter(make_member(f'10{number:02d}') for number in range(20))
+
+    def borrow(self, book, days_ago, copy_number=1):
+        barcode = book.bookcopy_set.get(copy_number=copy_number).barcode
+        return borrow_copy(next(self.members), barcode, now=self.now - timedelta(days=days_ago))
+
+    def score(self, book, now=None):
+        book.refresh_from_db()
+        return book.get_popularity_score(now or self.now)
+
+    def test_half_life(self):
+        book = make_book(copies=1)
+        self.assertEqual(self.score(book), 0.0)
+
+        self.borrow(book, 0)
+        self.assertAlmostEqual(self.score(book), 1.0)
+        self.assertAlmostEqual(self.score(book, self.now + timedelta(days=POPULARITY_HALF_LIFE_DAYS)), 0.5)
+        self.assertAlmostEqual(self.score(book, self.now + timedelta(days=2 * POPULARITY_HALF_LIFE_DAYS)), 0.25)
+
+    def test_borrows_add_up(self):
+        book = make_book(copies=2)
+        self.borrow(book, POPULARITY_HALF_LIFE_DAYS, copy_number=1)
+        self.borrow(book, 0, copy_number=2)
+        self.assertAlmostEqual(self.score(book), 1.5)
+
+    def test_bulk_checkout_counts_each_copy(self):
+        book = make_book(copies=3)
+        checkout_copies(make_member('2001'), list(book.bookcopy_set.values_list('barcode', flat=True)), now=self.now)
+        self.assertAlmostEqual(self.score(book), 3.0)
+
+    def test_logaddexp_is_stable_for_large_values(self):
+        # exp(1000) tidak muat di double precision; hasil tetap 1000 + ln 2
+        book = make_book(copies=0)
+        Book.objects.filter(pk=book.pk).update(popularity=1000.0)
+        when = POPULARITY_EPOCH + timedelta(seconds=1000.0 / DECAY_RATE)
+        Book.objects.filter(pk=book.pk).record_borrow(when)
+        book.refresh_from_db()
+        self.assertAlmostEqual(book.popularity, 1000.0 + math.log(2))
+
+    def test_recent_beats_old_favourite(self):
+        old, recent, never = make_book(copies=2), make_book('9780000000002', copies=1), make_book('9780000000003')
+        self.borrow(old, 3 * POPULARITY_HALF_LIFE_DAYS, copy_number=1)
+        self.borrow(old, 3 * POPULARITY_HALF_LIFE_DAYS, copy_number=2)
+        self.borrow(recent, 1)
+        self.assertEqual(list(Book.objects.popular()), [recent, old])
+        self.assertNotIn(never, Book.objects.popular())
+
+    def test_rebuild_matches_incremental(self):
+        books = [make_book(copies=2), make_book('9780000000002', copies=1), make_book('9780000000003', copies=0)]
+        self.borrow(books[0], 45, copy_number=1)
+        self.borrow(books[0], 2, copy_number=2)
+        self.borrow(books[1], 10)
+        incremental = dict(Book.objects.values_list('pk', 'popularity'))
+
+        Book.objects.update(popularity=42.0)
+        out = io.StringIO()
+        call_command('rebuild_popularity', stdout=out)
+
+        self.assertIn('✓ Skor popularitas dihitung ulang: 3 buku', out.getvalue())
+        for pk, popularity in Book.objects.values_list('pk', 'popularity'):
+            with self.subTest(book=pk):
+                self.assertAlmostEqual(popularity, incremental[pk], places=6)
+        self.assertEqual(Book.objects.get(pk=books[2].pk).popularity, 0.0)
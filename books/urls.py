@@ -2,11 +2,16 @@
 URLs for books app
 """
 from django.urls import path
-from . import views
+from . import api, feed, views
 
 app_name = 'books'
 
 urlpatterns = [
     path('catalog/', views.catalog_view, name='catalog'),
     path('<int:pk>/', views.book_detail_view, name='detail'),
+    
+    # API JSON (read-only) untuk kiosk & aplikasi mobile
+    path('api/books/', api.book_list_api, name='api_book_list'),
+    path('api/books/<int:pk>/', api.book_detail_api, name='api_book_detail'),
+    path('api/changes/', feed.catalog_changes_api, name='api_catalog_changes'),
 ]
\ No newline at end of file
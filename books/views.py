@@ -1,8 +1,56 @@
+from django.db.models import Count, Max
 from django.shortcuts import render, get_object_or_404
+from .cache import get_catalog_state
+from .detail import load_book_detail
+from .recommendations import get_recommendations
 from .models import Book
-from django.db.models import Q
+from .fragments import attach_book_cards
+from .facets import (
+    apply_catalog_filters, build_catalog_facets, build_sort_options, get_facet_rows,
+    parse_catalog_filters, parse_catalog_sort,
+)
 
+from library_system.http import conditional_page, latest_timestamp, make_etag
+from library_system.pagination import KeysetPaginator, render_keyset_page
+from library_system.search import search_ordering
 
+
+# Jumlah kartu buku per halaman katalog (habis dibagi 2, 3 dan 4 kolom)
+CATALOG_PAGE_SIZE = 24
+
+
+def catalog_state(request):
+    """
+    Versi data katalog tanpa memuat baris buku: updated_at terbaru & jumlah
+    buku (satu agregat) + versi katalog di cache (naik saat pinjam/kembali)
+    Returns: None jika versi katalog tidak tersedia (cache mati)
+    """
+    version, changed_at = get_catalog_state()
+    if version is None:
+        return None
+    stats = Book.objects.aggregate(last_updated=Max('updated_at'), total=Count('id'))
+    etag = make_etag('catalog', stats['last_updated'], stats['total'], version, request.user.pk)
+    return etag, latest_timestamp(stats['last_updated'], changed_at)
+
+
+def book_detail_state(request, pk):
+    """
+    Versi halaman detail: updated_at buku + waktu rekomendasi dibuat + versi
+    katalog (salinan & peminjaman), buku & rekomendasi dalam satu query
+    Rekomendasi dibuat ulang seluruhnya tiap malam, jadi created_at terbaru
+    berubah setiap kali daftar rekomendasi buku ini diganti
+    """
+    version, changed_at = get_catalog_state()
+    if version is None:
+        return None
+    updated_at, recommended_at = Book.objects.filter(pk=pk).annotate(
+        recommended_at=Max('recommendations__created_at')
+    ).values_list('updated_at', 'recommended_at').first() or (None, None)
+    etag = make_etag('book', pk, updated_at, recommended_at, version, request.user.pk)
+    return etag, latest_timestamp(updated_at, recommended_at, changed_at)
+
+
+@conditional_page(catalog_state)
 def catalog_view(request):
     """
     View untuk katalog buku (public)
@@ -12,35 +60,49 @@ def catalog_view(request):
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) |
-            Q(author__icontains=search_query) |
-            Q(isbn__icontains=search_query)
-        )
+        books = books.search(search_query)
+    
+    # Filter facet (kategori, dekade, tersedia)
+    filters = parse_catalog_filters(request.GET)
+    results = apply_catalog_filters(books, filters)
     
-    # Filter by category
-    category = request.GET.get('category', '')
-    if category:
-        books = books.filter(category=category)
+    # Keyset pagination (terpopuler lewat index popularity, relevansi jika
+    # mencari, selain itu terbaru dulu)
+    sort = parse_catalog_sort(request.GET)
+    if sort == 'popular':
+        ordering = ['-popularity']
+    else:
+        ordering = search_ordering(results, default=['-created_at'])
+    page = KeysetPaginator(results, ordering, per_page=CATALOG_PAGE_SIZE).get_page(
+        request.GET.get('cursor')
+    )
+    attach_book_cards(page, 'books/_book_card.html')
     
     context = {
-        'books': books,
+        'books': page,
         'search_query': search_query,
-        'selected_category': category,
-        'categories': Book.CATEGORY_CHOICES,
+        'filters': filters,
+        'sort': sort,
     }
-    return render(request, 'books/catalog.html', context)
+    if not request.GET.get('fragment'):
+        # Jumlah per facet mengikuti pencarian (tidak perlu untuk infinite scroll)
+        context['facets'] = build_catalog_facets(request, get_facet_rows(books, search_query), filters)
+        context['sort_options'] = build_sort_options(request, sort)
+    return render_keyset_page(request, 'books/catalog.html', 'books/_catalog_items.html', context, page)
 
 
+@conditional_page(book_detail_state)
 def book_detail_view(request, pk):
     """
     View untuk detail buku (public)
     """
     book = get_object_or_404(Book, pk=pk)
-    book_copies = book.bookcopy_set.all()
+    detail = load_book_detail(book)
     
     context = {
         'book': book,
-        'book_copies': book_copies,
+        'book_copies': detail.copies,
+        'detail': detail,
+        'recommendations': get_recommendations(book),
     }
     return render(request, 'books/detail.html', context)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LibrarianConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'librarian'
+
+    def ready(self):
+        # Register signals (invalidasi cache dashboard)
+        from . import signals  # noqa: F401
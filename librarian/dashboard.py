@@ -0,0 +1,372 @@
+"""
+Query layer untuk dashboard librarian
+Semua angka utama dihitung dengan conditional aggregation (Count + filter=Q)
+ditambah scalar subquery untuk anggota & buku, jadi counter dashboard cukup
+satu query
+
+Halaman disimpan sebagai snapshot di cache, data chart disimpan terpisah
+per chart (TTL & ETag sendiri) dan diambil browser lewat endpoint JSON.
+Snapshot di-invalidate saat ada perubahan peminjaman, buku, salinan atau
+anggota, chart hanya yang datanya ikut berubah (lihat signals.py). Jika cache tidak bisa diakses, data dihitung
+langsung dari database tanpa disimpan
+"""
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Func, IntegerField, Min, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from books.models import Book
+from library_system.cache import CACHE_ERRORS
+from loans.models import Loan
+from loans.stats import date_range_bounds, loan_activity_series
+from users.models import Member
+
+logger = logging.getLogger(__name__)
+
+
+# Pilihan rentang chart trend: jumlah hari -> ukuran bucket
+TREND_RANGES = {
+    7: 'day',
+    30: 'day',
+    365: 'month',
+}
+
+# Key cache snapshot, data chart (per chart & varian) dan statistik cache
+SNAPSHOT_KEY = 'dashboard:snapshot'
+CHART_KEY = 'dashboard:chart:{chart}:{variant}'
+STATS_KEY = 'dashboard:stats:{name}'
+
+
+# Urutan & label status untuk chart status peminjaman
+# (urutan sama dengan warna di chart dashboard)
+LOAN_STATUS_LABELS = [
+    ('dipinjam', 'Dipinjam'),
+    ('terlambat', 'Terlambat'),
+    ('dikembalikan', 'Dikembalikan'),
+]
+
+
+@dataclass(frozen=True)
+class DashboardSummary:
+    """Ringkasan angka utama dashboard (kartu statistik & aktivitas hari ini)"""
+    total_books: int
+    total_members: int
+    active_loans: int
+    overdue_loans_count: int
+    today_borrows: int
+    today_returns: int
+
+
+class ScalarCount(Subquery):
+    """
+    Jumlah baris queryset sebagai scalar subquery (SELECT COUNT(...) tanpa
+    GROUP BY), tidak bergantung pada baris query luar
+    Ditandai contains_aggregate supaya bisa dipakai di aggregate()
+    """
+    contains_aggregate = True
+    output_field = IntegerField()
+
+    def __init__(self, queryset):
+        super().__init__(queryset.order_by().values(total=Func('pk', function='COUNT')))
+
+
+def get_dashboard_summary(now=None):
+    """
+    Hitung statistik utama dashboard dalam satu query: counter peminjaman
+    (aggregate tabel Loan) + jumlah anggota aktif & buku (scalar subquery,
+    tetap terhitung walaupun tabel peminjaman kosong)
+    Returns: DashboardSummary
+    """
+    now = now or timezone.now()
+    today_start, today_end = date_range_bounds(timezone.localdate(now), timezone.localdate(now))
+
+    active = Q(status__in=['dipinjam', 'terlambat'])
+
+    counts = Loan.objects.order_by().aggregate(
+        active_loans=Count('pk', filter=active),
+        overdue_loans=Count('pk', filter=active & Q(due_date__lt=now)),
+        today_borrows=Count('pk', filter=Q(borrowed_date__gte=today_start, borrowed_date__lt=today_end)),
+        today_returns=Count('pk', filter=Q(return_date__gte=today_start, return_date__lt=today_end)),
+        total_members=Coalesce(ScalarCount(Member.objects.filter(is_active=True)), 0),
+        total_books=Coalesce(ScalarCount(Book.objects.all()), 0),
+    )
+
+    return DashboardSummary(
+        total_books=counts['total_books'],
+        total_members=counts['total_members'],
+        active_loans=counts['active_loans'],
+        overdue_loans_count=counts['overdue_loans'],
+        today_borrows=counts['today_borrows'],
+        today_returns=counts['today_returns'],
+    )
+
+
+# ========== MASA BERLAKU CACHE ==========
+
+def _seconds_until_midnight(now):
+    """Detik sampai ganti hari (angka 'hari ini' & trend harus dihitung ulang)"""
+    tomorrow = timezone.localdate(now) + timedelta(days=1)
+    midnight = timezone.make_aware(datetime.combine(tomorrow, datetime.min.time()))
+    return (midnight - now).total_seconds()
+
+
+def _seconds_until_next_due(now):
+    """
+    Detik sampai ada peminjaman aktif yang melewati due_date
+    Status terlambat dihitung dari waktu, jadi cache harus kedaluwarsa saat itu
+    Returns: None jika tidak ada peminjaman aktif yang akan jatuh tempo
+    """
+    next_due = Loan.objects.active().filter(due_date__gte=now).aggregate(
+        next_due=Min('due_date')
+    )['next_due']
+    if next_due is None:
+        return None
+    return (next_due - now).total_seconds()
+
+
+def _expiry(timeout, *limits):
+    """Timeout cache terkecil dari semua batas (minimal 1 detik)"""
+    for limit in limits:
+        if limit is not None:
+            timeout = min(timeout, limit)
+    return max(int(timeout), 1)
+
+
+# ========== SNAPSHOT CACHE ==========
+
+def build_dashboard_snapshot(now=None):
+    """
+    Hitung data halaman dashboard (tanpa chart) dari database
+    Returns: dict yang aman disimpan di cache (tanpa queryset lazy)
+    """
+    now = now or timezone.now()
+
+    # Alert jatuh tempo (3 hari ke depan)
+    upcoming_due = list(Loan.objects.active().filter(
+        due_date__lte=now + timedelta(days=3),
+        due_date__gte=now
+    ).select_related('member', 'book_copy__book').order_by('due_date')[:5])
+
+    # Peminjaman terbaru
+    recent_loans = list(Loan.objects.with_effective_status(now).select_related(
+        'member', 'book_copy__book'
+    ).order_by('-borrowed_date')[:10])
+
+    # Buku populer (top 5, skor peluruhan waktu lewat index popularity)
+    popular_books = list(Book.objects.popular()[:5])
+    for book in popular_books:
+        book.popularity_score = book.get_popularity_score(now)
+
+    return {
+        'built_at': now,
+        'timeout': _expiry(
+            settings.DASHBOARD_CACHE_TIMEOUT,
+            _seconds_until_next_due(now),
+            _seconds_until_midnight(now),
+        ),
+        'summary': get_dashboard_summary(now),
+        'upcoming_due': upcoming_due,
+        'recent_loans': recent_loans,
+        'popular_books': popular_books,
+    }
+
+
+# ========== DATA CHART ==========
+
+def build_category_chart(now=None):
+    """Chart bar: jumlah peminjaman per kategori buku"""
+    category_stats = Book.objects.values('category').annotate(
+        total_loans=Count('bookcopy__loan')
+    ).order_by('-total_loans')
+    category_names = dict(Book.CATEGORY_CHOICES)
+    return {
+        'labels': [category_names.get(item['category'], item['category']) for item in category_stats],
+        'data': [item['total_loans'] for item in category_stats],
+    }
+
+
+def build_trend_chart(now=None, trend_range=7):
+    """Chart line: trend peminjaman & pengembalian untuk rentang trend_range hari"""
+    today = timezone.localdate(now)
+    trend = loan_activity_series(
+        today - timedelta(days=trend_range - 1),
+        today,
+        bucket=TREND_RANGES[trend_range],
+    )
+    return {
+        'range': trend_range,
+        'labels': trend['labels'],
+        'borrows': trend['borrows'],
+        'returns': trend['returns'],
+    }
+
+
+def build_member_type_chart(now=None):
+    """Chart pie: anggota aktif per tipe (tipe kosong tetap ada supaya warna sesuai)"""
+    counts = Member.objects.filter(is_active=True).order_by().aggregate(**{
+        value: Count('pk', filter=Q(member_type=value))
+        for value, label in Member.MEMBER_TYPE_CHOICES
+    })
+    return {
+        'labels': [label for value, label in Member.MEMBER_TYPE_CHOICES],
+        'data': [counts[value] for value, label in Member.MEMBER_TYPE_CHOICES],
+    }
+
+
+def build_loan_status_chart(now=None):
+    """Chart doughnut: distribusi status peminjaman (terlambat dihitung dari due_date)"""
+    now = now or timezone.now()
+    active = Q(status__in=['dipinjam', 'terlambat'])
+    counts = Loan.objects.order_by().aggregate(
+        dipinjam=Count('pk', filter=active & Q(due_date__gte=now)),
+        terlambat=Count('pk', filter=active & Q(due_date__lt=now)),
+        dikembalikan=Count('pk', filter=Q(status='dikembalikan')),
+    )
+    return {
+        'labels': [label for value, label in LOAN_STATUS_LABELS],
+        'data': [counts[value] for value, label in LOAN_STATUS_LABELS],
+    }
+
+
+# Nama chart -> (fungsi builder, timeout cache dalam detik, batas kedaluwarsa)
+CHARTS = {
+    'categories': (build_category_chart, 30 * 60, None),
+    'trend': (build_trend_chart, 10 * 60, _seconds_until_midnight),
+    'member-types': (build_member_type_chart, 60 * 60, None),
+    'loan-status': (build_loan_status_chart, 5 * 60, _seconds_until_next_due),
+}
+
+
+def _record_stat(name, amount=1):
+    """Tambah counter statistik cache (hits/misses), dilewati jika cache mati"""
+    key = STATS_KEY.format(name=name)
+    try:
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+    except CACHE_ERRORS:
+        pass
+
+
+def get_dashboard_snapshot():
+    """
+    Ambil snapshot dashboard dari cache, rebuild jika belum ada
+    Cache tidak bisa diakses: snapshot dihitung langsung (tidak disimpan)
+    Returns: tuple (snapshot, cache_hit)
+    """
+    try:
+        snapshot = cache.get(SNAPSHOT_KEY)
+    except CACHE_ERRORS:
+        logger.warning("Cache dashboard tidak bisa dibaca, snapshot dihitung langsung", exc_info=True)
+        return build_dashboard_snapshot(), False
+    if snapshot is not None:
+        _record_stat('hits')
+        return snapshot, True
+
+    _record_stat('misses')
+    started = time.perf_counter()
+    snapshot = build_dashboard_snapshot()
+    rebuild_ms = (time.perf_counter() - started) * 1000
+
+    try:
+        cache.set(SNAPSHOT_KEY, snapshot, snapshot['timeout'])
+        cache.set(STATS_KEY.format(name='last_rebuild_ms'), round(rebuild_ms, 1), None)
+        cache.set(STATS_KEY.format(name='last_rebuild_at'), snapshot['built_at'], None)
+    except CACHE_ERRORS:
+        logger.warning("Snapshot dashboard gagal disimpan ke cache", exc_info=True)
+    logger.info("Dashboard snapshot dibangun ulang dalam %.1f ms", rebuild_ms)
+
+    return snapshot, False
+
+
+def get_chart_data(chart, trend_range=7):
+    """
+    Ambil data satu chart dari cache, rebuild jika belum ada
+    Data disimpan sudah dalam bentuk JSON beserta ETag-nya, jadi request
+    berikutnya tidak perlu serialisasi ulang
+    Returns: tuple (dict {'content', 'etag', 'timeout'}, cache_hit)
+    Raises: KeyError jika nama chart tidak dikenal
+    """
+    builder, timeout, expires = CHARTS[chart]
+    params = {'trend_range': trend_range} if chart == 'trend' else {}
+    key = CHART_KEY.format(chart=chart, variant=trend_range if params else '')
+
+    try:
+        entry = cache.get(key)
+    except CACHE_ERRORS:
+        logger.warning("Cache chart dashboard tidak bisa dibaca", exc_info=True)
+        entry = None
+    if entry is not None:
+        _record_stat('chart_hits')
+        return entry, True
+
+    _record_stat('chart_misses')
+    now = timezone.now()
+    content = json.dumps(builder(now, **params))
+    entry = {
+        'content': content,
+        'etag': '"%s"' % hashlib.md5(content.encode()).hexdigest(),
+        'timeout': _expiry(timeout, expires(now) if expires else None),
+    }
+    try:
+        cache.set(key, entry, entry['timeout'])
+    except CACHE_ERRORS:
+        logger.warning("Data chart dashboard gagal disimpan ke cache", exc_info=True)
+    return entry, False
+
+
+# Chart yang datanya berubah karena peminjaman/pengembalian. Chart kategori
+# menghitung seluruh riwayat peminjaman, jadi tidak dihapus per transaksi
+# (cukup kedaluwarsa lewat TTL-nya)
+LOAN_CHARTS = ('trend', 'loan-status')
+
+
+def _chart_keys(charts):
+    """Key cache data chart yang disebut (trend punya satu key per rentang)"""
+    keys = []
+    for chart in charts:
+        variants = TREND_RANGES if chart == 'trend' else ['']
+        keys.extend(CHART_KEY.format(chart=chart, variant=variant) for variant in variants)
+    return keys
+
+
+def invalidate_dashboard_snapshot(charts=()):
+    """
+    Hapus snapshot dashboard & data chart yang terpengaruh (dipanggil saat data berubah)
+    charts: nama chart (key CHARTS) yang ikut dihapus, chart lain tetap di cache
+    Dipanggil lewat on_commit, jadi error cache hanya dicatat di log:
+    data sudah tersimpan dan snapshot lama kedaluwarsa sendiri (timeout)
+    """
+    try:
+        cache.delete_many([SNAPSHOT_KEY] + _chart_keys(charts))
+    except CACHE_ERRORS:
+        logger.exception("Gagal menghapus snapshot dashboard dari cache")
+        return
+    _record_stat('invalidations')
+
+
+def get_dashboard_cache_stats():
+    """
+    Statistik cache dashboard: hits, misses, invalidations, waktu rebuild terakhir
+    (ditampilkan command dashboard_cache_stats)
+    Returns: dict, None jika cache tidak bisa diakses
+    """
+    names = [
+        'hits', 'misses', 'chart_hits', 'chart_misses',
+        'invalidations', 'last_rebuild_ms', 'last_rebuild_at',
+    ]
+    try:
+        values = cache.get_many([STATS_KEY.format(name=name) for name in names])
+    except CACHE_ERRORS:
+        logger.warning("Statistik cache dashboard tidak bisa dibaca", exc_info=True)
+        return None
+    return {name: values.get(STATS_KEY.format(name=name)) for name in names}
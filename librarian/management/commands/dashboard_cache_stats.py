@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from librarian.dashboard import get_dashboard_cache_stats
+
+
+def _hit_rate(hits, misses):
+    total = (hits or 0) + (misses or 0)
+    return f'{(hits or 0) / total:.1%}' if total else '-'
+
+
+class Command(BaseCommand):
+    help = 'Tampilkan statistik cache dashboard (hit/miss snapshot & chart, waktu rebuild terakhir)'
+
+    def handle(self, *args, **options):
+        stats = get_dashboard_cache_stats()
+        if stats is None:
+            raise CommandError('Cache dashboard tidak bisa diakses')
+        self.stdout.write(
+            f'Snapshot: {stats["hits"] or 0} hit, {stats["misses"] or 0} miss '
+            f'(hit rate {_hit_rate(stats["hits"], stats["misses"])})'
+        )
+        self.stdout.write(
+            f'Chart: {stats["chart_hits"] or 0} hit, {stats["chart_misses"] or 0} miss '
+            f'(hit rate {_hit_rate(stats["chart_hits"], stats["chart_misses"])})'
+        )
+        self.stdout.write(f'Invalidasi: {stats["invalidations"] or 0}')
+
+        if stats['last_rebuild_ms'] is None:
+            self.stdout.write('Rebuild terakhir: belum ada')
+        else:
+            self.stdout.write(
+                f'Rebuild terakhir: {stats["last_rebuild_ms"]} ms ({stats["last_rebuild_at"]})'
+            )
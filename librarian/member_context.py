@@ -0,0 +1,109 @@
+"""
+Konteks anggota untuk meja scan
+Begitu kartu anggota dipindai, petugas langsung melihat nama, tipe,
+peminjaman aktif (beserta judul), status terlambat dan total denda
+berjalan, sebelum memindai buku. Jumlah query tetap (anggota + peminjaman
+aktif), hasilnya di-cache sebentar per anggota dan dihapus setiap ada
+peminjaman/pengembalian anggota tersebut (signal Loan & jalur bulk)
+Jika cache tidak bisa diakses konteks dihitung langsung setiap kali
+"""
+import logging
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from library_system.cache import CACHE_ERRORS
+from loans.models import Loan
+from users.models import Member
+
+logger = logging.getLogger(__name__)
+
+
+MEMBER_CONTEXT_KEY = 'scan:member-context:{member_id}'
+MEMBER_CONTEXT_TIMEOUT = 60
+
+
+def build_member_context(member_id, now=None):
+    """
+    Hitung konteks anggota (2 query)
+    Returns: dict, atau None jika anggota tidak ditemukan
+    """
+    now = now or timezone.now()
+    member = Member.objects.only(
+        'name', 'nis', 'member_type', 'class_name', 'barcode', 'is_active'
+    ).filter(pk=member_id).first()
+    if member is None:
+        return None
+
+    loans = list(
+        Loan.objects.filter(member_id=member_id).active().with_effective_status(now)
+        .select_related('book_copy__book').order_by('due_date')
+    )
+    overdue = sum(1 for loan in loans if loan.effective_status == 'terlambat')
+    total_fine = sum((loan.accrued_fine for loan in loans), Decimal('0.00'))
+
+    if not member.is_active:
+        blocked_reason = 'Anggota tidak aktif'
+    elif overdue:
+        blocked_reason = f'Memiliki {overdue} buku terlambat'
+    else:
+        blocked_reason = None
+
+    return {
+        'id': member.pk,
+        'name': member.name,
+        'nis': member.nis,
+        'member_type': member.get_member_type_display(),
+        'class_name': member.class_name,
+        'barcode': member.barcode,
+        'is_active': member.is_active,
+        'active_loans': len(loans),
+        'overdue_loans': overdue,
+        'total_fine': total_fine,
+        'can_borrow': blocked_reason is None,
+        'blocked_reason': blocked_reason,
+        'loans': [
+            {
+                'id': loan.pk,
+                'title': loan.book_copy.book.title,
+                'barcode': loan.book_copy.barcode,
+                'borrowed_date': loan.borrowed_date,
+                'due_date': loan.due_date,
+                'status': loan.effective_status,
+                'fine': loan.accrued_fine,
+            }
+            for loan in loans
+        ],
+        'built_at': now,
+    }
+
+
+def get_member_context(member_id):
+    """Konteks anggota dari cache (dihitung ulang jika kosong)"""
+    key = MEMBER_CONTEXT_KEY.format(member_id=member_id)
+    try:
+        context = cache.get(key)
+    except CACHE_ERRORS:
+        logger.warning("Cache konteks anggota tidak bisa dibaca", exc_info=True)
+        return build_member_context(member_id)
+    if context is None:
+        context = build_member_context(member_id)
+        if context is not None:
+            try:
+                cache.set(key, context, MEMBER_CONTEXT_TIMEOUT)
+            except CACHE_ERRORS:
+                logger.warning("Konteks anggota gagal disimpan ke cache", exc_info=True)
+    return context
+
+
+def invalidate_member_context(member_ids):
+    """Hapus konteks beberapa anggota (dipanggil setelah peminjaman/pengembalian)"""
+    keys = [MEMBER_CONTEXT_KEY.format(member_id=member_id) for member_id in set(member_ids)]
+    if not keys:
+        return
+    # Dipanggil setelah commit: error cache hanya dicatat di log
+    try:
+        cache.delete_many(keys)
+    except CACHE_ERRORS:
+        logger.exception("Gagal menghapus cache konteks anggota")
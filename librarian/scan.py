@@ -0,0 +1,151 @@
+"""
+Resolusi barcode untuk meja scan
+Barcode anggota berawalan MBR (Member.save) dan barcode salinan berawalan
+BK (BookCopy.save), jadi jenisnya diketahui tanpa query. Hasilnya berupa
+ScanRecord kecil (jenis, id, data tampilan) yang disimpan di dua tingkat:
+- LRU di dalam proses (tanpa jaringan, sub-milidetik)
+- cache bersama (Redis) supaya worker lain & setelah restart tetap hangat
+Database hanya dibaca saat kedua tingkat kosong. Jika cache bersama tidak
+bisa diakses, record dibaca dari database dan hanya disimpan di LRU
+
+Record hanya berisi data identitas (nama, judul, nomor salinan); status
+yang sering berubah (ketersediaan, tunggakan) tetap dicek ke database saat
+transaksi. Cache dihapus oleh signal saat anggota/buku/salinan disimpan
+atau dihapus; LRU di worker lain ikut kedaluwarsa dalam SCAN_LRU_TTL detik
+"""
+import logging
+from dataclasses import asdict, dataclass
+
+from django.core.cache import cache
+
+from books.models import BookCopy
+from library_system.cache import CACHE_ERRORS, LRUCache
+from users.models import Member
+
+logger = logging.getLogger(__name__)
+
+
+MEMBER_PREFIX = 'MBR'
+COPY_PREFIX = 'BK'
+
+# Cache bersama (detik)
+SCAN_CACHE_KEY = 'scan:v1:{barcode}'
+SCAN_CACHE_TIMEOUT = 60 * 60 * 24
+
+# LRU per worker: jumlah barcode & umur item (detik)
+SCAN_LRU_SIZE = 4096
+SCAN_LRU_TTL = 30
+
+scan_cache = LRUCache(maxsize=SCAN_LRU_SIZE, ttl=SCAN_LRU_TTL)
+
+
+@dataclass(frozen=True)
+class ScanRecord:
+    """Hasil resolusi satu barcode"""
+    kind: str  # 'member' / 'copy'
+    id: int
+    barcode: str
+    label: str  # nama anggota / judul buku
+    detail: str  # NIS & tipe anggota / penulis & nomor salinan
+    book_id: int = None  # hanya untuk salinan
+    is_active: bool = True  # status anggota saat record dibuat
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def barcode_kind(barcode):
+    """Jenis barcode dari awalannya: 'member' / 'copy' / None"""
+    if barcode.startswith(MEMBER_PREFIX):
+        return 'member'
+    if barcode.startswith(COPY_PREFIX):
+        return 'copy'
+    return None
+
+
+def _member_record(member):
+    return ScanRecord(
+        kind='member',
+        id=member.pk,
+        barcode=member.barcode,
+        label=member.name,
+        detail=' - '.join(filter(None, [
+            member.nis, member.get_member_type_display(), member.class_name,
+        ])),
+        is_active=member.is_active,
+    )
+
+
+def _copy_record(book_copy):
+    book = book_copy.book
+    return ScanRecord(
+        kind='copy',
+        id=book_copy.pk,
+        barcode=book_copy.barcode,
+        label=book.title,
+        detail=f'{book.author} - Salinan #{book_copy.copy_number}',
+        book_id=book.pk,
+    )
+
+
+def _load_record(kind, barcode):
+    """Record dari database (satu query lewat index unik barcode)"""
+    if kind == 'member':
+        member = Member.objects.only(
+            'name', 'nis', 'member_type', 'class_name', 'barcode', 'is_active'
+        ).filter(barcode=barcode).first()
+        return _member_record(member) if member else None
+
+    book_copy = BookCopy.objects.select_related('book').only(
+        'barcode', 'copy_number', 'book__title', 'book__author'
+    ).filter(barcode=barcode).first()
+    return _copy_record(book_copy) if book_copy else None
+
+
+def resolve_barcode(barcode):
+    """
+    Barcode -> ScanRecord (None jika tidak dikenal)
+    Barcode yang tidak ditemukan tidak di-cache, supaya anggota/salinan
+    yang baru dibuat langsung bisa dipindai
+    """
+    barcode = barcode.strip()
+    kind = barcode_kind(barcode)
+    if kind is None:
+        return None
+
+    record = scan_cache.get(barcode)
+    if record is not None:
+        return record
+
+    key = SCAN_CACHE_KEY.format(barcode=barcode)
+    try:
+        record = cache.get(key)
+        cache_ok = True
+    except CACHE_ERRORS:
+        logger.warning("Cache barcode tidak bisa dibaca", exc_info=True)
+        record, cache_ok = None, False
+    if record is None:
+        record = _load_record(kind, barcode)
+        if record is None:
+            return None
+        if cache_ok:
+            try:
+                cache.set(key, record, SCAN_CACHE_TIMEOUT)
+            except CACHE_ERRORS:
+                logger.warning("Record barcode gagal disimpan ke cache", exc_info=True)
+    scan_cache.set(barcode, record)
+    return record
+
+
+def invalidate_barcodes(barcodes):
+    """Hapus record beberapa barcode dari kedua tingkat cache"""
+    barcodes = [barcode for barcode in barcodes if barcode]
+    if not barcodes:
+        return
+    for barcode in barcodes:
+        scan_cache.delete(barcode)
+    # Dipanggil setelah commit: error cache hanya dicatat di log
+    try:
+        cache.delete_many([SCAN_CACHE_KEY.format(barcode=barcode) for barcode in barcodes])
+    except CACHE_ERRORS:
+        logger.exception("Gagal menghapus cache barcode %s", ', '.join(barcodes))
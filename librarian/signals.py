@@ -0,0 +1,98 @@
+"""
+Signals untuk invalidasi cache dashboard librarian
+Snapshot dashboard dihapus setiap kali data peminjaman, buku,
+salinan buku atau anggota berubah, data chart hanya yang terpengaruh
+
+Record resolusi barcode meja scan (scan.py) dihapus saat anggota,
+salinan atau judul/penulis buku berubah, konteks anggota meja scan
+(member_context.py) dihapus saat peminjaman atau data anggota berubah
+
+Sirkulasi massal (loans.services) tidak memicu post_save, perubahannya
+datang lewat loans.signals.bulk_loans_changed
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from books.models import Book, BookCopy
+from loans.models import Loan
+from loans.signals import bulk_loans_changed
+from users.models import Member
+
+from .dashboard import LOAN_CHARTS, invalidate_dashboard_snapshot
+from .member_context import invalidate_member_context
+from .scan import invalidate_barcodes
+
+
+# Field yang ikut ditampilkan di record scan
+SCAN_COPY_FIELDS = {'barcode', 'copy_number', 'book', 'book_id'}
+SCAN_BOOK_FIELDS = {'title', 'author'}
+
+# Chart dashboard yang ikut dihapus per model (lihat dashboard.LOAN_CHARTS)
+DASHBOARD_CHARTS = {
+    Loan: LOAN_CHARTS,
+    Book: ('categories',),
+    BookCopy: (),
+    Member: ('member-types',),
+}
+
+
+@receiver([post_save, post_delete], sender=Loan)
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookCopy)
+@receiver([post_save, post_delete], sender=Member)
+def invalidate_dashboard_on_change(sender, **kwargs):
+    """Invalidate snapshot setelah transaksi commit (supaya rebuild membaca data baru)"""
+    charts = DASHBOARD_CHARTS[sender]
+    transaction.on_commit(lambda: invalidate_dashboard_snapshot(charts))
+
+
+def _touches(update_fields, fields):
+    """True jika save() (mungkin) mengubah salah satu field"""
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver([post_save, post_delete], sender=Member)
+def invalidate_member_scan(sender, instance, **kwargs):
+    """Hapus record scan anggota (nama, status aktif, dll bisa berubah)"""
+    barcode = instance.barcode
+    transaction.on_commit(lambda: invalidate_barcodes([barcode]))
+
+
+@receiver([post_save, post_delete], sender=BookCopy)
+def invalidate_copy_scan(sender, instance, update_fields=None, **kwargs):
+    """Hapus record scan salinan (dilewati untuk update ketersediaan saja)"""
+    if not _touches(update_fields, SCAN_COPY_FIELDS):
+        return
+    barcode = instance.barcode
+    transaction.on_commit(lambda: invalidate_barcodes([barcode]))
+
+
+@receiver(post_save, sender=Book)
+def invalidate_book_scan(sender, instance, created=False, update_fields=None, **kwargs):
+    """Judul/penulis berubah: hapus record scan semua salinannya"""
+    if created or not _touches(update_fields, SCAN_BOOK_FIELDS):
+        return
+    barcodes = list(instance.bookcopy_set.values_list('barcode', flat=True))
+    transaction.on_commit(lambda: invalidate_barcodes(barcodes))
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def invalidate_loan_member_context(sender, instance, **kwargs):
+    """Peminjaman/pengembalian: hapus konteks anggota peminjam"""
+    member_id = instance.member_id
+    transaction.on_commit(lambda: invalidate_member_context([member_id]))
+
+
+@receiver(bulk_loans_changed, sender=Loan)
+def invalidate_on_bulk_loans(sender, member_ids, **kwargs):
+    """Peminjaman/pengembalian massal (signal dikirim setelah commit)"""
+    invalidate_dashboard_snapshot(LOAN_CHARTS)
+    invalidate_member_context(member_ids)
+
+
+@receiver([post_save, post_delete], sender=Member)
+def invalidate_member_context_on_change(sender, instance, **kwargs):
+    """Data anggota berubah (nama, status aktif, dll)"""
+    member_id = instance.pk
+    transaction.on_commit(lambda: invalidate_member_context([member_id]))
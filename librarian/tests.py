@@ -1,3 +1,560 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from kombu.exceptions import OperationalError
+from PIL import Image
+
+from books.models import Book
+from library_system.testing import TestCase
+from loans.services import BULK_RETURN_LIMIT, CHECKOUT_LIMIT, borrow_copy, checkout_copies, return_copies
+from loans.tests import make_book, make_member
+
+from .dashboard import (
+    CHART_KEY, SNAPSHOT_KEY, get_chart_data, get_dashboard_snapshot, get_dashboard_summary,
+    invalidate_dashboard_snapshot,
+)
+from .member_context import get_member_context
+from .scan import invalidate_barcodes, resolve_barcode
+from .views import AUTOCOMPLETE_LIMIT
+
+
+# Cache Redis yang tidak bisa dihubungi (port tertutup)
+CACHE_DOWN = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:1/0',
+    }
+}
+
+
+class LibrarianTestCase(TestCase):
+    """TestCase dengan petugas yang sudah login"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user('petugas', password='rahasia')
+        self.client.force_login(self.user)
+
+
+class DashboardSummaryTestCase(TestCase):
+    """Counter utama dashboard"""
+
+    def test_total_books_without_members(self):
+        make_book('9780000000001')
+        make_book('9780000000002')
+
+        # Tabel peminjaman kosong: satu query, buku tetap terhitung
+        with self.assertNumQueries(1):
+            summary = get_dashboard_summary()
+
+        self.assertEqual(summary.total_books, 2)
+        self.assertEqual(summary.total_members, 0)
+
+    def test_counts_only_active_members(self):
+        make_member('1001')
+        make_member('1002', is_active=False)
+
+        summary = get_dashboard_summary()
+
+        self.assertEqual(summary.total_members, 1)
+        self.assertEqual(summary.total_books, Book.objects.count())
+
+    def test_empty_tables(self):
+        summary = get_dashboard_summary()
+        self.assertEqual((summary.total_books, summary.total_members, summary.active_loans), (0, 0, 0))
+
+    def test_loan_counters(self):
+        member = make_member()
+        book = make_book(copies=2)
+        borrow_copy(member, book.bookcopy_set.get(copy_number=1).barcode)
+        borrow_copy(member, book.bookcopy_set.get(copy_number=2).barcode, now=timezone.now() - timedelta(days=10))
+
+        with self.assertNumQueries(1):
+            summary = get_dashboard_summary()
+
+        self.assertEqual((summary.total_books, summary.total_members), (1, 1))
+        self.assertEqual((summary.active_loans, summary.overdue_loans_count), (2, 1))
+        self.assertEqual((summary.today_borrows, summary.today_returns), (1, 0))
+
+
+class DashboardCacheStatsTestCase(TestCase):
+    """Statistik hit/miss & rebuild snapshot dashboard (command dashboard_cache_stats)"""
+
+    def stats_output(self):
+        out = io.StringIO()
+        call_command('dashboard_cache_stats', stdout=out)
+        return out.getvalue()
+
+    def test_counts_hits_and_misses(self):
+        self.assertIn('Rebuild terakhir: belum ada', self.stats_output())
+
+        get_dashboard_snapshot()
+        get_dashboard_snapshot()
+        get_chart_data('loan-status')
+        invalidate_dashboard_snapshot()
+
+        output = self.stats_output()
+        self.assertIn('Snapshot: 1 hit, 1 miss (hit rate 50.0%)', output)
+        self.assertIn('Chart: 0 hit, 1 miss', output)
+        self.assertIn('Invalidasi: 1', output)
+        self.assertNotIn('belum ada', output)
+
+    @override_settings(CACHES=CACHE_DOWN)
+    def test_cache_down(self):
+        with self.assertLogs('librarian.dashboard', 'WARNING'), self.assertRaises(CommandError):
+            self.stats_output()
+
+
+@override_settings(CACHES=CACHE_DOWN)
+class DashboardCacheDownTestCase(LibrarianTestCase):
+    """Dashboard tetap tampil walaupun Redis mati (dihitung langsung dari database)"""
+
+    def test_dashboard_page(self):
+        make_book()
+        with self.assertLogs('librarian.dashboard', 'WARNING'):
+            response = self.client.get(reverse('librarian:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Dashboard-Cache'], 'miss')
+        self.assertEqual(response.context['summary'].total_books, 1)
+
+    def test_chart_data(self):
+        with self.assertLogs('librarian.dashboard', 'WARNING'):
+            entry, cache_hit = get_chart_data('loan-status')
+        self.assertFalse(cache_hit)
+        self.assertTrue(entry['etag'])
+
+    def test_invalidation_is_logged(self):
+        with self.assertLogs('librarian.dashboard', 'ERROR'):
+            invalidate_dashboard_snapshot()
+
+
+class DashboardInvalidationTestCase(TestCase):
+    """Perubahan data hanya menghapus snapshot & chart yang terpengaruh"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+        self.book = make_book()
+        get_dashboard_snapshot()
+        for chart in ('categories', 'loan-status', 'member-types'):
+            get_chart_data(chart)
+        get_chart_data('trend', trend_range=30)
+
+    def cached(self, chart, variant=''):
+        return cache.get(CHART_KEY.format(chart=chart, variant=variant)) is not None
+
+    def test_borrow_keeps_full_history_charts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            borrow_copy(self.member, self.book.bookcopy_set.get().barcode)
+
+        self.assertIsNone(cache.get(SNAPSHOT_KEY))
+        self.assertFalse(self.cached('trend', 30))
+        self.assertFalse(self.cached('loan-status'))
+        self.assertTrue(self.cached('categories'))
+        self.assertTrue(self.cached('member-types'))
+
+    def test_member_change_clears_member_chart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_member('1002')
+
+        self.assertIsNone(cache.get(SNAPSHOT_KEY))
+        self.assertFalse(self.cached('member-types'))
+        self.assertTrue(self.cached('loan-status'))
+
+    def test_bulk_circulation_clears_loan_charts_and_member_context(self):
+        barcode = self.book.bookcopy_set.get().barcode
+        for circulate in (lambda: checkout_copies(self.member, [barcode]), lambda: return_copies([barcode])):
+            get_dashboard_snapshot()
+            get_chart_data('loan-status')
+            stale = get_member_context(self.member.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                circulate()
+
+            self.assertIsNone(cache.get(SNAPSHOT_KEY))
+            self.assertFalse(self.cached('loan-status'))
+            self.assertTrue(self.cached('categories'))
+            self.assertNotEqual(get_member_context(self.member.pk)['active_loans'], stale['active_loans'])
+
+
+@override_settings(CACHES=CACHE_DOWN)
+class ScanCacheDownTestCase(TestCase):
+    """Barcode tetap bisa dipindai walaupun Redis mati (dibaca dari database)"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+
+    def test_resolve_from_database(self):
+        with self.assertLogs('librarian.scan', 'WARNING') as logs:
+            record = resolve_barcode(self.member.barcode)
+        self.assertEqual((record.kind, record.id), ('member', self.member.pk))
+        # Cache bersama tidak ditulis lagi setelah gagal dibaca
+        self.assertEqual(len(logs.records), 1)
+
+        # Pemindaian berikutnya dilayani LRU di dalam proses
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_barcode(self.member.barcode), record)
+
+    def test_invalidation_is_logged(self):
+        with self.assertLogs('librarian.scan', 'ERROR'):
+            invalidate_barcodes([self.member.barcode])
+
+
+@override_settings(CACHES=CACHE_DOWN)
+class MemberContextCacheDownTestCase(TestCase):
+    """Konteks anggota & peminjaman tetap berjalan walaupun Redis mati"""
+
+    def test_context_without_cache(self):
+        member = make_member()
+        with self.assertLogs('librarian.member_context', 'WARNING'):
+            context = get_member_context(member.pk)
+        self.assertEqual((context['id'], context['active_loans']), (member.pk, 0))
+
+    def test_borrow_commits(self):
+        member = make_member()
+        # Semua cache (barcode, dashboard, katalog) mati: cukup dicatat di log
+        with self.assertLogs(level='WARNING') as logs, self.captureOnCommitCallbacks(execute=True):
+            loan = borrow_copy(member, make_book().bookcopy_set.get().barcode)
+        self.assertEqual(loan.status, 'dipinjam')
+        self.assertIn(('librarian.member_context', 'ERROR'), {(r.name, r.levelname) for r in logs.records})
+
+
+class BorrowApiTestCase(LibrarianTestCase):
+    """Peminjaman dari meja scan (fetch)"""
+
+    def test_broker_down_is_logged(self):
+        member, book = make_member(), make_book()
+        data = {'member_barcode': member.barcode, 'book_barcode': book.bookcopy_set.get().barcode}
+        delay = mock.patch('librarian.views.send_loan_success_email.delay', side_effect=OperationalError('broker mati'))
+        with delay, self.assertLogs('librarian.views', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('librarian:borrow_api'), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['ok'])
+
+
+class AutocompleteTestCase(LibrarianTestCase):
+    """Autocomplete meja scan (pg_trgm): awalan, salah ketik, urutan & batas jumlah"""
+
+    def setUp(self):
+        super().setUp()
+        self.laskar = make_book('9780000000001', copies=2, title='Laskar Pelangi', author='Andrea Hirata')
+        self.bumi = make_book('9780000000002', copies=1, title='Bumi Manusia', author='Pramoedya Ananta Toer')
+
+    def get(self, q, kind='book'):
+        response = self.client.get(reverse('librarian:autocomplete'), {'type': kind, 'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_book_prefix_typo_and_author(self):
+        for q in ('lask', 'pelangu', 'HIRATA'):
+            with self.subTest(q=q):
+                self.assertEqual([row['id'] for row in self.get(q)], [self.laskar.pk])
+
+    def test_book_copies(self):
+        borrow_copy(make_member(), self.laskar.bookcopy_set.get(copy_number=1).barcode)
+        row = self.get('laskar')[0]
+        self.assertEqual(row['available_copies'], 1)
+        self.assertEqual([(copy['copy_number'], copy['is_available']) for copy in row['copies']], [(1, False), (2, True)])
+
+    def test_closest_match_first(self):
+        make_book('9780000000003', copies=0, title='Pelangi di Mars', author='Andrea Hirata')
+        make_book('9780000000004', copies=0, title='Sang Pemimpi', author='Andrea Hirata')
+        # Kemiripan sama diurutkan per judul; judul yang tidak mirip tidak ikut
+        self.assertEqual([row['title'] for row in self.get('pelangi')], ['Laskar Pelangi', 'Pelangi di Mars'])
+        self.assertEqual(self.get('pelangi mars')[0]['title'], 'Pelangi di Mars')
+
+    def test_member_name_and_nis(self):
+        siti = make_member('2024001', name='Siti Aminah')
+        make_member('2024002', name='Budi Santoso')
+        self.assertEqual([row['id'] for row in self.get('amina', 'member')], [siti.pk])
+        self.assertEqual([row['barcode'] for row in self.get('4001', 'member')], [siti.barcode])
+
+    def test_limit(self):
+        for number in range(AUTOCOMPLETE_LIMIT + 2):
+            make_book(f'97800000001{number:02d}', copies=0, title=f'Kumpulan Soal Matematika {number}')
+        self.assertEqual(len(self.get('matematika')), AUTOCOMPLETE_LIMIT)
+
+    def test_short_input_and_bad_type(self):
+        self.assertEqual(self.get('l'), [])
+        response = self.client.get(reverse('librarian:autocomplete'), {'type': 'loan', 'q': 'lask'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_prefix_reads_fresh_rows(self):
+        self.get('bumi')
+        self.bumi.bookcopy_set.get().delete()
+        # id dari LRU, data salinan tetap dibaca ulang
+        row = self.get('bumi')[0]
+        self.assertEqual((row['id'], row['copies']), (self.bumi.pk, []))
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('librarian:autocomplete'), {'q': 'lask'})
+        self.assertEqual(response.status_code, 302)
+
+
+class ScanApiTestCase(LibrarianTestCase):
+    """Endpoint scan apa saja (pratinjau barcode di halaman scan)"""
+
+    def get(self, barcode):
+        return self.client.get(reverse('librarian:scan'), {'barcode': barcode})
+
+    def test_member_and_copy(self):
+        member, book = make_member(), make_book()
+        copy = book.bookcopy_set.get()
+        self.assertEqual(self.get(member.barcode).json()['result']['id'], member.pk)
+
+        result = self.get(copy.barcode).json()['result']
+        self.assertEqual((result['kind'], result['id'], result['book_id']), ('copy', copy.pk, book.pk))
+        self.assertEqual(result['label'], book.title)
+
+    def test_bad_barcode(self):
+        for barcode, status in [('', 400), ('BK-TIDAK-ADA', 404), ('XYZ', 404)]:
+            with self.subTest(barcode=barcode):
+                self.assertEqual(self.get(barcode).status_code, status)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.get(make_member().barcode).status_code, 302)
+
+    def test_scan_pages_use_preview(self):
+        for name in ('scan_borrow', 'scan_return'):
+            with self.subTest(name):
+                response = self.client.get(reverse(f'librarian:{name}'))
+                self.assertContains(response, 'data-scan-preview="#bookPreview"')
+                self.assertContains(response, reverse('librarian:scan'))
+
+
+class MemberContextApiTestCase(LibrarianTestCase):
+    """Konteks anggota saat kartu dipindai"""
+
+    def get(self, barcode):
+        return self.client.get(reverse('librarian:member_context_api'), {'barcode': barcode})
+
+    def test_context(self):
+        member, book = make_member(), make_book(copies=2)
+        borrow_copy(member, book.bookcopy_set.first().barcode)
+
+        response = self.get(member.barcode)
+        self.assertEqual(response.status_code, 200)
+        context = response.json()['member']
+        self.assertEqual((context['id'], context['active_loans'], context['can_borrow']), (member.pk, 1, True))
+        self.assertEqual(context['loans'][0]['title'], book.title)
+
+    def test_unknown_or_book_barcode(self):
+        book = make_book()
+        for barcode in ('', 'MBR0000', book.bookcopy_set.get().barcode):
+            with self.subTest(barcode=barcode):
+                response = self.get(barcode)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.json()['ok'])
+
+    def test_get_only(self):
+        response = self.client.post(reverse('librarian:member_context_api'), {'barcode': make_member().barcode})
+        self.assertEqual(response.status_code, 405)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.get(make_member().barcode)
+        self.assertEqual(response.status_code, 302)
+
+
+class CheckoutApiTestCase(LibrarianTestCase):
+    """Keranjang peminjaman: anggota -> beberapa buku -> simpan dalam satu transaksi"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+        self.book = make_book(copies=3)
+        self.barcodes = list(self.book.bookcopy_set.order_by('copy_number').values_list('barcode', flat=True))
+        patcher = mock.patch('librarian.views.send_checkout_email.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, name, data=None):
+        return self.client.post(reverse(f'librarian:{name}'), data or {})
+
+    def fill_cart(self, barcodes):
+        self.post('checkout_member_api', {'member_barcode': self.member.barcode})
+        for barcode in barcodes:
+            self.post('checkout_item_api', {'book_barcode': barcode})
+
+    def test_checkout(self):
+        response = self.post('checkout_member_api', {'member_barcode': self.member.barcode})
+        self.assertEqual(response.json()['member']['id'], self.member.pk)
+        self.assertEqual(response.json()['context']['active_loans'], 0)
+        for barcode in self.barcodes[:2]:
+            self.post('checkout_item_api', {'book_barcode': barcode})
+
+        cart = self.client.get(reverse('librarian:checkout_api')).json()
+        self.assertEqual([item['barcode'] for item in cart['items']], self.barcodes[:2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('checkout_commit_api')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([loan['barcode'] for loan in data['loans']], self.barcodes[:2])
+        self.delay.assert_called_once_with([loan['id'] for loan in data['loans']])
+        # Keranjang dikosongkan setelah disimpan
+        self.assertIsNone(self.client.get(reverse('librarian:checkout_api')).json()['member'])
+        context = self.client.get(reverse('librarian:member_context_api'), {'barcode': self.member.barcode})
+        self.assertEqual(context.json()['member']['active_loans'], 2)
+
+    def test_partial_failure_saves_nothing(self):
+        self.fill_cart(self.barcodes)
+        borrow_copy(make_member('1002'), self.barcodes[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('checkout_commit_api')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('sedang dipinjam', response.json()['error'])
+        self.assertFalse(self.member.loan_set.exists())
+        self.delay.assert_not_called()
+        # Keranjang tetap ada supaya salinan yang bermasalah bisa dihapus
+        self.assertEqual(len(self.client.get(reverse('librarian:checkout_api')).json()['items']), 3)
+
+    def test_remove_item_and_cancel(self):
+        self.fill_cart(self.barcodes[:2])
+        response = self.post('checkout_item_api', {'book_barcode': self.barcodes[0], 'action': 'remove'})
+        self.assertEqual([item['barcode'] for item in response.json()['items']], self.barcodes[1:2])
+
+        response = self.post('checkout_cancel_api')
+        self.assertEqual((response.json()['member'], response.json()['items']), (None, []))
+        self.assertEqual(self.post('checkout_commit_api').status_code, 400)
+
+    def test_rejected_items(self):
+        self.fill_cart(self.barcodes[:1])
+        member_barcode = make_member('1002').barcode
+        for barcode, error in [
+            ('BK-TIDAK-ADA', 'tidak ditemukan'),
+            (member_barcode, 'tidak ditemukan'),
+            (self.barcodes[0], 'sudah ada di keranjang'),
+        ]:
+            with self.subTest(barcode=barcode):
+                response = self.post('checkout_item_api', {'book_barcode': barcode})
+                self.assertEqual(response.status_code, 409)
+                self.assertIn(error, response.json()['error'])
+
+    def test_cart_limit(self):
+        book = make_book('9780000000002', copies=CHECKOUT_LIMIT + 1)
+        barcodes = list(book.bookcopy_set.values_list('barcode', flat=True))
+        self.fill_cart(barcodes[:CHECKOUT_LIMIT])
+        response = self.post('checkout_item_api', {'book_barcode': barcodes[-1]})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(f'Maksimal {CHECKOUT_LIMIT}', response.json()['error'])
+
+    def test_items_without_member(self):
+        for name in ('checkout_item_api', 'checkout_commit_api'):
+            with self.subTest(name):
+                response = self.post(name, {'book_barcode': self.barcodes[0]})
+                self.assertEqual(response.status_code, 400)
+
+    def test_member_rejected(self):
+        overdue = make_member('1002')
+        borrow_copy(overdue, self.barcodes[0], now=timezone.now() - timedelta(days=30))
+        for barcode, error in [('', 'tidak ditemukan'), (overdue.barcode, 'tunggakan')]:
+            with self.subTest(barcode=barcode):
+                response = self.post('checkout_member_api', {'member_barcode': barcode})
+                self.assertEqual(response.status_code, 409)
+                self.assertIn(error, response.json()['error'])
+
+    def test_login_and_method_required(self):
+        self.assertEqual(self.client.get(reverse('librarian:checkout_commit_api')).status_code, 405)
+        self.client.logout()
+        for name in ('checkout_member_api', 'checkout_item_api', 'checkout_commit_api', 'checkout_cancel_api'):
+            with self.subTest(name):
+                self.assertEqual(self.post(name).status_code, 302)
+        self.assertEqual(self.client.get(reverse('librarian:checkout_api')).status_code, 302)
+
+
+class BulkReturnApiTestCase(LibrarianTestCase):
+    """Pengembalian massal dari drop box"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('librarian.views.send_bulk_return_email.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, barcodes):
+        return self.client.post(reverse('librarian:bulk_return_api'), {'barcodes': '\n'.join(barcodes)})
+
+    def test_partial_results(self):
+        first, second = make_member(), make_member('1002')
+        book = make_book(copies=4)
+        barcodes = list(book.bookcopy_set.order_by('copy_number').values_list('barcode', flat=True))
+        # Peminjaman terlambat dibuat terakhir (setelahnya anggota tidak bisa meminjam)
+        on_time = borrow_copy(first, barcodes[0])
+        late = borrow_copy(first, barcodes[1], now=timezone.now() - timedelta(days=10))
+        loans = [on_time, late, borrow_copy(second, barcodes[2])]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(barcodes + [barcodes[0], 'BK-TIDAK-ADA'])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['returned'], 3)
+        self.assertEqual(
+            [row['status'] for row in data['results']],
+            ['dikembalikan'] * 3 + ['tidak_dipinjam', 'duplikat', 'tidak_ditemukan'],
+        )
+        self.assertEqual(data['results'][1]['days_late'], 3)
+        self.assertEqual(Decimal(data['total_fine']), Decimal(data['results'][1]['fine_amount']))
+        self.assertGreater(Decimal(data['total_fine']), 0)
+        # Satu email per anggota
+        self.assertCountEqual(self.delay.call_args_list, [
+            mock.call(first.pk, [loans[0].pk, loans[1].pk]),
+            mock.call(second.pk, [loans[2].pk]),
+        ])
+
+    def test_nothing_returned(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(['BK-TIDAK-ADA'])
+        self.assertEqual(response.json()['returned'], 0)
+        self.delay.assert_not_called()
+
+    def test_bad_payload(self):
+        for barcodes, error in [([], 'minimal satu'), (['BK'] * (BULK_RETURN_LIMIT + 1), 'Maksimal')]:
+            with self.subTest(count=len(barcodes)):
+                response = self.post(barcodes)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(error, response.json()['error'])
+
+    def test_login_and_method_required(self):
+        self.assertEqual(self.client.get(reverse('librarian:bulk_return_api')).status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.post(['BK']).status_code, 302)
+
+
+class BookAddTestCase(LibrarianTestCase):
+    """Tambah buku dari halaman librarian"""
+
+    def cover(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 60), 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile('cover.png', buffer.getvalue(), content_type='image/png')
+
+    def test_broker_down_still_creates_copies(self):
+        data = {
+            'title': 'Laskar Pelangi', 'author': 'Andrea Hirata', 'publisher': 'Bentang',
+            'year_published': '2005', 'isbn': '9789793062792', 'category': 'fiksi',
+            'total_copies': '3', 'cover_image': self.cover(),
+        }
+        delay = mock.patch('books.signals.generate_cover_variants.delay', side_effect=OperationalError('broker mati'))
+        with delay, self.assertLogs('books.signals', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('librarian:book_add'), data)
+
+        book = Book.objects.get(isbn='9789793062792')
+        self.assertRedirects(response, reverse('librarian:book_detail', args=[book.pk]), fetch_redirect_response=False)
+        self.assertEqual(book.bookcopy_set.count(), 3)
+        self.assertEqual(book.copy_count, 3)
+        self.assertEqual(book.get_cover_variants(), {})
@@ -9,12 +9,26 @@ app_name = 'librarian'
 urlpatterns = [
     # Dashboard
     path('', views.dashboard_view, name='dashboard'),
+    path('charts/<slug:chart>/', views.dashboard_chart_data, name='dashboard_chart'),
     
     # Scan Barcode
     path('scan-borrow/', views.scan_borrow_view, name='scan_borrow'),
     path('scan-return/', views.scan_return_view, name='scan_return'),
     path('process-borrow/', views.process_borrow, name='process_borrow'),
     path('process-return/', views.process_return, name='process_return'),
+    path('api/member-context/', views.member_context_api, name='member_context_api'),
+    path('api/borrow/', views.borrow_api, name='borrow_api'),
+    path('api/return/', views.return_api, name='return_api'),
+    path('checkout/', views.checkout_view, name='checkout'),
+    path('api/checkout/', views.checkout_api, name='checkout_api'),
+    path('api/checkout/member/', views.checkout_member_api, name='checkout_member_api'),
+    path('api/checkout/items/', views.checkout_item_api, name='checkout_item_api'),
+    path('api/checkout/commit/', views.checkout_commit_api, name='checkout_commit_api'),
+    path('api/checkout/cancel/', views.checkout_cancel_api, name='checkout_cancel_api'),
+    path('bulk-return/', views.bulk_return_view, name='bulk_return'),
+    path('api/bulk-return/', views.bulk_return_api, name='bulk_return_api'),
+    path('autocomplete/', views.autocomplete_view, name='autocomplete'),
+    path('scan/', views.scan_view, name='scan'),
     
     # Active Loans
     path('active-loans/', views.active_loans_view, name='active_loans'),
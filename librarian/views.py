@@ -1,15 +1,22 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
-from django.db.models import Q, Count
-from datetime import timedelta
-from django.http import HttpResponse
-import json
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_POST
 
 from users.models import Member
 from books.models import Book, BookCopy
+from books.detail import load_book_detail
+from books.recommendations import get_recommendations
+from books.fragments import attach_book_cards
 from loans.models import Loan
+from loans.services import (
+    BULK_RETURN_LIMIT, CHECKOUT_LIMIT, CirculationError, borrow_copy, check_eligible,
+    checkout_copies, find_member, return_copies, return_copy,
+)
 
 # Import untuk PDF
 from reportlab.lib.pagesizes import letter
@@ -17,129 +24,94 @@ from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 import io
+import logging
+from decimal import Decimal
 
 # Import Celery tasks
-from loans.tasks import send_loan_success_email, send_return_success_email
+from loans.tasks import (
+    send_bulk_return_email, send_checkout_email, send_loan_success_email, send_return_success_email,
+)
+
+from library_system.cache import LRUCache
+from library_system.pagination import KeysetPaginator, render_keyset_page
+from library_system.search import search_ordering
+
+from .dashboard import CHARTS, TREND_RANGES, get_chart_data, get_dashboard_snapshot
+from .member_context import get_member_context
+from .scan import resolve_barcode
+
+logger = logging.getLogger(__name__)
+
+
+# Jumlah kartu buku per halaman daftar buku (habis dibagi 2, 3 dan 4 kolom)
+BOOKS_PAGE_SIZE = 24
+
+# Autocomplete meja scan: jumlah saran & panjang minimal input
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+# Awalan yang sering dicari: simpan id hasilnya per proses (data tetap diambil segar)
+autocomplete_cache = LRUCache(maxsize=512, ttl=60)
+
+
+def _parse_trend_range(request):
+    """Rentang chart trend dari query string: 7/30/365 hari (default 7)"""
+    try:
+        trend_range = int(request.GET.get('range', 7))
+    except ValueError:
+        trend_range = 7
+    if trend_range not in TREND_RANGES:
+        trend_range = 7
+    return trend_range
 
 
 @login_required
 def dashboard_view(request):
     """
     Dashboard Librarian dengan Chart
+    Counter & tabel diambil dari snapshot cache (lihat librarian/dashboard.py),
+    data chart dimuat browser setelah halaman tampil (dashboard_chart_data)
     """
-    # Update status peminjaman yang terlambat
-    overdue_loans = Loan.objects.filter(
-        status='dipinjam',
-        due_date__lt=timezone.now()
-    )
-    for loan in overdue_loans:
-        loan.update_status()
-    
-    # Statistik Utama
-    total_books = Book.objects.count()
-    total_members = Member.objects.filter(is_active=True).count()
-    active_loans = Loan.objects.filter(status__in=['dipinjam', 'terlambat']).count()
-    overdue_loans_count = Loan.objects.filter(status='terlambat').count()
-    
-    # Aktivitas hari ini
-    today = timezone.now().date()
-    today_borrows = Loan.objects.filter(borrowed_date__date=today).count()
-    today_returns = Loan.objects.filter(return_date__date=today).count()
-    
-    # Alert jatuh tempo (3 hari ke depan)
-    three_days_later = timezone.now() + timedelta(days=3)
-    upcoming_due = Loan.objects.filter(
-        status='dipinjam',
-        due_date__lte=three_days_later,
-        due_date__gte=timezone.now()
-    ).select_related('member', 'book_copy__book').order_by('due_date')[:5]
-    
-    # Peminjaman terbaru
-    recent_loans = Loan.objects.select_related(
-        'member', 'book_copy__book'
-    ).order_by('-borrowed_date')[:10]
-    
-    # Buku populer (top 5)
-    popular_books = Book.objects.annotate(
-        loan_count=Count('bookcopy__loan')
-    ).order_by('-loan_count')[:5]
-    
-    # ========== DATA UNTUK CHART ==========
-    
-    # 1. Peminjaman per Kategori Buku (Bar Chart)
-    category_stats = Book.objects.values('category').annotate(
-        total_loans=Count('bookcopy__loan')
-    ).order_by('-total_loans')
-    
-    categories = [dict(Book.CATEGORY_CHOICES).get(item['category'], item['category']) for item in category_stats]
-    category_loans = [item['total_loans'] for item in category_stats]
-    
-    # 2. Trend Peminjaman 7 Hari Terakhir (Line Chart)
-    last_7_days = []
-    loans_per_day = []
-    returns_per_day = []
-    
-    for i in range(6, -1, -1):
-        date = timezone.now().date() - timedelta(days=i)
-        last_7_days.append(date.strftime('%d %b'))
-        
-        # Hitung peminjaman per hari
-        borrows = Loan.objects.filter(borrowed_date__date=date).count()
-        loans_per_day.append(borrows)
-        
-        # Hitung pengembalian per hari
-        returns = Loan.objects.filter(return_date__date=date).count()
-        returns_per_day.append(returns)
-    
-    # 3. Distribusi Tipe Anggota (Pie Chart)
-    member_types = Member.objects.filter(is_active=True).values('member_type').annotate(
-        count=Count('id')
-    )
-    
-    member_type_labels = [dict(Member.MEMBER_TYPE_CHOICES).get(item['member_type'], item['member_type']) for item in member_types]
-    member_type_counts = [item['count'] for item in member_types]
-    
-    # 4. Status Peminjaman (Doughnut Chart)
-    loan_status = Loan.objects.values('status').annotate(
-        count=Count('id')
-    )
-    
-    status_labels = []
-    status_counts = []
-    for item in loan_status:
-        if item['status'] == 'dipinjam':
-            status_labels.append('Dipinjam')
-        elif item['status'] == 'terlambat':
-            status_labels.append('Terlambat')
-        elif item['status'] == 'dikembalikan':
-            status_labels.append('Dikembalikan')
-        status_counts.append(item['count'])
+    snapshot, cache_hit = get_dashboard_snapshot()
     
     context = {
         # Statistik Utama
-        'total_books': total_books,
-        'total_members': total_members,
-        'active_loans': active_loans,
-        'overdue_loans_count': overdue_loans_count,
-        'today_borrows': today_borrows,
-        'today_returns': today_returns,
-        'upcoming_due': upcoming_due,
-        'recent_loans': recent_loans,
-        'popular_books': popular_books,
+        'summary': snapshot['summary'],
+        'upcoming_due': snapshot['upcoming_due'],
+        'recent_loans': snapshot['recent_loans'],
+        'popular_books': snapshot['popular_books'],
+        'snapshot_built_at': snapshot['built_at'],
         
-        # Data untuk Chart (JSON format)
-        'categories': json.dumps(categories),
-        'category_loans': json.dumps(category_loans),
-        'last_7_days': json.dumps(last_7_days),
-        'loans_per_day': json.dumps(loans_per_day),
-        'returns_per_day': json.dumps(returns_per_day),
-        'member_type_labels': json.dumps(member_type_labels),
-        'member_type_counts': json.dumps(member_type_counts),
-        'status_labels': json.dumps(status_labels),
-        'status_counts': json.dumps(status_counts),
+        # Rentang awal chart trend
+        'trend_range': _parse_trend_range(request),
+        'trend_ranges': TREND_RANGES,
     }
     
-    return render(request, 'librarian/dashboard.html', context)
+    response = render(request, 'librarian/dashboard.html', context)
+    response['X-Dashboard-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
+
+@login_required
+@require_GET
+def dashboard_chart_data(request, chart):
+    """
+    Data satu chart dashboard dalam format JSON
+    Tiap chart punya cache & ETag sendiri; browser selalu revalidasi
+    (If-None-Match) dan mendapat 304 jika data belum berubah
+    """
+    if chart not in CHARTS:
+        raise Http404("Chart tidak ditemukan")
+    
+    entry, cache_hit = get_chart_data(chart, trend_range=_parse_trend_range(request))
+    
+    response = get_conditional_response(request, etag=entry['etag'])
+    if response is None:
+        response = HttpResponse(entry['content'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['X-Dashboard-Cache'] = 'hit' if cache_hit else 'miss'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -158,6 +130,94 @@ def scan_return_view(request):
     return render(request, 'librarian/scan_return.html')
 
 
+def _book_suggestion(book):
+    """Data saran autocomplete untuk buku (beserta barcode tiap salinan)"""
+    return {
+        'type': 'book',
+        'id': book.pk,
+        'title': book.title,
+        'author': book.author,
+        'available_copies': book.available_copies,
+        'copies': [
+            {
+                'barcode': copy.barcode,
+                'copy_number': copy.copy_number,
+                'is_available': copy.is_available,
+            }
+            for copy in book.bookcopy_set.all()
+        ],
+    }
+
+
+def _member_suggestion(member):
+    """Data saran autocomplete untuk anggota"""
+    return {
+        'type': 'member',
+        'id': member.pk,
+        'name': member.name,
+        'nis': member.nis,
+        'barcode': member.barcode,
+        'member_type': member.get_member_type_display(),
+        'is_active': member.is_active,
+    }
+
+
+@login_required
+@require_GET
+def autocomplete_view(request):
+    """
+    Autocomplete buku/anggota untuk halaman scan (label barcode rusak)
+    GET ?type=book|member&q=potongan nama
+    Pencarian memakai index pg_trgm; id hasil per awalan disimpan di LRU
+    """
+    kind = request.GET.get('type', 'book')
+    if kind not in ('book', 'member'):
+        return JsonResponse({'error': 'Tipe autocomplete tidak dikenal'}, status=400)
+    
+    text = ' '.join(request.GET.get('q', '').split())[:100]
+    if len(text) < AUTOCOMPLETE_MIN_LENGTH:
+        return JsonResponse({'results': []})
+    
+    model = Book if kind == 'book' else Member
+    ids = autocomplete_cache.get_or_set(
+        (kind, text.lower()),
+        lambda: list(model.objects.autocomplete(text).values_list('pk', flat=True)[:AUTOCOMPLETE_LIMIT]),
+    )
+    
+    if kind == 'book':
+        rows = Book.objects.filter(pk__in=ids).prefetch_related(
+            Prefetch('bookcopy_set', queryset=BookCopy.objects.order_by('copy_number'))
+        )
+        serialize = _book_suggestion
+    else:
+        rows = Member.objects.filter(pk__in=ids)
+        serialize = _member_suggestion
+    
+    # Urutan mengikuti kemiripan dari hasil pencarian
+    by_id = {row.pk: row for row in rows}
+    results = [serialize(by_id[pk]) for pk in ids if pk in by_id]
+    return JsonResponse({'results': results})
+
+
+@login_required
+@require_GET
+def scan_view(request):
+    """
+    Scan apa saja: barcode kartu anggota (MBR...) atau salinan buku (BK...)
+    GET ?barcode=... -> {'result': {'kind', 'id', 'barcode', 'label', 'detail', ...}}
+    Dibaca dari cache resolusi barcode (lihat scan.py), bukan dari database
+    Dipakai pratinjau barcode di halaman scan (includes/scan_preview.html)
+    """
+    barcode = request.GET.get('barcode', '').strip()
+    if not barcode:
+        return JsonResponse({'error': 'Barcode harus diisi'}, status=400)
+    
+    record = resolve_barcode(barcode)
+    if record is None:
+        return JsonResponse({'error': 'Barcode tidak dikenal'}, status=404)
+    return JsonResponse({'result': record.as_dict()})
+
+
 @login_required
 def process_borrow(request):
     """
@@ -172,42 +232,14 @@ def process_borrow(request):
             messages.error(request, 'Barcode anggota dan buku harus diisi!')
             return redirect('librarian:scan_borrow')
         
-        # Cari member
-        try:
-            member = Member.objects.get(barcode=member_barcode, is_active=True)
-        except Member.DoesNotExist:
-            messages.error(request, 'Anggota tidak ditemukan atau tidak aktif!')
-            return redirect('librarian:scan_borrow')
-        
-        # Cek apakah member punya tunggakan
-        if member.has_overdue_loans():
-            messages.error(request, f'{member.name} memiliki tunggakan! Harap kembalikan buku yang terlambat terlebih dahulu.')
-            return redirect('librarian:scan_borrow')
-        
-        # Cari book copy
+        # Cari member, kunci salinan & buat loan (satu transaksi, counter buku ikut)
         try:
-            book_copy = BookCopy.objects.get(barcode=book_barcode)
-        except BookCopy.DoesNotExist:
-            messages.error(request, 'Buku tidak ditemukan!')
+            member = find_member(member_barcode)
+            loan = borrow_copy(member, book_barcode)
+        except CirculationError as e:
+            messages.error(request, str(e))
             return redirect('librarian:scan_borrow')
-        
-        # Cek ketersediaan
-        if not book_copy.is_available:
-            messages.error(request, f'Buku "{book_copy.book.title}" sedang dipinjam!')
-            return redirect('librarian:scan_borrow')
-        
-        # Buat loan record
-        loan = Loan.objects.create(
-            member=member,
-            book_copy=book_copy,
-            borrowed_date=timezone.now(),
-            due_date=timezone.now() + timedelta(days=7),
-            status='dipinjam'
-        )
-        
-        # Update ketersediaan
-        book_copy.is_available = False
-        book_copy.save()
+        book_copy = loan.book_copy
         
         # KIRIM EMAIL NOTIFICATION (ASYNC dengan Celery)
         try:
@@ -247,26 +279,13 @@ def process_return(request):
             messages.error(request, 'Barcode buku harus diisi!')
             return redirect('librarian:scan_return')
         
-        # Cari book copy
+        # Kunci salinan & proses pengembalian (satu transaksi)
         try:
-            book_copy = BookCopy.objects.get(barcode=book_barcode)
-        except BookCopy.DoesNotExist:
-            messages.error(request, 'Buku tidak ditemukan!')
+            loan = return_copy(book_barcode)
+        except CirculationError as e:
+            messages.error(request, str(e))
             return redirect('librarian:scan_return')
         
-        # Cari loan aktif
-        try:
-            loan = Loan.objects.get(
-                book_copy=book_copy,
-                status__in=['dipinjam', 'terlambat']
-            )
-        except Loan.DoesNotExist:
-            messages.error(request, 'Tidak ada peminjaman aktif untuk buku ini!')
-            return redirect('librarian:scan_return')
-        
-        # Proses pengembalian
-        loan.return_book()
-        
         # KIRIM EMAIL NOTIFICATION (ASYNC dengan Celery)
         try:
             send_return_success_email.delay(loan.id)
@@ -285,45 +304,314 @@ def process_return(request):
     return redirect('librarian:scan_return')
 
 
+def _queue_email(task, *args):
+    """Antrikan email setelah commit (broker mati tidak menggagalkan sirkulasi)"""
+    def send():
+        try:
+            task.delay(*args)
+        except Exception:
+            logger.exception("Gagal mengantrekan email %s %s", task.name, args)
+    transaction.on_commit(send)
+
+
+def _scan_error(message, status=409):
+    return JsonResponse({'ok': False, 'error': message}, status=status)
+
+
+@login_required
+@require_GET
+def member_context_api(request):
+    """
+    Konteks anggota untuk meja scan, ditampilkan begitu kartu dipindai
+    GET ?barcode=MBR... -> {'ok', 'member': {nama, tipe, peminjaman aktif, denda, can_borrow, ...}}
+    """
+    record = resolve_barcode(request.GET.get('barcode', ''))
+    if record is None or record.kind != 'member':
+        return _scan_error('Anggota tidak ditemukan!', status=404)
+    
+    context = get_member_context(record.id)
+    if context is None:
+        return _scan_error('Anggota tidak ditemukan!', status=404)
+    return JsonResponse({'ok': True, 'member': context})
+
+
+@login_required
+@require_POST
+def borrow_api(request):
+    """
+    Peminjaman dari halaman scan lewat fetch (satu round trip, tanpa redirect)
+    POST member_barcode, book_barcode -> {'ok', 'loan', 'book', 'member'}
+    """
+    member_barcode = request.POST.get('member_barcode', '').strip()
+    book_barcode = request.POST.get('book_barcode', '').strip()
+    if not member_barcode or not book_barcode:
+        return _scan_error('Barcode anggota dan buku harus diisi!', status=400)
+    
+    try:
+        member = find_member(member_barcode)
+        loan = borrow_copy(member, book_barcode)
+    except CirculationError as e:
+        return _scan_error(str(e))
+    
+    _queue_email(send_loan_success_email, loan.id)
+    return JsonResponse({
+        'ok': True,
+        'loan': {
+            'id': loan.pk,
+            'due_date': loan.due_date,
+            'due_date_display': loan.due_date.strftime('%d %B %Y'),
+        },
+        'book': resolve_barcode(book_barcode).as_dict(),
+        'member': get_member_context(member.pk),
+        'email': member.email or None,
+    })
+
+
+@login_required
+@require_POST
+def return_api(request):
+    """
+    Pengembalian dari halaman scan lewat fetch (satu round trip, tanpa redirect)
+    POST book_barcode -> {'ok', 'loan', 'book', 'member'}
+    """
+    book_barcode = request.POST.get('book_barcode', '').strip()
+    if not book_barcode:
+        return _scan_error('Barcode buku harus diisi!', status=400)
+    
+    try:
+        loan = return_copy(book_barcode)
+    except CirculationError as e:
+        return _scan_error(str(e))
+    
+    _queue_email(send_return_success_email, loan.id)
+    return JsonResponse({
+        'ok': True,
+        'loan': {
+            'id': loan.pk,
+            'borrowed_date': loan.borrowed_date,
+            'due_date': loan.due_date,
+            'return_date': loan.return_date,
+            'fine_amount': loan.fine_amount,
+            'fine_display': f'Rp {loan.fine_amount:,.0f}',
+            'days_late': max((loan.return_date - loan.due_date).days, 0),
+        },
+        'book': resolve_barcode(book_barcode).as_dict(),
+        'member': get_member_context(loan.member_id),
+    })
+
+
+# Key session keranjang peminjaman: {'member': barcode, 'items': [barcode, ...]}
+CHECKOUT_SESSION_KEY = 'checkout_cart'
+
+
+def _checkout_state(cart):
+    """Isi keranjang untuk response (dibaca dari cache resolusi barcode, tanpa query)"""
+    member = resolve_barcode(cart['member']) if cart else None
+    items = [resolve_barcode(barcode) for barcode in cart['items']] if cart else []
+    return {
+        'ok': True,
+        'member': member.as_dict() if member else None,
+        'items': [item.as_dict() for item in items if item is not None],
+        'limit': CHECKOUT_LIMIT,
+    }
+
+
+@login_required
+def checkout_view(request):
+    """
+    Halaman keranjang peminjaman: scan anggota sekali, scan beberapa buku, simpan
+    """
+    return render(request, 'librarian/checkout.html', {'limit': CHECKOUT_LIMIT})
+
+
+@login_required
+@require_GET
+def checkout_api(request):
+    """Isi keranjang peminjaman di session"""
+    return JsonResponse(_checkout_state(request.session.get(CHECKOUT_SESSION_KEY)))
+
+
+@login_required
+@require_POST
+def checkout_member_api(request):
+    """
+    Mulai keranjang baru untuk anggota (status & tunggakan dicek di sini)
+    POST member_barcode
+    """
+    try:
+        member = find_member(request.POST.get('member_barcode', '').strip())
+        check_eligible(member)
+    except CirculationError as e:
+        return _scan_error(str(e))
+    
+    cart = {'member': member.barcode, 'items': []}
+    request.session[CHECKOUT_SESSION_KEY] = cart
+    return JsonResponse({**_checkout_state(cart), 'context': get_member_context(member.pk)})
+
+
+@login_required
+@require_POST
+def checkout_item_api(request):
+    """
+    Tambah/hapus salinan di keranjang (tanpa query: barcode dari cache resolusi)
+    POST book_barcode, action=add|remove
+    Ketersediaan baru dicek saat keranjang disimpan
+    """
+    cart = request.session.get(CHECKOUT_SESSION_KEY)
+    if not cart:
+        return _scan_error('Scan barcode anggota terlebih dahulu!', status=400)
+    
+    barcode = request.POST.get('book_barcode', '').strip()
+    if request.POST.get('action') == 'remove':
+        cart['items'] = [item for item in cart['items'] if item != barcode]
+    else:
+        record = resolve_barcode(barcode)
+        if record is None or record.kind != 'copy':
+            return _scan_error('Buku tidak ditemukan!')
+        if barcode in cart['items']:
+            return _scan_error(f'"{record.label}" sudah ada di keranjang')
+        if len(cart['items']) >= CHECKOUT_LIMIT:
+            return _scan_error(f'Maksimal {CHECKOUT_LIMIT} buku per peminjaman!')
+        cart['items'].append(barcode)
+    
+    request.session[CHECKOUT_SESSION_KEY] = cart
+    return JsonResponse(_checkout_state(cart))
+
+
+@login_required
+@require_POST
+def checkout_commit_api(request):
+    """
+    Simpan keranjang: semua Loan dibuat dalam satu transaksi, satu email
+    -> {'ok', 'loans': [...], 'member'}
+    """
+    cart = request.session.get(CHECKOUT_SESSION_KEY)
+    if not cart:
+        return _scan_error('Scan barcode anggota terlebih dahulu!', status=400)
+    
+    try:
+        member = find_member(cart['member'])
+        loans = checkout_copies(member, cart['items'])
+    except CirculationError as e:
+        return _scan_error(str(e))
+    
+    del request.session[CHECKOUT_SESSION_KEY]
+    _queue_email(send_checkout_email, [loan.pk for loan in loans])
+    return JsonResponse({
+        'ok': True,
+        'loans': [
+            {
+                'id': loan.pk,
+                'barcode': loan.book_copy.barcode,
+                'title': loan.book_copy.book.title,
+                'due_date': loan.due_date,
+                'due_date_display': loan.due_date.strftime('%d %B %Y'),
+            }
+            for loan in loans
+        ],
+        'member': get_member_context(member.pk),
+        'email': member.email or None,
+    })
+
+
+@login_required
+@require_POST
+def checkout_cancel_api(request):
+    """Kosongkan keranjang peminjaman"""
+    request.session.pop(CHECKOUT_SESSION_KEY, None)
+    return JsonResponse(_checkout_state(None))
+
+
+@login_required
+def bulk_return_view(request):
+    """
+    Halaman pengembalian massal (isi drop box setelah akhir pekan)
+    """
+    return render(request, 'librarian/bulk_return.html', {'limit': BULK_RETURN_LIMIT})
+
+
+def _bulk_return_row(result):
+    """Satu baris tabel hasil pengembalian massal"""
+    row = {'barcode': result.barcode, 'status': result.status, 'message': result.message}
+    loan = result.loan
+    if loan is not None:
+        row.update({
+            'loan_id': loan.pk,
+            'title': loan.book_copy.book.title,
+            'copy_number': loan.book_copy.copy_number,
+            'member': loan.member.name,
+            'due_date': loan.due_date,
+            'fine_amount': loan.fine_amount,
+            'days_late': max((loan.return_date - loan.due_date).days, 0),
+        })
+    return row
+
+
+@login_required
+@require_POST
+def bulk_return_api(request):
+    """
+    Pengembalian massal dalam satu transaksi
+    POST barcodes (satu barcode per baris) -> {'ok', 'returned', 'total_fine', 'results': [...]}
+    Email dikirim satu per anggota (bukan satu per buku)
+    """
+    barcodes = request.POST.get('barcodes', '').split()
+    if not barcodes:
+        return _scan_error('Scan minimal satu barcode buku!', status=400)
+    
+    try:
+        results = return_copies(barcodes)
+    except CirculationError as e:
+        return _scan_error(str(e), status=400)
+    
+    loans_by_member = {}
+    for result in results:
+        if result.loan is not None:
+            loans_by_member.setdefault(result.loan.member_id, []).append(result.loan.pk)
+    for member_id, loan_ids in loans_by_member.items():
+        _queue_email(send_bulk_return_email, member_id, loan_ids)
+    
+    returned = [result.loan for result in results if result.loan is not None]
+    return JsonResponse({
+        'ok': True,
+        'returned': len(returned),
+        'total_fine': sum((loan.fine_amount for loan in returned), Decimal('0.00')),
+        'results': [_bulk_return_row(result) for result in results],
+    })
+
+
 @login_required
 def active_loans_view(request):
     """
     Daftar peminjaman aktif
     """
-    # Update status
-    overdue_loans = Loan.objects.filter(
-        status='dipinjam',
-        due_date__lt=timezone.now()
+    # Get active loans (status & denda berjalan dihitung saat dibaca)
+    loans = Loan.objects.active().with_effective_status().select_related(
+        'member', 'book_copy__book'
     )
-    for loan in overdue_loans:
-        loan.update_status()
-    
-    # Get active loans
-    loans = Loan.objects.filter(
-        status__in=['dipinjam', 'terlambat']
-    ).select_related('member', 'book_copy__book').order_by('due_date')
     
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        loans = loans.filter(
-            Q(member__name__icontains=search_query) |
-            Q(member__nis__icontains=search_query) |
-            Q(book_copy__book__title__icontains=search_query)
-        )
+        loans = loans.search(search_query)
     
     # Filter by status
     status_filter = request.GET.get('status', '')
     if status_filter:
-        loans = loans.filter(status=status_filter)
+        loans = loans.filter(effective_status=status_filter)
+    
+    # Keyset pagination (jatuh tempo terdekat dulu)
+    page = KeysetPaginator(loans, ['due_date']).get_page(request.GET.get('cursor'))
     
     context = {
-        'loans': loans,
+        'loans': page,
         'search_query': search_query,
         'status_filter': status_filter,
     }
     
-    return render(request, 'librarian/active_loans.html', context)
+    return render_keyset_page(
+        request, 'librarian/active_loans.html', 'librarian/_active_loans_rows.html', context, page
+    )
 
 
 # ============= MEMBERS MANAGEMENT =============
@@ -333,17 +621,12 @@ def members_list_view(request):
     """
     Daftar anggota
     """
-    members = Member.objects.all().order_by('-created_at')
+    members = Member.objects.all()
     
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        members = members.filter(
-            Q(name__icontains=search_query) |
-            Q(nis__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        members = members.search(search_query)
     
     # Filter by type
     member_type = request.GET.get('type', '')
@@ -356,15 +639,21 @@ def members_list_view(request):
     elif status == 'inactive':
         members = members.filter(is_active=False)
     
+    # Keyset pagination (relevansi jika mencari, selain itu anggota terbaru dulu)
+    ordering = search_ordering(members, default=['-created_at'])
+    page = KeysetPaginator(members, ordering).get_page(request.GET.get('cursor'))
+    
     context = {
-        'members': members,
+        'members': page,
         'search_query': search_query,
         'selected_type': member_type,
         'selected_status': status,
         'member_types': Member.MEMBER_TYPE_CHOICES,
     }
     
-    return render(request, 'librarian/members_list.html', context)
+    return render_keyset_page(
+        request, 'librarian/members_list.html', 'librarian/_members_list_rows.html', context, page
+    )
 
 
 @login_required
@@ -421,7 +710,7 @@ def member_detail_view(request, pk):
     member = get_object_or_404(Member, pk=pk)
     
     # Get loan history
-    loans = member.loan_set.all().select_related('book_copy__book').order_by('-borrowed_date')[:10]
+    loans = member.loan_set.with_effective_status().select_related('book_copy__book').order_by('-borrowed_date')[:10]
     
     context = {
         'member': member,
@@ -572,31 +861,35 @@ def books_list_view(request):
     """
     Daftar buku
     """
-    books = Book.objects.all().order_by('-created_at')
+    books = Book.objects.all()
     
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) |
-            Q(author__icontains=search_query) |
-            Q(isbn__icontains=search_query) |
-            Q(publisher__icontains=search_query)
-        )
+        books = books.search(search_query)
     
     # Filter by category
     category = request.GET.get('category', '')
     if category:
         books = books.filter(category=category)
     
+    # Keyset pagination (relevansi jika mencari, selain itu buku terbaru dulu)
+    ordering = search_ordering(books, default=['-created_at'])
+    page = KeysetPaginator(books, ordering, per_page=BOOKS_PAGE_SIZE).get_page(
+        request.GET.get('cursor')
+    )
+    attach_book_cards(page, 'librarian/_book_card.html')
+    
     context = {
-        'books': books,
+        'books': page,
         'search_query': search_query,
         'selected_category': category,
         'categories': Book.CATEGORY_CHOICES,
     }
     
-    return render(request, 'librarian/books_list.html', context)
+    return render_keyset_page(
+        request, 'librarian/books_list.html', 'librarian/_books_list_items.html', context, page
+    )
 
 
 @login_required
@@ -636,7 +929,6 @@ def book_add_view(request):
             isbn=isbn,
             category=category,
             description=description if description else None,
-            total_copies=int(total_copies),
             rating=float(rating),
             cover_image=cover_image if cover_image else None,
         )
@@ -662,7 +954,9 @@ def book_detail_view(request, pk):
     Detail buku
     """
     book = get_object_or_404(Book, pk=pk)
-    book_copies = book.bookcopy_set.all().order_by('copy_number')
+    
+    # Salinan + peminjam aktif + statistik (jumlah query tetap)
+    detail = load_book_detail(book, with_borrowers=True, with_stats=True)
     
     # Get loan history
     loans = Loan.objects.filter(
@@ -671,7 +965,9 @@ def book_detail_view(request, pk):
     
     context = {
         'book': book,
-        'book_copies': book_copies,
+        'book_copies': detail.copies,
+        'detail': detail,
+        'recommendations': get_recommendations(book),
         'loans': loans,
     }
     
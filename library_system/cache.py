@@ -0,0 +1,75 @@
+"""
+Cache kecil di dalam proses (per worker), untuk data panas yang dibaca
+sangat sering tapi boleh sedikit basi, contoh hasil autocomplete per awalan
+Tidak dibagi antar proses; pakai django.core.cache untuk data yang harus
+konsisten di semua worker
+
+Cache bersama (Redis) hanya mempercepat, tidak boleh jadi syarat halaman
+berjalan: pemanggil django.core.cache menangkap CACHE_ERRORS lalu membaca
+database langsung
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+
+# Error dari backend cache bersama (Redis mati, timeout, koneksi putus)
+CACHE_ERRORS = (RedisError, OSError)
+
+
+class LRUCache:
+    """
+    Cache LRU dengan batas jumlah item & umur item (TTL)
+    Thread-safe; item paling lama tidak dipakai dibuang saat penuh
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Ambil item (None/default jika tidak ada atau sudah kedaluwarsa)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """Simpan item, buang item paling lama jika melebihi maxsize"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, default_func):
+        """Ambil item, atau hitung dengan default_func() lalu simpan"""
+        value = self.get(key)
+        if value is None:
+            value = default_func()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        """Hapus satu item (tidak error jika tidak ada)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
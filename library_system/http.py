@@ -0,0 +1,77 @@
+"""
+Conditional GET (ETag / Last-Modified) untuk halaman yang sering dibuka
+View hanya dijalankan jika versi data berubah; selain itu dijawab 304
+tanpa query ORM & tanpa render template
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """ETag (quoted) dari beberapa nilai penyusun versi"""
+    raw = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def latest_timestamp(*values):
+    """Waktu terbaru (unix timestamp) dari beberapa datetime/timestamp, None diabaikan"""
+    timestamps = [
+        value.timestamp() if hasattr(value, 'timestamp') else value
+        for value in values if value
+    ]
+    return max(timestamps) if timestamps else None
+
+
+def conditional_page(state_func, per_user=True):
+    """
+    Decorator view halaman HTML dengan validasi ETag/Last-Modified
+    state_func(request, *args, **kwargs) -> (etag, last_modified)
+      etag: hasil make_etag(), last_modified: unix timestamp atau None
+      Harus murah (agregat / nilai cache), tanpa memuat baris data
+      Boleh mengembalikan None jika versi tidak bisa ditentukan (misal cache
+      mati): view dijalankan biasa, tanpa ETag/Last-Modified
+
+    Halaman berbeda untuk user login & tamu, jadi user ikut dalam ETag
+    (dari state_func) dan response diberi Vary: Cookie. Browser selalu
+    revalidasi (no-cache), response user login tidak boleh disimpan proxy
+    per_user=False untuk data yang sama bagi semua user (misal API JSON):
+    response boleh disimpan cache publik & tanpa Vary: Cookie
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Flash message yang belum tampil harus dirender, jangan dijawab 304
+            if request.method not in ('GET', 'HEAD') or (per_user and len(get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            state = state_func(request, *args, **kwargs)
+            etag, last_modified = state if state is not None else (None, None)
+            response = None
+            if etag is not None:
+                response = get_conditional_response(
+                    request,
+                    etag=etag,
+                    last_modified=int(last_modified) if last_modified else None,
+                )
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+
+            if etag is not None and response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified)
+            if not per_user:
+                patch_cache_control(response, public=True, no_cache=True)
+                return response
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
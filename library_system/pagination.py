@@ -0,0 +1,193 @@
+"""
+Keyset (seek) pagination untuk daftar panjang
+Halaman berikutnya diambil dengan WHERE pada kolom urutan (bukan OFFSET),
+jadi biaya per halaman tetap walaupun tabel berisi ribuan baris, dan tidak
+perlu query COUNT
+
+Cursor berisi nilai kolom urutan dari baris terakhir halaman sebelumnya
+(di-encode base64), sehingga stabil walaupun ada data baru di depan
+"""
+import base64
+import json
+from datetime import date, datetime, time
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.shortcuts import render
+
+
+# Jumlah baris per halaman (default)
+DEFAULT_PAGE_SIZE = 25
+
+
+class InvalidCursor(ValueError):
+    """Cursor rusak atau tidak cocok dengan urutan paginator"""
+    pass
+
+
+class KeysetPage:
+    """Satu halaman hasil keyset pagination (bisa di-iterate seperti list)"""
+
+    def __init__(self, object_list, next_cursor=None, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def next_page_url(self, request, fragment=False):
+        """Query string halaman berikutnya (filter & pencarian tetap dibawa)"""
+        if not self.has_next:
+            return ''
+        params = request.GET.copy()
+        params['cursor'] = self.next_cursor
+        if fragment:
+            params['fragment'] = '1'
+        else:
+            params.pop('fragment', None)
+        return f'{request.path}?{params.urlencode()}'
+
+
+class KeysetPaginator:
+    """
+    Paginator berbasis keyset
+    ordering: list nama field seperti order_by(), contoh ['-created_at']
+    pk selalu ditambahkan di akhir sebagai pemutus seri supaya urutan unik
+    Field urutan harus NOT NULL, boleh juga annotation (misal 'rank' dari
+    full-text search) yang nilainya bisa disimpan di JSON
+    Queryset values() juga bisa, asalkan kolom urutan ikut di values()
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = []
+        for name in ordering:
+            descending = name.startswith('-')
+            self.keys.append((name.lstrip('-'), descending))
+        if self.keys[-1][0] not in ('pk', 'id'):
+            self.keys.append(('pk', self.keys[-1][1]))
+
+    def _to_python(self, name, value):
+        """Ubah nilai dari cursor ke tipe Python sesuai field (annotation apa adanya)"""
+        meta = self.queryset.model._meta
+        try:
+            field = meta.pk if name == 'pk' else meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def _row_value(self, obj, name):
+        """Nilai kolom dari instance model atau baris values() (dict)"""
+        if isinstance(obj, dict):
+            return obj[self.queryset.model._meta.pk.attname if name == 'pk' else name]
+        return getattr(obj, name)
+
+    def encode_cursor(self, obj):
+        """Nilai kolom urutan dari objek (atau baris values()) -> string cursor"""
+        values = []
+        for name, descending in self.keys:
+            value = self._row_value(obj, name)
+            if isinstance(value, (datetime, date, time)):
+                # isoformat supaya mikrodetik tidak hilang
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """String cursor -> list nilai kolom urutan"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(f"Cursor tidak valid: {cursor}") from e
+
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor(f"Cursor tidak cocok: {cursor}")
+
+        # Cursor berasal dari user: hanya nilai skalar JSON yang diterima
+        # (list/dict tidak pernah dibuat encode_cursor dan bisa membuat query error)
+        if not all(isinstance(value, (str, int, float)) for value in values):
+            raise InvalidCursor(f"Cursor tidak valid: {cursor}")
+
+        try:
+            return [
+                self._to_python(name, value)
+                for (name, descending), value in zip(self.keys, values)
+            ]
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor(f"Cursor tidak valid: {cursor}") from e
+
+    def _seek_filter(self, values):
+        """
+        WHERE untuk baris setelah cursor, contoh urutan (-created_at, -pk):
+        created_at <= v1 AND (created_at < v1 OR (created_at = v1 AND pk < v2))
+        Kondisi pertama membuat index kolom urutan bisa dipakai sebagai range
+        """
+        first_name, first_desc = self.keys[0]
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[index]})
+            for (prev_name, prev_desc), prev_value in zip(self.keys[:index], values):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        bound = Q(**{f'{first_name}__{"lte" if first_desc else "gte"}': values[0]})
+        return bound & condition
+
+    def page(self, cursor=None):
+        """
+        Ambil satu halaman setelah cursor (None = halaman pertama)
+        Raises: InvalidCursor
+        """
+        queryset = self.queryset.order_by(*[
+            f'-{name}' if descending else name for name, descending in self.keys
+        ])
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(self.decode_cursor(cursor)))
+
+        # Ambil satu baris lebih untuk tahu apakah masih ada halaman berikutnya
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode_cursor(rows[-1])
+        return KeysetPage(rows, next_cursor=next_cursor, cursor=cursor or None)
+
+    def get_page(self, cursor=None):
+        """Seperti page(), tapi cursor rusak dianggap halaman pertama"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+
+def render_keyset_page(request, template_name, fragment_template_name, context, page):
+    """
+    Render halaman daftar dengan keyset pagination
+    ?fragment=1 -> hanya baris/kartu (untuk infinite scroll)
+    URL halaman berikutnya dikirim lewat header X-Next-Page
+    """
+    context['page'] = page
+    context['next_page_url'] = page.next_page_url(request)
+    if request.GET.get('fragment'):
+        response = render(request, fragment_template_name, context)
+    else:
+        response = render(request, template_name, context)
+    response['X-Next-Page'] = page.next_page_url(request, fragment=True)
+    return response
@@ -0,0 +1,85 @@
+"""
+Full-text search PostgreSQL untuk buku, anggota dan peminjaman
+Setiap model menyimpan kolom tsvector (search_vector) dengan GIN index,
+diperbarui lewat signal post_save, jadi pencarian tidak perlu scan tabel
+
+Teks biasa (judul, deskripsi) memakai konfigurasi 'indonesian' (stemming
+bahasa Indonesia), nama & kode (penulis, NIS, ISBN) memakai 'simple' supaya
+tidak dipotong. Judul juga disimpan dengan 'simple' supaya pencarian awalan
+kata (saat mengetik) tetap cocok walaupun stemmer mengubah kata dasarnya
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+
+# Konfigurasi text search untuk teks bahasa Indonesia & untuk nama/kode
+TEXT_CONFIG = 'indonesian'
+SIMPLE_CONFIG = 'simple'
+
+# Maksimal kata yang dipakai dari input pencarian
+MAX_SEARCH_TERMS = 8
+
+# Satu kata pencarian: huruf/angka, boleh disambung @ . - di tengah (email,
+# kata ulang) supaya diurai parser PostgreSQL sama seperti saat diindeks.
+# Tidak memuat operator tsquery, aman untuk tsquery raw
+SEARCH_TERM_RE = re.compile(r'\w+(?:[@.\-]\w+)*')
+
+
+def build_search_vector(fields):
+    """
+    Gabungkan beberapa kolom jadi satu SearchVector berbobot
+    fields: list of (nama_field, config, weight), contoh ('title', 'indonesian', 'A')
+    """
+    vector = None
+    for name, config, weight in fields:
+        part = SearchVector(name, config=config, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_terms(text):
+    """Pecah input pencarian jadi kata (lihat SEARCH_TERM_RE)"""
+    return SEARCH_TERM_RE.findall((text or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def build_search_query(text):
+    """
+    Buat SearchQuery dari input user
+    Semua kata harus cocok (AND), kata terakhir & lainnya dicocokkan sebagai
+    awalan (prefix :*), dicari dengan config indonesian ATAU simple
+    Returns: SearchQuery atau None jika input kosong
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+    raw = ' & '.join(f'{term}:*' for term in terms)
+    return (
+        SearchQuery(raw, config=TEXT_CONFIG, search_type='raw')
+        | SearchQuery(raw, config=SIMPLE_CONFIG, search_type='raw')
+    )
+
+
+def search(queryset, text, vector_field='search_vector'):
+    """
+    Filter queryset dengan full-text search + annotate relevansi (rank)
+    Returns: queryset yang punya annotation 'rank', atau queryset asli jika input kosong
+
+    ts_rank() bertipe real; di-cast ke double precision supaya nilai rank yang
+    disimpan di cursor keyset pagination bisa dibandingkan persis
+    """
+    query = build_search_query(text)
+    if query is None:
+        return queryset
+    return queryset.filter(**{vector_field: query}).annotate(
+        rank=Cast(SearchRank(F(vector_field), query), FloatField())
+    )
+
+
+def search_ordering(queryset, default):
+    """Urutan hasil: relevansi jika queryset hasil search(), selain itu default"""
+    if 'rank' in queryset.query.annotations:
+        return ['-rank']
+    return default
@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Local apps
     'users',
@@ -192,6 +193,25 @@ SESSION_COOKIE_AGE = 1800  # 30 minutes
 SESSION_SAVE_EVERY_REQUEST = True
 
 
+# ========== CACHE CONFIGURATION ==========
+
+# Cache (Redis) - dipakai untuk snapshot dashboard dll
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': get_env('CACHE_URL', default='redis://localhost:6379/1'),
+        'KEY_PREFIX': 'perpus',
+        'TIMEOUT': 300,
+    }
+}
+
+# Test memakai cache locmem & MEDIA_ROOT sementara (library_system/testing.py)
+TEST_RUNNER = 'library_system.testing.LibraryTestRunner'
+
+# Snapshot dashboard librarian (detik)
+DASHBOARD_CACHE_TIMEOUT = get_env('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+
 # ========== CELERY CONFIGURATION ==========
 
 # Celery Broker (Redis)
@@ -227,6 +247,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'loans.tasks.update_loan_status',
         'schedule': crontab(minute=0),
     },
+    
+    # Task 4: Hitung ulang rekomendasi buku setiap malam jam 02:00
+    'build-book-recommendations': {
+        'task': 'books.tasks.build_book_recommendations',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    
+    # Task 5: Hapus log perubahan katalog lama setiap malam jam 03:00
+    'prune-catalog-changes': {
+        'task': 'books.tasks.prune_catalog_changes',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 
@@ -0,0 +1,69 @@
+"""
+Dasar test untuk semua app
+- LibraryTestRunner (TEST_RUNNER): selama test cache memakai locmem dan
+  MEDIA_ROOT memakai folder sementara, jadi Redis developer & folder media/
+  repo (barcode PNG, cover) tidak tersentuh
+- TestCase / TransactionTestCase: cache & LRU per proses dikosongkan sebelum
+  setiap test. Di TestCase on_commit tidak pernah jalan, jadi record barcode
+  -> id dari test sebelumnya tidak pernah dihapus signal; barcode yang sama
+  (ISBN + nomor salinan) akan menunjuk id yang sudah tidak ada
+"""
+import shutil
+import tempfile
+
+from django import test
+from django.core.cache import cache
+from django.test.runner import DiscoverRunner
+
+from .cache import CACHE_ERRORS
+
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library-tests',
+    }
+}
+
+
+class LibraryTestRunner(DiscoverRunner):
+    """DiscoverRunner dengan cache locmem & MEDIA_ROOT sementara"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='lms-test-media-')
+        self.test_settings = test.override_settings(CACHES=TEST_CACHES, MEDIA_ROOT=self.media_root)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+
+def clear_caches():
+    """Kosongkan cache (locmem saat test) & semua LRU per proses"""
+    from librarian.scan import scan_cache
+    from librarian.views import autocomplete_cache
+
+    try:
+        cache.clear()
+    except CACHE_ERRORS:
+        # Test yang sengaja mematikan cache (override CACHES)
+        pass
+    scan_cache.clear()
+    autocomplete_cache.clear()
+
+
+class TestCase(test.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+
+
+class TransactionTestCase(test.TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
@@ -1,6 +1,5 @@
 from django.contrib import admin
 from .models import Loan
-from django.utils import timezone
 
 
 @admin.register(Loan)
@@ -33,18 +32,16 @@ class LoanAdmin(admin.ModelAdmin):
         """Action untuk menandai sebagai dikembalikan"""
         count = 0
         for loan in queryset:
-            if loan.status != 'dikembalikan':
-                loan.return_book()
+            if loan.status != 'dikembalikan' and loan.return_book():
                 count += 1
         self.message_user(request, f'{count} peminjaman berhasil ditandai sebagai dikembalikan.')
     mark_as_returned.short_description = 'Tandai sebagai dikembalikan'
     
     def update_overdue_status(self, request, queryset):
         """Action untuk update status terlambat"""
-        count = 0
-        for loan in queryset:
-            if loan.status == 'dipinjam' and timezone.now() > loan.due_date:
-                loan.update_status()
-                count += 1
-        self.message_user(request, f'{count} peminjaman diupdate menjadi terlambat.')
+        from librarian.dashboard import invalidate_dashboard_snapshot
+        
+        result = queryset.mark_overdue()
+        invalidate_dashboard_snapshot()
+        self.message_user(request, f"{result['marked']} peminjaman diupdate menjadi terlambat.")
     update_overdue_status.short_description = 'Update status terlambat'
\ No newline at end of file
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from books.models import Book, BookCopy
+from loans.models import Loan
+from loans.services import CirculationError, borrow_copy, return_copy
+from users.models import Member
+
+
+class Command(BaseCommand):
+    help = (
+        'Uji beban sirkulasi: beberapa meja scan meminjam & mengembalikan salinan '
+        'yang sama bersamaan, lalu cek tidak ada peminjaman ganda'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stations',
+            type=int,
+            default=4,
+            help='Jumlah meja scan (thread) yang berjalan bersamaan (default: 4)',
+        )
+        parser.add_argument(
+            '--copies',
+            type=int,
+            default=3,
+            help='Jumlah salinan yang diperebutkan (default: 3)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=100,
+            help='Jumlah scan per meja (default: 100)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Jangan hapus peminjaman hasil uji',
+        )
+
+    def _station(self, member, barcodes, rounds, barrier, loan_ids):
+        """Satu meja scan: pinjam/kembalikan salinan acak"""
+        stats = Counter()
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            for _ in range(rounds):
+                barcode = random.choice(barcodes)
+                try:
+                    if random.random() < 0.5:
+                        loan_ids.append(borrow_copy(member, barcode).pk)
+                        stats['borrowed'] += 1
+                    else:
+                        return_copy(barcode)
+                        stats['returned'] += 1
+                except CirculationError:
+                    stats['rejected'] += 1
+                except Exception as e:
+                    stats['errors'] += 1
+                    self.stderr.write(f'✗ {member.name}: {e}')
+            stats['seconds'] = time.perf_counter() - started
+            return member.name, stats
+        finally:
+            connection.close()
+
+    def _check(self, copy_ids):
+        """Jumlah salinan dengan peminjaman aktif ganda & status tidak konsisten"""
+        double = Loan.objects.active().filter(book_copy__in=copy_ids).values('book_copy').annotate(
+            total=Count('pk')
+        ).filter(total__gt=1).count()
+        active_copies = set(
+            Loan.objects.active().filter(book_copy__in=copy_ids).values_list('book_copy', flat=True)
+        )
+        mismatched = sum(
+            1 for pk, available in BookCopy.objects.filter(pk__in=copy_ids).values_list('pk', 'is_available')
+            if available == (pk in active_copies)
+        )
+        return double, mismatched
+
+    def _cleanup(self, copies, loan_ids):
+        """Kembalikan & hapus peminjaman hasil uji, hitung ulang popularitas"""
+        for copy in copies:
+            try:
+                return_copy(copy.barcode)
+            except CirculationError:
+                pass
+        Loan.objects.filter(pk__in=loan_ids).delete()
+        Book.objects.filter(pk__in={copy.book_id for copy in copies}).rebuild_popularity()
+
+    def handle(self, *args, **options):
+        stations = max(1, options['stations'])
+        copies = list(BookCopy.objects.filter(is_available=True).order_by('?')[:max(1, options['copies'])])
+        members = list(Member.objects.filter(is_active=True).exclude(
+            pk__in=Loan.objects.overdue().values('member')
+        )[:stations])
+        if not copies or not members:
+            raise CommandError('Butuh minimal satu salinan tersedia dan satu anggota aktif tanpa tunggakan')
+
+        barcodes = [copy.barcode for copy in copies]
+        self.stdout.write(
+            f'{stations} meja x {options["rounds"]} scan memperebutkan {len(copies)} salinan...'
+        )
+
+        loan_ids = []
+        barrier = threading.Barrier(stations)
+        with ThreadPoolExecutor(max_workers=stations) as executor:
+            futures = [
+                executor.submit(
+                    self._station, members[i % len(members)], barcodes, options['rounds'], barrier, loan_ids
+                )
+                for i in range(stations)
+            ]
+            results = [future.result() for future in futures]
+
+        total = Counter()
+        for index, (name, stats) in enumerate(results, start=1):
+            total.update(stats)
+            operations = stats['borrowed'] + stats['returned'] + stats['rejected']
+            self.stdout.write(
+                f'  Meja {index} ({name}): {stats["borrowed"]} pinjam, {stats["returned"]} kembali, '
+                f'{stats["rejected"]} ditolak, {stats["errors"]} error '
+                f'- {operations / stats["seconds"]:.1f} scan/detik'
+            )
+
+        operations = total['borrowed'] + total['returned'] + total['rejected']
+        elapsed = max(stats['seconds'] for name, stats in results)
+        self.stdout.write(f'  Total: {operations} scan dalam {elapsed:.2f} detik - {operations / elapsed:.1f} scan/detik')
+
+        double, mismatched = self._check([copy.pk for copy in copies])
+        self.stdout.write(f'✓ Peminjaman dibuat: {len(loan_ids)}, dikembalikan: {total["returned"]}')
+
+        if not options['keep']:
+            self._cleanup(copies, loan_ids)
+            self.stdout.write('✓ Data uji dibersihkan')
+
+        if double or mismatched or total['errors']:
+            raise CommandError(
+                f'Peminjaman ganda: {double} salinan, status tidak konsisten: {mismatched} salinan, '
+                f'error: {total["errors"]}'
+            )
+        self.stdout.write(self.style.SUCCESS('✓ Tidak ada peminjaman ganda!'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status__in', ['dipinjam', 'terlambat'])), fields=['due_date', 'id'], name='loan_active_due_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:17
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+ACTIVE_STATUSES = ['dipinjam', 'terlambat']
+
+
+def check_duplicate_active_loans(apps, schema_editor):
+    """
+    Constraint tidak bisa dibuat jika ada salinan dengan lebih dari satu
+    peminjaman aktif. Data seperti ini tidak diperbaiki otomatis (tidak bisa
+    ditebak peminjaman mana yang benar): migrasi dihentikan dengan daftar
+    peminjamannya supaya petugas mengembalikan yang salah terlebih dahulu
+    """
+    Loan = apps.get_model('loans', 'Loan')
+    active = Loan.objects.filter(status__in=ACTIVE_STATUSES)
+    duplicated = active.values('book_copy').annotate(total=Count('pk')).filter(total__gt=1).values('book_copy')
+
+    problems = {}
+    for copy_id, barcode, loan_id in active.filter(book_copy__in=duplicated).order_by(
+        'book_copy', 'borrowed_date', 'pk'
+    ).values_list('book_copy', 'book_copy__barcode', 'pk'):
+        problems.setdefault((copy_id, barcode), []).append(str(loan_id))
+
+    if problems:
+        lines = '\n'.join(
+            f'  Salinan {barcode or copy_id}: peminjaman #{", #".join(loan_ids)}'
+            for (copy_id, barcode), loan_ids in problems.items()
+        )
+        raise RuntimeError(
+            f'{len(problems)} salinan memiliki lebih dari satu peminjaman aktif:\n{lines}\n'
+            'Kembalikan peminjaman yang salah (status dikembalikan) lalu jalankan migrasi lagi.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_loan_loan_active_due_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_active_loans, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['dipinjam', 'terlambat'])), fields=('book_copy',), name='loan_one_active_per_copy'),
+        ),
+    ]
@@ -1,8 +1,126 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Value, Case, When, ExpressionWrapper
+from django.db.models.functions import ExtractDay
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 from users.models import Member
-from books.models import BookCopy
+from books.models import Book, BookCopy
+from library_system.search import build_search_query
+
+
+# Denda keterlambatan per hari (Rupiah)
+FINE_PER_DAY = 1000
+
+# Jumlah baris maksimal per UPDATE saat update status massal
+OVERDUE_CHUNK_SIZE = 1000
+
+
+def fine_expression(now):
+    """
+    Ekspresi SQL untuk denda keterlambatan per peminjaman
+    (jumlah hari penuh sejak due_date) x FINE_PER_DAY
+    """
+    days_late = ExtractDay(
+        ExpressionWrapper(Value(now) - F('due_date'), output_field=models.DurationField())
+    )
+    return ExpressionWrapper(
+        days_late * FINE_PER_DAY,
+        output_field=models.DecimalField(max_digits=10, decimal_places=2)
+    )
+
+
+class LoanQuerySet(models.QuerySet):
+    """
+    QuerySet untuk Loan
+    Berisi operasi massal berbasis SQL (tanpa save() per baris)
+    dan anotasi status/denda yang dihitung saat dibaca
+    """
+
+    def active(self):
+        """Peminjaman yang belum dikembalikan"""
+        return self.filter(status__in=['dipinjam', 'terlambat'])
+
+    def search(self, text):
+        """
+        Cari peminjaman lewat full-text search anggota & buku
+        Dua subquery (IN) supaya masing-masing memakai GIN index tabelnya sendiri
+        """
+        query = build_search_query(text)
+        if query is None:
+            return self
+        return self.filter(
+            Q(member__in=Member.objects.filter(search_vector=query).values('pk'))
+            | Q(book_copy__book__in=Book.objects.filter(search_vector=query).values('pk'))
+        )
+
+    def overdue(self, now=None):
+        """Peminjaman aktif yang sudah lewat due_date (tidak tergantung kolom status)"""
+        now = now or timezone.now()
+        return self.active().filter(due_date__lt=now)
+
+    def with_effective_status(self, now=None):
+        """
+        Anotasi status & denda yang dihitung dari due_date, return_date dan now()
+        - effective_status: 'dipinjam' / 'terlambat' / 'dikembalikan'
+        - accrued_fine: denda final (sudah kembali) atau denda berjalan (belum kembali)
+        Tidak ada yang ditulis ke database, jadi aman dipakai di halaman GET
+        """
+        now = now or timezone.now()
+        returned = Q(status='dikembalikan')
+        late = Q(due_date__lt=now)
+        return self.annotate(
+            effective_status=Case(
+                When(returned, then=Value('dikembalikan')),
+                When(late, then=Value('terlambat')),
+                default=Value('dipinjam'),
+                output_field=models.CharField(),
+            ),
+            accrued_fine=Case(
+                When(returned, then=F('fine_amount')),
+                When(late, then=fine_expression(now)),
+                default=Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+
+    def _update_in_chunks(self, chunk_size, **values):
+        """
+        Jalankan UPDATE per chunk sampai tidak ada baris yang cocok lagi
+        Setiap chunk adalah satu statement: UPDATE ... WHERE id IN (SELECT id ... LIMIT n)
+        Filter queryset harus berhenti cocok setelah baris di-update
+        """
+        total = 0
+        while True:
+            chunk_ids = self.order_by().values('pk')[:chunk_size]
+            updated = self.model._base_manager.filter(pk__in=chunk_ids).update(**values)
+            total += updated
+            if updated < chunk_size:
+                return total
+
+    def mark_overdue(self, now=None, chunk_size=OVERDUE_CHUNK_SIZE):
+        """
+        Update status terlambat secara massal
+        - 'dipinjam' yang lewat due_date -> 'terlambat' + hitung denda
+        - 'terlambat' yang dendanya sudah tidak sesuai -> perbarui denda
+        Returns: dict {'marked': jumlah status diubah, 'fines_updated': jumlah denda diperbarui}
+        """
+        now = now or timezone.now()
+        fine = fine_expression(now)
+        
+        # Perbarui denda peminjaman yang sudah terlambat (sebelum transisi baru,
+        # supaya baris yang baru ditandai tidak terhitung dua kali)
+        fines_updated = self.filter(
+            status='terlambat',
+            due_date__lt=now,
+        ).exclude(fine_amount=fine)._update_in_chunks(chunk_size, fine_amount=fine)
+        
+        marked = self.filter(
+            status='dipinjam',
+            due_date__lt=now,
+        )._update_in_chunks(chunk_size, status='terlambat', fine_amount=fine)
+        
+        return {'marked': marked, 'fines_updated': fines_updated}
 
 
 class Loan(models.Model):
@@ -59,10 +177,28 @@ class Loan(models.Model):
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = LoanQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Peminjaman'
         verbose_name_plural = 'Peminjaman'
         ordering = ['-borrowed_date']
+        indexes = [
+            # Peminjaman aktif urut jatuh tempo (keyset pagination & cek terlambat)
+            models.Index(
+                fields=['due_date', 'id'],
+                name='loan_active_due_idx',
+                condition=Q(status__in=['dipinjam', 'terlambat']),
+            ),
+        ]
+        constraints = [
+            # Satu salinan hanya boleh punya satu peminjaman aktif
+            models.UniqueConstraint(
+                fields=['book_copy'],
+                name='loan_one_active_per_copy',
+                condition=Q(status__in=['dipinjam', 'terlambat']),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.member.name} - {self.book_copy.book.title}"
@@ -71,27 +207,32 @@ class Loan(models.Model):
         """
         Override save method
         Auto set due_date jika belum ada (7 hari dari sekarang)
+        Peminjaman baru menambah skor popularitas buku dalam transaksi yang sama
         """
         if not self.due_date:
             self.due_date = timezone.now() + timedelta(days=7)
         
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                Book.objects.filter(bookcopy=self.book_copy_id).record_borrow(self.borrowed_date)
     
     def calculate_fine(self):
         """
         Hitung denda keterlambatan
-        Rp 1.000 per hari
+        Rp 1.000 per hari (FINE_PER_DAY)
         """
         if self.status == 'dikembalikan' and self.return_date:
             # Jika sudah dikembalikan, hitung dari return_date
             if self.return_date > self.due_date:
                 days_late = (self.return_date - self.due_date).days
-                self.fine_amount = days_late * 1000
+                self.fine_amount = days_late * FINE_PER_DAY
         elif self.status in ['dipinjam', 'terlambat']:
             # Jika belum dikembalikan, hitung dari sekarang
             if timezone.now() > self.due_date:
                 days_late = (timezone.now() - self.due_date).days
-                self.fine_amount = days_late * 1000
+                self.fine_amount = days_late * FINE_PER_DAY
         
         return self.fine_amount
     
@@ -105,19 +246,30 @@ class Loan(models.Model):
             self.calculate_fine()
             self.save()
     
-    def return_book(self):
+    def return_book(self, now=None):
         """
         Proses pengembalian buku
+        Salinan & peminjaman dikunci dulu (urutan sama dengan peminjaman),
+        jadi pengembalian ganda dari dua meja hanya diproses sekali
+        Returns: False jika peminjaman sudah dikembalikan sebelumnya
         """
-        self.return_date = timezone.now()
-        self.status = 'dikembalikan'
-        self.calculate_fine()
-        
-        # Update ketersediaan book copy
-        self.book_copy.is_available = True
-        self.book_copy.save()
-        
-        self.save()
+        with transaction.atomic():
+            book_copy = BookCopy.objects.select_for_update().get(pk=self.book_copy_id)
+            status = Loan.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
+            if status == 'dikembalikan':
+                self.status = status
+                return False
+            
+            self.return_date = now or timezone.now()
+            self.status = 'dikembalikan'
+            self.calculate_fine()
+            self.save(update_fields=['return_date', 'status', 'fine_amount'])
+            
+            # Update ketersediaan book copy (counter buku ikut diperbarui)
+            book_copy.is_available = True
+            book_copy.save(update_fields=['is_available'])
+            self.book_copy = book_copy
+        return True
     
     def days_until_due(self):
         """Hitung berapa hari lagi jatuh tempo"""
@@ -126,6 +278,11 @@ class Loan(models.Model):
         delta = self.due_date - timezone.now()
         return delta.days
     
+    def get_effective_status_display(self):
+        """Label status dari anotasi effective_status (fallback ke status tersimpan)"""
+        status = getattr(self, 'effective_status', self.status)
+        return dict(self.STATUS_CHOICES).get(status, status)
+    
     def is_overdue(self):
         """Cek apakah sudah terlambat"""
         return self.status == 'terlambat' or (
@@ -0,0 +1,265 @@
+"""
+Layanan sirkulasi: peminjaman & pengembalian satu salinan
+Dipakai oleh halaman scan (librarian) dan semua jalur lain yang meminjamkan
+atau menerima kembali buku
+
+Setiap proses berjalan dalam satu transaksi dan mengunci baris BookCopy
+(SELECT ... FOR UPDATE) sebelum memeriksa ketersediaan, jadi dua meja scan
+yang memindai salinan yang sama bergantian, tidak bersamaan. Urutan kunci
+selalu salinan -> peminjaman supaya tidak terjadi deadlock. Constraint
+loan_one_active_per_copy menjadi pengaman terakhir di database
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from books.cache import bump_catalog_version
+from books.models import Book, BookCopy, CatalogChange
+from users.models import Member
+
+from .models import Loan
+from .signals import bulk_loans_changed
+
+
+# Lama peminjaman (hari)
+LOAN_DAYS = 7
+
+# Jumlah barcode maksimal per pengembalian massal
+BULK_RETURN_LIMIT = 500
+
+# Jumlah buku maksimal dalam satu keranjang peminjaman
+CHECKOUT_LIMIT = 10
+
+
+class CirculationError(Exception):
+    """Peminjaman/pengembalian ditolak, pesannya ditampilkan ke petugas"""
+
+
+@dataclass(frozen=True)
+class ReturnResult:
+    """Hasil pengembalian massal untuk satu barcode"""
+    barcode: str
+    status: str  # 'dikembalikan' / 'tidak_dipinjam' / 'tidak_ditemukan' / 'duplikat'
+    message: str
+    loan: object = None  # Loan yang dikembalikan (member & book_copy.book sudah dimuat)
+
+
+def find_member(member_barcode):
+    """Anggota aktif dari barcode kartu (satu query lewat index unik barcode)"""
+    try:
+        return Member.objects.get(barcode=member_barcode, is_active=True)
+    except Member.DoesNotExist:
+        raise CirculationError('Anggota tidak ditemukan atau tidak aktif!')
+
+
+def _lock_copy(book_barcode):
+    """Ambil & kunci salinan dari barcode (hanya baris BookCopy yang dikunci)"""
+    try:
+        return BookCopy.objects.select_for_update(of=('self',)).select_related('book').get(
+            barcode=book_barcode
+        )
+    except BookCopy.DoesNotExist:
+        raise CirculationError('Buku tidak ditemukan!')
+
+
+def check_eligible(member):
+    """Tolak anggota yang masih punya tunggakan"""
+    if member.has_overdue_loans():
+        raise CirculationError(
+            f'{member.name} memiliki tunggakan! Harap kembalikan buku yang terlambat terlebih dahulu.'
+        )
+
+
+def borrow_copy(member, book_barcode, now=None, loan_days=LOAN_DAYS):
+    """
+    Pinjamkan satu salinan ke anggota
+    Returns: Loan baru
+    Raises: CirculationError jika anggota punya tunggakan atau salinan tidak tersedia
+    """
+    now = now or timezone.now()
+    try:
+        with transaction.atomic():
+            book_copy = _lock_copy(book_barcode)
+            # Dicek setelah kunci: membaca data peminjaman terbaru
+            check_eligible(member)
+            if not book_copy.is_available:
+                raise CirculationError(f'Buku "{book_copy.book.title}" sedang dipinjam!')
+
+            loan = Loan.objects.create(
+                member=member,
+                book_copy=book_copy,
+                borrowed_date=now,
+                due_date=now + timedelta(days=loan_days),
+                status='dipinjam',
+            )
+            # Hanya is_available yang ditulis (counter buku ikut diperbarui)
+            book_copy.is_available = False
+            book_copy.save(update_fields=['is_available'])
+    except IntegrityError:
+        # Salinan ditandai tersedia tapi masih punya peminjaman aktif
+        raise CirculationError('Salinan ini masih tercatat dipinjam!')
+    return loan
+
+
+def return_copy(book_barcode, now=None):
+    """
+    Terima pengembalian salinan dari barcode
+    Returns: Loan yang dikembalikan (fine_amount sudah dihitung)
+    Raises: CirculationError jika salinan tidak ditemukan / tidak sedang dipinjam
+    """
+    with transaction.atomic():
+        book_copy = _lock_copy(book_barcode)
+        loan = Loan.objects.active().select_for_update(of=('self',)).select_related('member').filter(
+            book_copy=book_copy
+        ).first()
+        if loan is None:
+            raise CirculationError('Tidak ada peminjaman aktif untuk buku ini!')
+
+        loan.return_book(now=now)
+    return loan
+
+
+def _group_by_count(copies):
+    """{jumlah salinan: [book_id, ...]} supaya update per buku cukup satu UPDATE per jumlah"""
+    by_count = {}
+    for book_id, count in Counter(copy.book_id for copy in copies).items():
+        by_count.setdefault(count, []).append(book_id)
+    return by_count
+
+
+def _add_available(copies, sign=1):
+    """Naikkan (sign=-1: turunkan) available_copies buku dari daftar salinan"""
+    for count, book_ids in _group_by_count(copies).items():
+        Book.objects.filter(pk__in=book_ids).adjust_copy_counters(available=sign * count)
+
+
+def checkout_copies(member, barcodes, now=None, loan_days=LOAN_DAYS):
+    """
+    Pinjamkan beberapa salinan sekaligus (keranjang peminjaman) dalam satu transaksi
+    Kelayakan anggota dicek sekali, semua salinan dikunci bersama (urut pk),
+    Loan dibuat dengan bulk_create. Semua atau tidak sama sekali: jika ada
+    salinan yang tidak bisa dipinjam, tidak ada yang disimpan
+    Returns: list Loan baru (book_copy.book sudah dimuat)
+    Raises: CirculationError (pesan menyebut semua salinan yang bermasalah)
+    """
+    barcodes = list(dict.fromkeys(barcodes))
+    if not barcodes:
+        raise CirculationError('Keranjang masih kosong!')
+    if len(barcodes) > CHECKOUT_LIMIT:
+        raise CirculationError(f'Maksimal {CHECKOUT_LIMIT} buku per peminjaman!')
+
+    now = now or timezone.now()
+    try:
+        with transaction.atomic():
+            copies = {
+                copy.barcode: copy
+                for copy in BookCopy.objects.select_for_update(of=('self',)).select_related('book')
+                .filter(barcode__in=barcodes).order_by('pk')
+            }
+            check_eligible(member)
+            problems = []
+            for barcode in barcodes:
+                copy = copies.get(barcode)
+                if copy is None:
+                    problems.append(f'{barcode} tidak ditemukan')
+                elif not copy.is_available:
+                    problems.append(f'"{copy.book.title}" sedang dipinjam')
+            if problems:
+                raise CirculationError('Peminjaman dibatalkan: ' + '; '.join(problems))
+
+            copies = [copies[barcode] for barcode in barcodes]
+            loans = Loan.objects.bulk_create([
+                Loan(
+                    member=member,
+                    book_copy=copy,
+                    borrowed_date=now,
+                    due_date=now + timedelta(days=loan_days),
+                    status='dipinjam',
+                )
+                for copy in copies
+            ])
+
+            # bulk_create & update() tidak memicu save()/signal: counter, skor
+            # popularitas, feed katalog & versi katalog diperbarui manual, cache
+            # lain (dashboard, konteks anggota) lewat signal bulk_loans_changed
+            BookCopy.objects.filter(pk__in=[copy.pk for copy in copies]).update(is_available=False)
+            _add_available(copies, sign=-1)
+            for count, book_ids in _group_by_count(copies).items():
+                Book.objects.filter(pk__in=book_ids).record_borrow(now, count=count)
+            CatalogChange.objects.record('copy', [copy.pk for copy in copies])
+            CatalogChange.objects.record('book', {copy.book_id for copy in copies})
+            for copy in copies:
+                copy.is_available = False
+            transaction.on_commit(bump_catalog_version)
+            transaction.on_commit(lambda: bulk_loans_changed.send(sender=Loan, member_ids=[member.pk]))
+    except IntegrityError:
+        # Salinan ditandai tersedia tapi masih punya peminjaman aktif
+        raise CirculationError('Peminjaman dibatalkan: ada salinan yang masih tercatat dipinjam!')
+    return loans
+
+
+def return_copies(barcodes, now=None):
+    """
+    Pengembalian massal (isi drop box) dalam satu transaksi
+    Salinan & peminjaman dibaca dan dikunci dengan satu query masing-masing,
+    lalu ditulis dengan bulk_update / UPDATE massal. Jalur massal tidak memicu
+    signal, jadi counter buku, feed katalog dan versi katalog diperbarui
+    manual di sini, cache lain lewat signal bulk_loans_changed
+    Returns: list ReturnResult sesuai urutan barcodes
+    """
+    now = now or timezone.now()
+    barcodes = [barcode.strip() for barcode in barcodes if barcode.strip()]
+    if len(barcodes) > BULK_RETURN_LIMIT:
+        raise CirculationError(f'Maksimal {BULK_RETURN_LIMIT} barcode per pengembalian massal!')
+
+    with transaction.atomic():
+        # Urut pk supaya urutan kunci sama di semua transaksi massal
+        copies = {
+            copy.barcode: copy
+            for copy in BookCopy.objects.select_for_update(of=('self',)).select_related('book')
+            .filter(barcode__in=set(barcodes)).order_by('pk')
+        }
+        loans = {
+            loan.book_copy_id: loan
+            for loan in Loan.objects.active().select_for_update(of=('self',)).select_related('member')
+            .filter(book_copy__in=[copy.pk for copy in copies.values()]).order_by('pk')
+        }
+
+        for loan in loans.values():
+            loan.return_date = now
+            loan.status = 'dikembalikan'
+            loan.calculate_fine()
+        Loan.objects.bulk_update(loans.values(), ['return_date', 'status', 'fine_amount'])
+
+        flipped = [copy for copy in copies.values() if copy.pk in loans and not copy.is_available]
+        if flipped:
+            BookCopy.objects.filter(pk__in=[copy.pk for copy in flipped]).update(is_available=True)
+            _add_available(flipped)
+            CatalogChange.objects.record('copy', [copy.pk for copy in flipped])
+            CatalogChange.objects.record('book', {copy.book_id for copy in flipped})
+            for copy in flipped:
+                copy.is_available = True
+            transaction.on_commit(bump_catalog_version)
+        if loans:
+            member_ids = [loan.member_id for loan in loans.values()]
+            transaction.on_commit(lambda: bulk_loans_changed.send(sender=Loan, member_ids=member_ids))
+
+    results = []
+    seen = set()
+    for barcode in barcodes:
+        copy = copies.get(barcode)
+        if barcode in seen:
+            results.append(ReturnResult(barcode, 'duplikat', 'Barcode sudah dipindai di daftar ini'))
+        elif copy is None:
+            results.append(ReturnResult(barcode, 'tidak_ditemukan', 'Buku tidak ditemukan!'))
+        elif copy.pk not in loans:
+            results.append(ReturnResult(barcode, 'tidak_dipinjam', 'Tidak ada peminjaman aktif untuk buku ini!'))
+        else:
+            loan = loans[copy.pk]
+            loan.book_copy = copy
+            results.append(ReturnResult(barcode, 'dikembalikan', 'Pengembalian berhasil', loan))
+        seen.add(barcode)
+    return results
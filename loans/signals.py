@@ -0,0 +1,11 @@
+"""
+Signal sirkulasi massal
+checkout_copies/return_copies memakai bulk_create & update() yang tidak
+memicu post_save, jadi app lain (cache dashboard & konteks anggota di
+librarian) diberi tahu lewat signal ini. Dikirim setelah transaksi commit
+"""
+from django.dispatch import Signal
+
+
+# Argumen: member_ids (id anggota yang peminjamannya berubah)
+bulk_loans_changed = Signal()
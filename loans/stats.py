@@ -0,0 +1,111 @@
+"""
+Statistik peminjaman berbasis query agregat (GROUP BY)
+Dipakai bersama oleh dashboard librarian dan laporan
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.utils import timezone
+
+
+# Fungsi truncate per jenis bucket
+BUCKET_TRUNC = {
+    'day': TruncDate,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Format label chart per jenis bucket
+BUCKET_LABEL_FORMAT = {
+    'day': '%d %b',
+    'week': '%d %b',
+    'month': '%b %Y',
+}
+
+
+def bucket_start(day, bucket):
+    """
+    Awal bucket untuk sebuah tanggal
+    day -> tanggal itu sendiri, week -> hari Senin, month -> tanggal 1
+    """
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_buckets(start_date, end_date, bucket):
+    """Generate semua awal bucket dari start_date s/d end_date (inklusif)"""
+    current = bucket_start(start_date, bucket)
+    while current <= end_date:
+        yield current
+        if bucket == 'day':
+            current += timedelta(days=1)
+        elif bucket == 'week':
+            current += timedelta(weeks=1)
+        elif current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+
+
+def date_range_bounds(start_date, end_date):
+    """
+    Ubah rentang tanggal (inklusif) jadi batas datetime aware [awal, akhir)
+    Supaya filter bisa memakai index kolom datetime (bukan __date)
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def count_by_bucket(queryset, field, start_date, end_date, bucket='day'):
+    """
+    Hitung jumlah baris per bucket waktu dengan SATU query GROUP BY
+    Returns: dict {awal_bucket (date): jumlah}
+    """
+    trunc = BUCKET_TRUNC[bucket]
+    start, end = date_range_bounds(start_date, end_date)
+    rows = queryset.filter(**{
+        f'{field}__gte': start,
+        f'{field}__lt': end,
+    }).annotate(
+        bucket=trunc(field, output_field=DateField())
+    ).values('bucket').annotate(
+        total=Count('pk')
+    ).order_by()
+    return {row['bucket']: row['total'] for row in rows}
+
+
+def loan_activity_series(start_date, end_date, bucket='day'):
+    """
+    Time series peminjaman & pengembalian untuk chart/laporan
+    Satu query GROUP BY per seri, bucket kosong diisi 0
+    start_date dimundurkan ke awal bucket-nya (misal tanggal 1 untuk bucket
+    month), supaya bucket pertama berisi data satu bucket penuh
+
+    Args:
+        start_date, end_date: date (inklusif)
+        bucket: 'day', 'week' atau 'month'
+    Returns: dict {'buckets', 'labels', 'borrows', 'returns'}
+    """
+    from loans.models import Loan
+
+    if bucket not in BUCKET_TRUNC:
+        raise ValueError(f"Bucket tidak dikenal: {bucket}")
+
+    start_date = bucket_start(start_date, bucket)
+    borrows = count_by_bucket(Loan.objects.all(), 'borrowed_date', start_date, end_date, bucket)
+    returns = count_by_bucket(Loan.objects.all(), 'return_date', start_date, end_date, bucket)
+
+    buckets = list(iter_buckets(start_date, end_date, bucket))
+    label_format = BUCKET_LABEL_FORMAT[bucket]
+    return {
+        'buckets': buckets,
+        'labels': [day.strftime(label_format) for day in buckets],
+        'borrows': [borrows.get(day, 0) for day in buckets],
+        'returns': [returns.get(day, 0) for day in buckets],
+    }
@@ -64,6 +64,60 @@ def send_loan_success_email(self, loan_id):
         raise self.retry(exc=e, countdown=60)  # Retry setelah 60 detik
 
 
+@shared_task(bind=True, max_retries=3)
+def send_checkout_email(self, loan_ids):
+    """
+    Task untuk kirim SATU email berisi semua buku yang dipinjam sekaligus
+    (keranjang peminjaman)
+    
+    Args:
+        loan_ids: list ID Loan dari satu keranjang (anggota yang sama)
+    """
+    try:
+        from loans.models import Loan
+        
+        loans = list(Loan.objects.filter(id__in=loan_ids).select_related(
+            'member', 'book_copy__book'
+        ).order_by('book_copy__book__title'))
+        if not loans:
+            print(f"[CELERY] ✗ Loan ID {loan_ids} tidak ditemukan")
+            return f"Loan IDs {loan_ids} not found"
+        
+        member = loans[0].member
+        
+        # Cek apakah member punya email
+        if not member.email:
+            print(f"[CELERY] Member {member.name} tidak punya email. Skip.")
+            return f"Member {member.name} tidak punya email"
+        
+        # Render email template
+        html_message = render_to_string('emails/checkout_success.html', {
+            'member': member,
+            'loans': loans,
+            'due_date': min(loan.due_date for loan in loans),
+        })
+        
+        # Plain text version
+        plain_message = strip_tags(html_message)
+        
+        # Send email
+        send_mail(
+            subject=f'Peminjaman Berhasil - {len(loans)} Buku',
+            message=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[member.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+        
+        print(f"[CELERY] ✓ Email peminjaman {len(loans)} buku dikirim ke {member.email}")
+        return f"Email sent to {member.email}"
+        
+    except Exception as e:
+        print(f"[CELERY] ✗ Error sending email: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
 @shared_task(bind=True, max_retries=3)
 def send_return_success_email(self, loan_id):
     """
@@ -120,6 +174,72 @@ def send_return_success_email(self, loan_id):
         raise self.retry(exc=e, countdown=60)
 
 
+@shared_task(bind=True, max_retries=3)
+def send_bulk_return_email(self, member_id, loan_ids):
+    """
+    Task untuk kirim SATU email berisi semua buku anggota yang dikembalikan
+    lewat pengembalian massal (drop box)
+    
+    Args:
+        member_id: ID dari Member object
+        loan_ids: list ID Loan yang dikembalikan
+    """
+    try:
+        from loans.models import Loan
+        from users.models import Member
+        
+        member = Member.objects.get(id=member_id)
+        
+        # Cek apakah member punya email
+        if not member.email:
+            print(f"[CELERY] Member {member.name} tidak punya email. Skip.")
+            return f"Member {member.name} tidak punya email"
+        
+        loans = list(Loan.objects.filter(
+            id__in=loan_ids, member=member
+        ).select_related('book_copy__book').order_by('book_copy__book__title'))
+        if not loans:
+            return f"No loans to report for member {member_id}"
+        
+        total_fine = sum(loan.fine_amount for loan in loans)
+        
+        # Render email template
+        html_message = render_to_string('emails/bulk_return_success.html', {
+            'member': member,
+            'loans': loans,
+            'total_fine': total_fine,
+        })
+        
+        # Plain text version
+        plain_message = strip_tags(html_message)
+        
+        # Subject
+        subject = f'Pengembalian Berhasil - {len(loans)} Buku'
+        if total_fine > 0:
+            subject += f' - Denda Rp {total_fine:,.0f}'
+        
+        # Send email
+        send_mail(
+            subject=subject,
+            message=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[member.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+        
+        print(f"[CELERY] ✓ Email pengembalian {len(loans)} buku dikirim ke {member.email}")
+        return f"Email sent to {member.email}"
+        
+    except Member.DoesNotExist:
+        print(f"[CELERY] ✗ Member ID {member_id} tidak ditemukan")
+        return f"Member ID {member_id} not found"
+        
+    except Exception as e:
+        print(f"[CELERY] ✗ Error sending email: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
 @shared_task
 def send_due_date_reminders():
     """
@@ -131,8 +251,7 @@ def send_due_date_reminders():
     # Get loans yang jatuh tempo besok
     tomorrow = timezone.now().date() + timedelta(days=1)
     
-    loans = Loan.objects.filter(
-        status='dipinjam',
+    loans = Loan.objects.active().filter(
         due_date__date=tomorrow
     ).select_related('member', 'book_copy__book')
     
@@ -179,10 +298,11 @@ def send_overdue_notifications():
     """
     from loans.models import Loan
     
-    # Get loans yang terlambat
-    overdue_loans = Loan.objects.filter(
-        status='terlambat'
-    ).select_related('member', 'book_copy__book')
+    # Get loans yang terlambat (status & denda berjalan dihitung saat dibaca)
+    now = timezone.now()
+    overdue_loans = Loan.objects.overdue(now).with_effective_status(now).select_related(
+        'member', 'book_copy__book'
+    )
     
     count = 0
     for loan in overdue_loans:
@@ -192,20 +312,21 @@ def send_overdue_notifications():
         
         try:
             # Hitung hari terlambat
-            days_overdue = (timezone.now().date() - loan.due_date.date()).days
+            days_overdue = (now.date() - loan.due_date.date()).days
             
             # Render email template
             html_message = render_to_string('emails/overdue_notification.html', {
                 'member': loan.member,
                 'loan': loan,
                 'days_overdue': days_overdue,
+                'fine_amount': loan.accrued_fine,
             })
             
             plain_message = strip_tags(html_message)
             
             # Send email
             send_mail(
-                subject=f'URGENT: Buku Terlambat {days_overdue} Hari - Denda Rp {loan.fine_amount:,.0f}',
+                subject=f'URGENT: Buku Terlambat {days_overdue} Hari - Denda Rp {loan.accrued_fine:,.0f}',
                 message=plain_message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[loan.member.email],
@@ -231,16 +352,15 @@ def update_loan_status():
     """
     from loans.models import Loan
     
-    # Get loans yang sudah lewat due date tapi masih status 'dipinjam'
-    overdue_loans = Loan.objects.filter(
-        status='dipinjam',
-        due_date__lt=timezone.now()
-    )
+    from librarian.dashboard import invalidate_dashboard_snapshot
     
-    count = 0
-    for loan in overdue_loans:
-        loan.update_status()
-        count += 1
+    # Ubah 'dipinjam' yang lewat due date jadi 'terlambat' (UPDATE massal per chunk)
+    result = Loan.objects.mark_overdue()
+    
+    # UPDATE massal tidak memicu signal, jadi invalidate snapshot dashboard manual
+    if result['marked'] or result['fines_updated']:
+        invalidate_dashboard_snapshot()
     
-    print(f"[CELERY] Updated {count} loan statuses to 'terlambat'")
-    return f"{count} loans updated to overdue"
\ No newline at end of file
+    print(f"[CELERY] Updated {result['marked']} loan statuses to 'terlambat', "
+          f"{result['fines_updated']} fines recalculated")
+    return f"{result['marked']} loans updated to overdue, {result['fines_updated']} fines updated"
\ No newline at end of file
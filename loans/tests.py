@@ -1,3 +1,422 @@
-from django.test import TestCase
+import importlib
+import io
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from books.models import Book, BookCopy
+from library_system.testing import TestCase, TransactionTestCase
+from users.models import Member
+
+from .models import FINE_PER_DAY, Loan, fine_expression
+from .services import CirculationError, borrow_copy, checkout_copies, return_copies, return_copy
+from .signals import bulk_loans_changed
+from .stats import loan_activity_series
+
+
+# Waktu tetap untuk semua test (siang hari, supaya "jatuh tempo hari ini"
+# bisa sebelum maupun sesudah now)
+NOW = timezone.make_aware(datetime(2026, 3, 10, 12, 0))
+
+
+def make_member(nis='1001', **kwargs):
+    """Anggota aktif untuk test"""
+    return Member.objects.create(
+        name=kwargs.pop('name', f'Anggota {nis}'),
+        member_type='siswa',
+        nis=nis,
+        gender='L',
+        date_of_birth=date(2010, 1, 1),
+        phone='08123456789',
+        address='Jl. Test',
+        **kwargs
+    )
+
+
+def make_book(isbn='9780000000001', copies=1, **kwargs):
+    """Buku beserta salinannya (copy_number 1..copies)"""
+    book = Book.objects.create(
+        title=kwargs.pop('title', f'Buku {isbn}'),
+        author=kwargs.pop('author', 'Penulis'),
+        publisher='Penerbit',
+        year_published=2020,
+        isbn=isbn,
+        category=kwargs.pop('category', 'fiksi'),
+        **kwargs
+    )
+    for number in range(1, copies + 1):
+        BookCopy.objects.create(book=book, copy_number=number)
+    return book
+
+
+class LoanStatusTestCase(TestCase):
+    """
+    Status & denda yang dihitung di SQL (fine_expression, with_effective_status,
+    mark_overdue) harus sama dengan Loan.calculate_fine() / update_status()
+    """
+
+    # Selisih due_date terhadap NOW, dari yang belum jatuh tempo sampai
+    # terlambat beberapa hari (termasuk jatuh tempo hari ini)
+    DUE_OFFSETS = [
+        timedelta(days=3),
+        timedelta(hours=5),  # jatuh tempo nanti sore
+        timedelta(hours=-5),  # jatuh tempo tadi pagi (terlambat, denda 0)
+        timedelta(days=-1),
+        timedelta(days=-1, hours=-23),
+        timedelta(days=-10, hours=-2),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('django.utils.timezone.now', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.member = make_member()
+        self.book = make_book(copies=len(self.DUE_OFFSETS) + 1)
+        self.copies = list(self.book.bookcopy_set.order_by('copy_number'))
+
+    def make_loan(self, copy, due_offset, status='dipinjam', **kwargs):
+        return Loan.objects.create(
+            member=self.member,
+            book_copy=copy,
+            borrowed_date=NOW + due_offset - timedelta(days=7),
+            due_date=NOW + due_offset,
+            status=status,
+            **kwargs
+        )
+
+    def make_loans(self, status='dipinjam'):
+        return [
+            self.make_loan(copy, offset, status=status)
+            for copy, offset in zip(self.copies, self.DUE_OFFSETS)
+        ]
+
+    def test_fine_expression_matches_calculate_fine(self):
+        # fine_expression hanya dipakai untuk peminjaman yang sudah lewat due_date
+        loans = [loan for loan in self.make_loans() if loan.due_date < NOW]
+        fines = dict(Loan.objects.annotate(fine=fine_expression(NOW)).values_list('pk', 'fine'))
+        for loan in loans:
+            with self.subTest(due_date=loan.due_date):
+                self.assertEqual(fines[loan.pk], loan.calculate_fine())
+
+    def test_fine_counts_full_days_only(self):
+        loan = self.make_loan(self.copies[0], timedelta(days=-2, hours=-23))
+        fine = Loan.objects.annotate(fine=fine_expression(NOW)).get(pk=loan.pk).fine
+        self.assertEqual(fine, 2 * FINE_PER_DAY)
+
+    def test_effective_status_matches_update_status(self):
+        loans = self.make_loans()
+        annotated = {loan.pk: loan for loan in Loan.objects.with_effective_status(NOW)}
+
+        for loan in loans:
+            with self.subTest(due_date=loan.due_date):
+                loan.update_status()
+                self.assertEqual(annotated[loan.pk].effective_status, loan.status)
+                self.assertEqual(annotated[loan.pk].accrued_fine, loan.fine_amount)
+
+    def test_effective_status_due_today(self):
+        later_today = self.make_loan(self.copies[0], timedelta(hours=5))
+        earlier_today = self.make_loan(self.copies[1], timedelta(hours=-5))
+        annotated = {loan.pk: loan for loan in Loan.objects.with_effective_status(NOW)}
+
+        self.assertEqual(annotated[later_today.pk].effective_status, 'dipinjam')
+        self.assertEqual(annotated[earlier_today.pk].effective_status, 'terlambat')
+        self.assertEqual(annotated[earlier_today.pk].accrued_fine, 0)
+        self.assertTrue(earlier_today.is_overdue())
+        self.assertFalse(later_today.is_overdue())
+
+    def test_effective_status_returned_keeps_final_fine(self):
+        loan = self.make_loan(
+            self.copies[0], timedelta(days=-5),
+            status='dikembalikan', return_date=NOW - timedelta(days=2), fine_amount=Decimal('3000.00'),
+        )
+        annotated = Loan.objects.with_effective_status(NOW).get(pk=loan.pk)
+        self.assertEqual(annotated.effective_status, 'dikembalikan')
+        self.assertEqual(annotated.accrued_fine, Decimal('3000.00'))
+
+    def test_mark_overdue_matches_update_status(self):
+        loans = self.make_loans()
+        result = Loan.objects.mark_overdue(NOW)
+
+        marked = {loan.pk: loan for loan in Loan.objects.all()}
+        for loan in loans:
+            with self.subTest(due_date=loan.due_date):
+                loan.update_status()
+                self.assertEqual(marked[loan.pk].status, loan.status)
+                self.assertEqual(marked[loan.pk].fine_amount, loan.fine_amount)
+
+        overdue = sum(1 for offset in self.DUE_OFFSETS if offset < timedelta(0))
+        self.assertEqual(result, {'marked': overdue, 'fines_updated': 0})
+
+    def test_mark_overdue_in_chunks(self):
+        self.make_loans()
+        overdue = sum(1 for offset in self.DUE_OFFSETS if offset < timedelta(0))
+
+        # 1 UPDATE denda (tidak ada yang cocok) + ceil(overdue / 2) UPDATE status
+        with self.assertNumQueries(1 + overdue // 2 + 1):
+            result = Loan.objects.mark_overdue(NOW, chunk_size=2)
+        self.assertEqual(result['marked'], overdue)
+        self.assertEqual(Loan.objects.filter(status='terlambat').count(), overdue)
+
+    def test_mark_overdue_refreshes_fines_without_double_counting(self):
+        stale = self.make_loan(self.copies[0], timedelta(days=-4), status='terlambat', fine_amount=1000)
+        current = self.make_loan(self.copies[1], timedelta(days=-2), status='terlambat', fine_amount=2000)
+        new = self.make_loan(self.copies[2], timedelta(days=-3))
+
+        result = Loan.objects.mark_overdue(NOW)
+
+        self.assertEqual(result, {'marked': 1, 'fines_updated': 1})
+        stale.refresh_from_db()
+        current.refresh_from_db()
+        new.refresh_from_db()
+        self.assertEqual(stale.fine_amount, 4 * FINE_PER_DAY)
+        self.assertEqual(current.fine_amount, 2 * FINE_PER_DAY)
+        self.assertEqual((new.status, new.fine_amount), ('terlambat', 3 * FINE_PER_DAY))
+
+    def test_mark_overdue_is_idempotent(self):
+        self.make_loans()
+        Loan.objects.mark_overdue(NOW)
+        self.assertEqual(Loan.objects.mark_overdue(NOW), {'marked': 0, 'fines_updated': 0})
+
+        # Sehari kemudian hanya denda yang berubah
+        overdue = sum(1 for offset in self.DUE_OFFSETS if offset < timedelta(0))
+        later = Loan.objects.mark_overdue(NOW + timedelta(days=1))
+        self.assertEqual(later['fines_updated'], overdue)
+
+    def test_mark_overdue_skips_returned_loans(self):
+        loan = self.make_loan(
+            self.copies[0], timedelta(days=-5),
+            status='dikembalikan', return_date=NOW - timedelta(days=4), fine_amount=1000,
+        )
+        self.assertEqual(Loan.objects.mark_overdue(NOW), {'marked': 0, 'fines_updated': 0})
+        loan.refresh_from_db()
+        self.assertEqual((loan.status, loan.fine_amount), ('dikembalikan', 1000))
+
+
+class LoanActivitySeriesTestCase(TestCase):
+    """Time series peminjaman untuk chart trend & laporan"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+        self.copies = list(make_book(copies=2).bookcopy_set.all())
+
+    def borrow(self, copy, day):
+        borrowed = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=9))
+        return Loan.objects.create(
+            member=self.member, book_copy=copy,
+            borrowed_date=borrowed, due_date=borrowed + timedelta(days=7),
+        )
+
+    def test_first_month_bucket_is_complete(self):
+        # Rentang dimulai pertengahan Maret: peminjaman awal Maret tetap terhitung
+        self.borrow(self.copies[0], date(2025, 3, 2))
+        self.borrow(self.copies[1], date(2025, 3, 20))
+
+        series = loan_activity_series(date(2025, 3, 15), date(2025, 5, 10), bucket='month')
+
+        self.assertEqual(series['buckets'], [date(2025, 3, 1), date(2025, 4, 1), date(2025, 5, 1)])
+        self.assertEqual(series['borrows'], [2, 0, 0])
+
+    def test_day_buckets_keep_start_date(self):
+        self.borrow(self.copies[0], date(2025, 3, 2))
+        series = loan_activity_series(date(2025, 3, 3), date(2025, 3, 5))
+        self.assertEqual(series['buckets'][0], date(2025, 3, 3))
+        self.assertEqual(series['borrows'], [0, 0, 0])
+
+
+class ActiveLoanConstraintMigrationTestCase(TestCase):
+    """Migrasi constraint berhenti dengan jelas jika data lama berisi peminjaman aktif ganda"""
+
+    migration = importlib.import_module('loans.migrations.0004_loan_one_active_per_copy')
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+        self.copy = make_book(copies=1).bookcopy_set.get()
+
+    def test_no_duplicates(self):
+        Loan.objects.create(member=self.member, book_copy=self.copy)
+        self.migration.check_duplicate_active_loans(apps, None)
+
+    def test_duplicates_are_listed(self):
+        constraint = next(c for c in Loan._meta.constraints if c.name == 'loan_one_active_per_copy')
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(Loan, constraint)
+        loans = [Loan.objects.create(member=self.member, book_copy=self.copy) for _ in range(2)]
+        Loan.objects.create(member=self.member, book_copy=self.copy, status='dikembalikan')
+
+        with self.assertRaisesMessage(RuntimeError, f'peminjaman #{loans[0].pk}, #{loans[1].pk}\n'):
+            self.migration.check_duplicate_active_loans(apps, None)
+
+
+class BulkCirculationTestCase(TestCase):
+    """checkout_copies/return_copies: signal bulk_loans_changed & cek kelayakan"""
+
+    def setUp(self):
+        super().setUp()
+        self.member = make_member()
+        self.book = make_book(copies=3)
+        self.barcodes = list(self.book.bookcopy_set.order_by('copy_number').values_list('barcode', flat=True))
+        self.received = []
+
+        def receiver(sender, member_ids, **kwargs):
+            self.received.append(member_ids)
+
+        bulk_loans_changed.connect(receiver, sender=Loan)
+        self.addCleanup(bulk_loans_changed.disconnect, receiver, sender=Loan)
+
+    def test_checkout_sends_signal_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            checkout_copies(self.member, self.barcodes[:2])
+        self.assertEqual(self.received, [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.received, [[self.member.pk]])
+
+    def test_return_sends_signal_with_borrowers(self):
+        other = make_member('1002')
+        borrow_copy(self.member, self.barcodes[0])
+        borrow_copy(other, self.barcodes[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            results = return_copies(self.barcodes)
+        self.assertEqual([result.status for result in results], ['dikembalikan', 'dikembalikan', 'tidak_dipinjam'])
+        self.assertEqual(sorted(self.received[0]), sorted([self.member.pk, other.pk]))
+
+    def test_return_without_loans_sends_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return_copies(self.barcodes)
+        self.assertEqual(self.received, [])
+
+    def test_failed_checkout_sends_nothing(self):
+        borrow_copy(make_member('1002'), self.barcodes[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(CirculationError):
+                checkout_copies(self.member, self.barcodes)
+        self.assertEqual(self.received, [])
+        self.assertFalse(self.member.loan_set.exists())
+
+    def test_eligibility_checked_after_lock(self):
+        # Tunggakan dibaca setelah salinan dikunci (query FOR UPDATE lebih dulu)
+        Loan.objects.create(
+            member=self.member, book_copy=BookCopy.objects.get(barcode=self.barcodes[2]),
+            borrowed_date=timezone.now() - timedelta(days=10), due_date=timezone.now() - timedelta(days=3),
+            status='terlambat',
+        )
+        calls = {
+            'borrow_copy': lambda: borrow_copy(self.member, self.barcodes[0]),
+            'checkout_copies': lambda: checkout_copies(self.member, self.barcodes[:2]),
+        }
+        for name, call in calls.items():
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                with self.assertRaisesMessage(CirculationError, 'tunggakan'):
+                    call()
+                sql = [query['sql'] for query in queries]
+                locked = next(i for i, query in enumerate(sql) if 'FOR UPDATE' in query)
+                checked = next(i for i, query in enumerate(sql) if '"loans_loan"' in query)
+                self.assertLess(locked, checked)
+        self.assertEqual(BookCopy.objects.filter(is_available=False).count(), 0)
+
+
+class ConcurrentCirculationTestCase(TransactionTestCase):
+    """
+    Beberapa meja scan meminjam & mengembalikan salinan yang sama bersamaan
+    TransactionTestCase: setiap meja memakai koneksi & transaksi sendiri,
+    jadi kunci baris dan constraint benar-benar diuji
+    """
+
+    STATIONS = 4
+    ROUNDS = 25
+
+    def setUp(self):
+        super().setUp()
+        self.members = [make_member(f'10{number:02d}') for number in range(self.STATIONS)]
+        self.book = make_book(copies=3)
+        self.copies = list(self.book.bookcopy_set.order_by('copy_number'))
+
+    def run_stations(self, station):
+        """Jalankan station(index, member) di setiap meja secara bersamaan"""
+        barrier = threading.Barrier(self.STATIONS)
+
+        def run(index):
+            try:
+                barrier.wait(10)
+                return station(index, self.members[index])
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.STATIONS) as executor:
+            return list(executor.map(run, range(self.STATIONS)))
+
+    def assertConsistent(self):
+        """Tidak ada peminjaman aktif ganda & is_available sesuai peminjaman aktif"""
+        double = Loan.objects.active().values('book_copy').annotate(total=Count('pk')).filter(total__gt=1)
+        self.assertFalse(double.exists())
+
+        active = set(Loan.objects.active().values_list('book_copy', flat=True))
+        for copy in BookCopy.objects.filter(book=self.book):
+            with self.subTest(copy=copy.copy_number):
+                self.assertEqual(copy.is_available, copy.pk not in active)
+        self.assertEqual(Book.objects.sync_copy_counters(), 0)
+
+    def test_same_copy_borrowed_once(self):
+        barcode = self.copies[0].barcode
+
+        def station(index, member):
+            try:
+                borrow_copy(member, barcode)
+            except CirculationError:
+                return False
+            return True
+
+        self.assertEqual(sorted(self.run_stations(station)), [False] * (self.STATIONS - 1) + [True])
+        self.assertConsistent()
+
+    def test_random_borrow_and_return(self):
+        barcodes = [copy.barcode for copy in self.copies]
+
+        def station(index, member):
+            rng = random.Random(index)
+            stats = Counter()
+            for _ in range(self.ROUNDS):
+                barcode = rng.choice(barcodes)
+                try:
+                    if rng.random() < 0.5:
+                        borrow_copy(member, barcode)
+                        stats['borrowed'] += 1
+                    else:
+                        return_copy(barcode)
+                        stats['returned'] += 1
+                except CirculationError:
+                    stats['rejected'] += 1
+            return stats
+
+        total = sum(self.run_stations(station), Counter())
+        self.assertEqual(sum(total.values()), self.STATIONS * self.ROUNDS)
+        self.assertEqual(Loan.objects.count(), total['borrowed'])
+        self.assertConsistent()
+
+    def test_stress_command_reports_throughput(self):
+        out = io.StringIO()
+        call_command('stress_circulation', stations=self.STATIONS, copies=3, rounds=10, stdout=out)
+        output = out.getvalue()
+
+        self.assertEqual(output.count('scan/detik'), self.STATIONS + 1)
+        self.assertIn('Tidak ada peminjaman ganda', output)
+        # Data uji dibersihkan
+        self.assertFalse(Loan.objects.exists())
+        self.assertEqual(BookCopy.objects.filter(is_available=False).count(), 0)
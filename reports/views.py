@@ -24,6 +24,8 @@ from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 import io
 
+from loans.stats import loan_activity_series
+
 from .utils import (
     get_current_academic_year,
     parse_academic_year,
@@ -301,15 +303,10 @@ def monthly_report_pdf(request):
         end_date = datetime(year, month + 1, 1) - timedelta(days=1)
     
     # Get statistics
-    total_loans = Loan.objects.filter(
-        borrowed_date__gte=start_date,
-        borrowed_date__lte=end_date
-    ).count()
-    
-    total_returns = Loan.objects.filter(
-        return_date__gte=start_date,
-        return_date__lte=end_date
-    ).count()
+    # Peminjaman & pengembalian per bulan (time series yang sama dengan dashboard)
+    activity = loan_activity_series(start_date.date(), end_date.date(), bucket='month')
+    total_loans = sum(activity['borrows'])
+    total_returns = sum(activity['returns'])
     
     total_fines = Loan.objects.filter(
         return_date__gte=start_date,
@@ -529,15 +526,10 @@ def monthly_report_excel(request):
         end_date = datetime(year, month + 1, 1) - timedelta(days=1)
     
     # Get statistics
-    total_loans = Loan.objects.filter(
-        borrowed_date__gte=start_date,
-        borrowed_date__lte=end_date
-    ).count()
-    
-    total_returns = Loan.objects.filter(
-        return_date__gte=start_date,
-        return_date__lte=end_date
-    ).count()
+    # Peminjaman & pengembalian per bulan (time series yang sama dengan dashboard)
+    activity = loan_activity_series(start_date.date(), end_date.date(), bucket='month')
+    total_loans = sum(activity['borrows'])
+    total_returns = sum(activity['returns'])
     
     total_fines = Loan.objects.filter(
         return_date__gte=start_date,
@@ -881,8 +873,8 @@ def book_report_pdf(request):
             book.author[:25],
             book.get_category_display(),
             book.isbn,
-            str(book.total_copies),
-            str(book.get_available_copies_count())
+            str(book.copy_count),
+            str(book.available_copies)
         ])
     
     # Create table
@@ -904,8 +896,8 @@ def book_report_pdf(request):
     # Summary
     elements.append(Spacer(1, 20))
     total_books = books.count()
-    total_copies = sum([book.total_copies for book in books])
-    total_available = sum([book.get_available_copies_count() for book in books])
+    total_copies = sum([book.copy_count for book in books])
+    total_available = sum([book.available_copies for book in books])
     
     summary_data = [
         ['Total Judul Buku:', str(total_books)],
@@ -977,15 +969,15 @@ def book_report_excel(request):
         ws.cell(row=row, column=5, value=book.year_published)
         ws.cell(row=row, column=6, value=book.isbn)
         ws.cell(row=row, column=7, value=book.get_category_display())
-        ws.cell(row=row, column=8, value=book.total_copies)
-        ws.cell(row=row, column=9, value=book.get_available_copies_count())
+        ws.cell(row=row, column=8, value=book.copy_count)
+        ws.cell(row=row, column=9, value=book.available_copies)
         row += 1
     
     # Summary
     row += 1
     total_books = books.count()
-    total_copies = sum([book.total_copies for book in books])
-    total_available = sum([book.get_available_copies_count() for book in books])
+    total_copies = sum([book.copy_count for book in books])
+    total_available = sum([book.available_copies for book in books])
     
     ws.cell(row=row, column=1, value='RINGKASAN').font = Font(bold=True)
     row += 1
@@ -1032,10 +1024,11 @@ def fine_report_pdf(request):
     """
     Generate Laporan Denda dalam format PDF
     """
-    # Get loans with fines
-    loans_with_fines = Loan.objects.filter(
-        fine_amount__gt=0
-    ).select_related('member', 'book_copy__book').order_by('-fine_amount')
+    # Get loans with fines (termasuk denda berjalan peminjaman yang belum kembali)
+    now = timezone.now()
+    loans_with_fines = Loan.objects.with_effective_status(now).filter(
+        accrued_fine__gt=0
+    ).select_related('member', 'book_copy__book').order_by('-accrued_fine')
     
     # Create PDF
     buffer = io.BytesIO()
@@ -1066,7 +1059,7 @@ def fine_report_pdf(request):
     data = [['No', 'Anggota', 'Buku', 'Tgl Pinjam', 'Tgl Kembali', 'Terlambat', 'Denda']]
     
     for idx, loan in enumerate(loans_with_fines, 1):
-        days_late = (loan.return_date - loan.due_date).days if loan.return_date else 0
+        days_late = ((loan.return_date or now) - loan.due_date).days
         data.append([
             str(idx),
             f"{loan.member.name}\n{loan.member.nis}",
@@ -1074,7 +1067,7 @@ def fine_report_pdf(request):
             loan.borrowed_date.strftime('%d/%m/%Y'),
             loan.return_date.strftime('%d/%m/%Y') if loan.return_date else '-',
             f"{days_late} hari",
-            f"Rp {loan.fine_amount:,.0f}"
+            f"Rp {loan.accrued_fine:,.0f}"
         ])
     
     # Create table
@@ -1095,7 +1088,7 @@ def fine_report_pdf(request):
     
     # Summary
     elements.append(Spacer(1, 20))
-    total_fines = loans_with_fines.aggregate(total=Sum('fine_amount'))['total'] or 0
+    total_fines = loans_with_fines.aggregate(total=Sum('accrued_fine'))['total'] or 0
     
     summary = Paragraph(f"<b>Total Denda: Rp {total_fines:,.0f}</b>", styles['Heading3'])
     elements.append(summary)
@@ -1117,10 +1110,11 @@ def fine_report_excel(request):
     """
     Generate Laporan Denda dalam format Excel
     """
-    # Get loans with fines
-    loans_with_fines = Loan.objects.filter(
-        fine_amount__gt=0
-    ).select_related('member', 'book_copy__book').order_by('-fine_amount')
+    # Get loans with fines (termasuk denda berjalan peminjaman yang belum kembali)
+    now = timezone.now()
+    loans_with_fines = Loan.objects.with_effective_status(now).filter(
+        accrued_fine__gt=0
+    ).select_related('member', 'book_copy__book').order_by('-accrued_fine')
     
     # Create workbook
     wb = openpyxl.Workbook()
@@ -1151,7 +1145,7 @@ def fine_report_excel(request):
     # Data
     row = 5
     for idx, loan in enumerate(loans_with_fines, 1):
-        days_late = (loan.return_date - loan.due_date).days if loan.return_date else 0
+        days_late = ((loan.return_date or now) - loan.due_date).days
         ws.cell(row=row, column=1, value=idx)
         ws.cell(row=row, column=2, value=loan.member.name)
         ws.cell(row=row, column=3, value=loan.member.nis)
@@ -1159,12 +1153,12 @@ def fine_report_excel(request):
         ws.cell(row=row, column=5, value=loan.borrowed_date.strftime('%d/%m/%Y'))
         ws.cell(row=row, column=6, value=loan.return_date.strftime('%d/%m/%Y') if loan.return_date else '-')
         ws.cell(row=row, column=7, value=days_late)
-        ws.cell(row=row, column=8, value=loan.fine_amount)
+        ws.cell(row=row, column=8, value=loan.accrued_fine)
         row += 1
     
     # Summary
     row += 1
-    total_fines = loans_with_fines.aggregate(total=Sum('fine_amount'))['total'] or 0
+    total_fines = loans_with_fines.aggregate(total=Sum('accrued_fine'))['total'] or 0
     ws.cell(row=row, column=7, value='TOTAL DENDA:').font = Font(bold=True)
     ws.cell(row=row, column=8, value=total_fines).font = Font(bold=True, size=12)
     
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['-created_at', '-id'], name='member_created_idx'),
+        ),
+    ]
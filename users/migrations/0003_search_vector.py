@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from library_system.search import build_search_vector
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Isi search_vector untuk data yang sudah ada (satu UPDATE)"""
+    Member = apps.get_model('users', 'Member')
+    Member.objects.update(search_vector=build_search_vector([
+        ('name', 'simple', 'A'),
+        ('nis', 'simple', 'A'),
+        ('email', 'simple', 'B'),
+        ('phone', 'simple', 'B'),
+        ('class_name', 'simple', 'C'),
+    ]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_member_member_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='member_search_idx'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:02
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # Extension pg_trgm dibuat di migration books
+        ('books', '0005_trigram_indexes'),
+        ('users', '0003_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='member_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nis'], name='member_nis_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
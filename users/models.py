@@ -1,5 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField, TrigramWordSimilarity
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Greatest
 from django.core.validators import RegexValidator
 import barcode
 from barcode.writer import ImageWriter
@@ -7,6 +11,8 @@ from io import BytesIO
 from django.core.files import File
 import os
 
+from library_system.search import SIMPLE_CONFIG, build_search_vector, search
+
 class CustomUser(AbstractUser):
     """Custom User Model dengan role"""
     ROLE_CHOICES = [
@@ -26,6 +32,44 @@ class CustomUser(AbstractUser):
         return f"{self.username} ({self.get_role_display()})"
 
 
+# Kolom yang diindeks untuk full-text search anggota: (field, config, bobot)
+# Nama & kode tidak di-stem, jadi semuanya memakai config 'simple'
+MEMBER_SEARCH_FIELDS = [
+    ('name', SIMPLE_CONFIG, 'A'),
+    ('nis', SIMPLE_CONFIG, 'A'),
+    ('email', SIMPLE_CONFIG, 'B'),
+    ('phone', SIMPLE_CONFIG, 'B'),
+    ('class_name', SIMPLE_CONFIG, 'C'),
+]
+
+
+class MemberQuerySet(models.QuerySet):
+    """QuerySet custom untuk Member"""
+
+    def search(self, text):
+        """Full-text search nama, NIS, email, telepon & kelas (annotate rank)"""
+        return search(self, text)
+
+    def autocomplete(self, text):
+        """
+        Cari nama (boleh salah ketik sedikit) atau potongan NIS
+        Word similarity (%>) & LIKE '%..%' sama-sama memakai GIN index pg_trgm;
+        hasil diurutkan dari yang paling mirip
+        """
+        return self.filter(
+            Q(name__trigram_word_similar=text) | Q(nis__contains=text)
+        ).annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(text, 'name'),
+                TrigramWordSimilarity(text, 'nis'),
+            )
+        ).order_by('-similarity', 'name')
+
+    def update_search_vector(self):
+        """Hitung ulang kolom search_vector (satu UPDATE untuk semua baris queryset)"""
+        return self.update(search_vector=build_search_vector(MEMBER_SEARCH_FIELDS))
+
+
 class Member(models.Model):
     """Model untuk Anggota Perpustakaan"""
     MEMBER_TYPE_CHOICES = [
@@ -54,10 +98,23 @@ class Member(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Full-text search (diisi signal post_save, lihat users/signals.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = MemberQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Anggota'
         verbose_name_plural = 'Anggota'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination daftar anggota
+            models.Index(fields=['-created_at', '-id'], name='member_created_idx'),
+            GinIndex(fields=['search_vector'], name='member_search_idx'),
+            # Autocomplete (pg_trgm): nama mirip & potongan NIS
+            GinIndex(fields=['name'], name='member_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['nis'], name='member_nis_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.nis})"
@@ -96,4 +153,4 @@ class Member(models.Model):
     
     def has_overdue_loans(self):
         """Cek apakah ada peminjaman terlambat"""
-        return self.loan_set.filter(status='terlambat').exists()
\ No newline at end of file
+        return self.loan_set.overdue().exists()
\ No newline at end of file
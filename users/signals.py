@@ -0,0 +1,15 @@
+"""
+Signals untuk menjaga kolom search_vector anggota
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import MEMBER_SEARCH_FIELDS, Member
+
+
+@receiver(post_save, sender=Member)
+def update_member_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Hitung ulang search_vector anggota (dilewati jika kolom teks tidak ikut disimpan)"""
+    if update_fields is not None and not {name for name, config, weight in MEMBER_SEARCH_FIELDS} & set(update_fields):
+        return
+    Member.objects.filter(pk=instance.pk).update_search_vector()
@@ -1,3 +1,41 @@
-from django.test import TestCase
+from library_system.testing import TestCase
+from loans.models import Loan
+from loans.services import borrow_copy
+from loans.tests import make_book, make_member
 
-# Create your tests here.
+from .models import Member
+
+
+class MemberSearchTestCase(TestCase):
+    """Full-text search anggota (nama, NIS, kontak) & peminjaman lewat anggota/buku"""
+
+    def setUp(self):
+        super().setUp()
+        self.siti = make_member('2024001', name='Siti Aminah', class_name='XI IPA 1')
+        self.budi = make_member('2024002', name='Budi Santoso', email='budi@sekolah.sch.id')
+        self.aminah = make_member('2024003', name='Aminah Putri')
+
+    def names(self, text):
+        return [member.name for member in Member.objects.search(text).order_by('-rank', 'pk')]
+
+    def test_name_prefix_and_all_terms(self):
+        self.assertEqual(self.names('amin'), ['Siti Aminah', 'Aminah Putri'])
+        self.assertEqual(self.names('siti amin'), ['Siti Aminah'])
+
+    def test_codes_and_contacts(self):
+        self.assertEqual(self.names('2024002'), ['Budi Santoso'])
+        self.assertEqual(self.names('budi@sekolah.sch.id'), ['Budi Santoso'])
+
+    def test_name_ranks_above_class(self):
+        self.budi.class_name = 'Siti'
+        self.budi.save()
+        self.assertEqual(self.names('siti'), ['Siti Aminah', 'Budi Santoso'])
+
+    def test_loans_by_member_or_book(self):
+        book = make_book(copies=2, title='Laskar Pelangi')
+        siti_loan = borrow_copy(self.siti, book.bookcopy_set.first().barcode)
+        budi_loan = borrow_copy(self.budi, book.bookcopy_set.last().barcode)
+
+        self.assertEqual(list(Loan.objects.search('siti')), [siti_loan])
+        self.assertCountEqual(Loan.objects.search('laskar'), [siti_loan, budi_loan])
+        self.assertEqual(list(Loan.objects.search('laskar santoso')), [])